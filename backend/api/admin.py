@@ -1,16 +1,63 @@
 from django.contrib import admin
-from .models import Contact, Task
+from django.contrib.auth import get_permission_codename
+from api.deletion import delete_contacts
+from .models import ArchivedTask, Contact, DuplicatePair, Job, Reminder, Task
+
 
 @admin.register(Contact)
 class ContactAdmin(admin.ModelAdmin):
-    list_display = ('full_name', 'phone', 'email', 'status', 'created_at')
+    list_display = ('full_name', 'phone', 'email', 'status', 'open_tasks_count', 'created_at')
     search_fields = ('full_name', 'phone', 'email')
     list_filter = ('status',)
     ordering = ('-created_at',)
 
+    def get_deleted_objects(self, objs, request):
+        # The default lists every cascaded task, loading them all; summarise with counts instead.
+        objs = list(objs)
+        pks = [obj.pk for obj in objs]
+        model_count = {
+            Contact._meta.verbose_name_plural: len(objs),
+            Task._meta.verbose_name_plural: Task.objects.filter(contact__in=pks).count(),
+            ArchivedTask._meta.verbose_name_plural: ArchivedTask.objects.filter(contact__in=pks).count(),
+        }
+        perms_needed = set()
+        if model_count[Task._meta.verbose_name_plural] and not request.user.has_perm(
+            f"{Task._meta.app_label}.{get_permission_codename('delete', Task._meta)}"
+        ):
+            perms_needed.add(Task._meta.verbose_name)
+        return [str(obj) for obj in objs], {k: v for k, v in model_count.items() if v}, perms_needed, []
+
+    def delete_model(self, request, obj):
+        delete_contacts([obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        delete_contacts(queryset.values_list('pk', flat=True))
+
+
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
     list_display = ('title', 'contact', 'due_date', 'priority', 'is_done', 'created_at')
     search_fields = ('title', 'contact')
     list_filter = ('priority', 'is_done')
-    ordering = ('-created_at',)
\ No newline at end of file
+    ordering = ('-created_at',)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'status', 'attempts', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    ordering = ('-id',)
+
+
+@admin.register(Reminder)
+class ReminderAdmin(admin.ModelAdmin):
+    list_display = ('contact', 'kind', 'due_through', 'created_at', 'sent_at')
+    list_filter = ('kind',)
+    ordering = ('-id',)
+
+
+@admin.register(DuplicatePair)
+class DuplicatePairAdmin(admin.ModelAdmin):
+    list_display = ('contact', 'other', 'score', 'found_at')
+    raw_id_fields = ('contact', 'other')
+    ordering = ('-score', 'id')
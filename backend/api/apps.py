@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Only modules that import no Django REST framework: management commands and workers start without it.
+        from api import cache  # noqa: F401  connects the invalidation receiver
+        from api import checks  # noqa: F401  registers the system checks
+        from api import instrumentation  # noqa: F401  installs the query wrapper on new connections
+        from api import receivers  # noqa: F401  connects the user invalidation and change forwarding receivers
@@ -0,0 +1,102 @@
+"""
+Archival of completed tasks.
+
+Done tasks pile up in `api_task` and slow down every TaskFilter query and
+index. `archive_done_tasks` (the `archive_tasks` command) moves done tasks
+created before a cutoff into `api_archivedtask`, keeping their ids, in
+batches that each take one short transaction: the rows are locked, copied
+with one `INSERT ... SELECT` and deleted. The regular endpoints then read
+live rows only.
+
+`?include_archived=true` on the task list/detail/export reads the
+`api_taskrecord` view (`TaskRecord`, a UNION ALL of both tables) instead.
+Archived tasks keep counting in `/api/stats/`; `open_tasks_count` only
+counts open tasks, so neither changes when tasks are archived.
+"""
+import time
+
+from django.db import connection
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from api.models import ArchivedTask, ChangeAction, Task, TaskRecord, log_change, recording_changes
+from api.signals import notify_data_changed
+
+
+def archive_batch(cutoff, batch_size):
+    """Move up to `batch_size` done tasks created before `cutoff`; return how many were moved."""
+    with recording_changes():
+        ids = list(
+            Task.objects.filter(is_done=True, created_at__lt=cutoff)
+            .order_by('created_at', 'id')
+            .select_for_update(skip_locked=True)
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in Task._meta.concrete_fields)
+        placeholders = ', '.join(['%s'] * len(ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {ArchivedTask._meta.db_table} ({columns}, archived_at) '
+                f'SELECT {columns}, %s FROM {Task._meta.db_table} WHERE id IN ({placeholders})',
+                [connection.ops.adapt_datetimefield_value(timezone.now()), *ids],
+            )
+            # Done tasks count neither in open_tasks_count nor differently in StatCounter,
+            # so the rows are deleted directly rather than through TaskQuerySet.delete.
+            cursor.execute(f'DELETE FROM {Task._meta.db_table} WHERE id IN ({placeholders})', ids)
+        # For the live task endpoints (and so for /api/changes/) an archived task is gone.
+        log_change(Task, ChangeAction.DELETED, ids)
+    notify_data_changed(Task)
+    return len(ids)
+
+
+def archive_done_tasks(cutoff, batch_size=1000, pause=0.0, max_batches=None, progress=None):
+    """Archive every done task created before `cutoff`, pausing `pause` seconds between batches."""
+    archived = batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_batch(cutoff, batch_size)
+        if not moved:
+            break
+        archived += moved
+        batches += 1
+        if progress:
+            progress(archived)
+        if moved < batch_size:
+            break
+        time.sleep(pause)
+    return archived
+
+
+class IncludeArchivedMixin:
+    """`?include_archived=true` makes the read actions of TaskViewSet cover archived tasks too."""
+    include_archived_param = 'include_archived'
+    # Imported on use, like the DRF names below, so `archive_tasks` starts without them.
+    archived_filterset_class = 'api.filters.TaskRecordFilter'
+    archived = False
+
+    def initial(self, request, *args, **kwargs):
+        from rest_framework.permissions import SAFE_METHODS
+
+        super().initial(request, *args, **kwargs)
+        self.archived = request.method in SAFE_METHODS and self.parse_include_archived(request)
+        if self.archived:
+            # DjangoFilterBackend requires the FilterSet model to match the queryset's.
+            self.filterset_class = import_string(self.archived_filterset_class)
+
+    def parse_include_archived(self, request):
+        from rest_framework import serializers
+        from rest_framework.exceptions import ValidationError
+
+        value = request.query_params.get(self.include_archived_param)
+        if value is None:
+            return False
+        try:
+            return serializers.BooleanField().run_validation(value)
+        except serializers.ValidationError as exc:
+            raise ValidationError({self.include_archived_param: exc.detail})
+
+    def get_queryset(self):
+        if self.archived:
+            return TaskRecord.objects.select_related('contact').all()
+        return super().get_queryset()
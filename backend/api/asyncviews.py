@@ -0,0 +1,103 @@
+"""
+Async list/detail endpoints for ASGI deployments.
+
+Under ASGI a sync view holds a worker thread for the whole request, including
+every database round trip. `AsyncReadView` serves the plain JSON reads of
+`FastReadMixin` viewsets on the event loop instead: DRF authentication,
+permissions and content negotiation run once in a thread, then rows are read
+with the async ORM (`FastReadMixin.alist` / `aretrieve`), so the output is
+the same as the sync views'. Anything else (writes, `?expand=`, the
+browsable API) is handed to the router's regular view.
+
+These routes are only used through `AsyncReadsASGIHandler` (`config/asgi.py`),
+which resolves requests against `config.asgi_urls`; WSGI keeps the sync views.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.http import HttpResponse
+from django.urls import re_path
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from api.fastread import FastReadMixin
+
+
+class AsyncReadView(View):
+    """Async front for one router URL; `sync_view` is the router's view for it."""
+    sync_view = None
+
+    async def get(self, request, *args, **kwargs):
+        response = await self.read(request, *args, **kwargs)
+        if response is None:
+            response = await self.delegate(request, *args, **kwargs)
+        return response
+
+    async def delegate(self, request, *args, **kwargs):
+        return await sync_to_async(self.sync_view)(request, *args, **kwargs)
+
+    post = put = patch = delete = options = delegate
+
+    async def read(self, request, *args, **kwargs):
+        """Mirror `APIView.dispatch` with the async handler, or return None to delegate."""
+        view = self.sync_view
+        viewset = view.cls(**view.initkwargs)
+        viewset.action_map = {'get': view.actions['get']}
+        viewset.args, viewset.kwargs = args, kwargs
+        drf_request = viewset.initialize_request(request, *args, **kwargs)
+        viewset.request = drf_request
+        viewset.headers = viewset.default_response_headers
+        try:
+            # Authentication may query the user table; the rest is CPU only.
+            await sync_to_async(viewset.initial)(drf_request, *args, **kwargs)
+            if not viewset.use_fast_read():
+                return None
+            if viewset.action == 'retrieve':
+                if not viewset.fast_read_permits_objects():
+                    return None
+                response = await viewset.aretrieve(drf_request, *args, **kwargs)
+            else:
+                response = await viewset.alist(drf_request, *args, **kwargs)
+        except Exception as exc:
+            response = viewset.handle_exception(exc)
+        response = viewset.finalize_response(drf_request, response, *args, **kwargs)
+        return self.rendered(request, response)
+
+    @staticmethod
+    def rendered(request, response):
+        """Render here so Django does not hop to a thread to call `response.render()`."""
+        if not hasattr(response, 'render'):
+            return response
+        start = time.perf_counter()
+        response.render()
+        metrics = getattr(request, 'crm_metrics', None)
+        if metrics is not None:
+            metrics.render_time = time.perf_counter() - start
+        return HttpResponse(response.content, status=response.status_code, headers=dict(response.items()))
+
+
+def with_async_reads(urlpatterns):
+    """Copy of `urlpatterns` with the list/detail routes of `FastReadMixin` viewsets made async."""
+    patterns = []
+    for url in urlpatterns:
+        view = url.callback
+        if (
+            issubclass(getattr(view, 'cls', object), FastReadMixin)
+            and 'format' not in url.pattern.regex.groupindex
+            and view.actions.get('get') in ('list', 'retrieve')
+        ):
+            url = re_path(url.pattern.regex.pattern, csrf_exempt(AsyncReadView.as_view(sync_view=view)), name=url.name)
+        patterns.append(url)
+    return patterns
+
+
+class AsyncReadsASGIHandler(ASGIHandler):
+    """ASGI handler that resolves requests against `urlconf`, where the async reads are routed."""
+    urlconf = 'config.asgi_urls'
+
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = self.urlconf
+        return request, error_response
@@ -0,0 +1,136 @@
+"""
+JWT authentication without a user query per request.
+
+simplejwt's `JWTAuthentication` verifies the token signature and then loads
+the user from `auth_user` on every request. `CachedJWTAuthentication` keeps
+the validated token and its user in a bounded per-process LRU cache for up
+to `CRM_AUTH_CACHE['TIMEOUT']` seconds (never past the token's expiry), so a
+client repeating its token costs no auth queries.
+
+Saving or deleting a user drops that user's entries in this process and
+bumps the user's version in the shared Django cache
+(`CRM_AUTH_CACHE['ALIAS']`), which every process compares on each hit:
+deactivation and password changes (with `CHECK_REVOKE_TOKEN`) take effect on
+the next request. That cache must be shared by all workers; `api.checks`
+fails the system check when it is per process. Queryset updates on
+`auth_user` send no signal and are only seen once the entry expires.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+DEFAULTS = {'ALIAS': 'default', 'TIMEOUT': 60, 'MAX_ENTRIES': 10000}
+
+
+def auth_cache_settings():
+    return {**DEFAULTS, **getattr(settings, 'CRM_AUTH_CACHE', {})}
+
+
+def user_version_key(user_id):
+    return f'crm:auth-user:{user_id}'
+
+
+@dataclass
+class TokenEntry:
+    user: object
+    token: object
+    version_key: str
+    version: object
+    expires: float
+
+
+class TokenCache:
+    """Thread-safe LRU of raw token -> TokenEntry; entries also expire on their own."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, raw_token):
+        with self.lock:
+            entry = self.entries.get(raw_token)
+            if entry is None:
+                return None
+            if entry.expires <= time.monotonic():
+                del self.entries[raw_token]
+                return None
+            self.entries.move_to_end(raw_token)
+            return entry
+
+    def set(self, raw_token, entry, max_entries):
+        with self.lock:
+            self.entries[raw_token] = entry
+            self.entries.move_to_end(raw_token)
+            while len(self.entries) > max_entries:
+                self.entries.popitem(last=False)
+
+    def discard_user(self, user_id):
+        with self.lock:
+            for raw_token in [key for key, entry in self.entries.items() if entry.user.pk == user_id]:
+                del self.entries[raw_token]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+tokens = TokenCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """`JWTAuthentication` that serves repeated tokens from `tokens`."""
+
+    def authenticate(self, request):
+        options = auth_cache_settings()
+        if not options['TIMEOUT']:
+            return super().authenticate(request)
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        versions = caches[options['ALIAS']]
+        entry = tokens.get(raw_token)
+        if entry is not None and versions.get(entry.version_key) == entry.version:
+            # Views may set attributes on request.user; keep the cached instance clean.
+            return copy.copy(entry.user), entry.token
+
+        validated_token = self.get_validated_token(raw_token)
+        # Read the version before the user row so a concurrent change is never cached as current.
+        version_key = user_version_key(validated_token.get(jwt_settings.USER_ID_CLAIM))
+        version = versions.get(version_key)
+        user = self.get_user(validated_token)
+        lifetime = min(options['TIMEOUT'], validated_token['exp'] - time.time())
+        entry = TokenEntry(copy.copy(user), validated_token, version_key, version, time.monotonic() + lifetime)
+        tokens.set(raw_token, entry, options['MAX_ENTRIES'])
+        return user, validated_token
+
+
+class QueryParamJWTAuthentication(CachedJWTAuthentication):
+    """Takes the access token from `?access_token=`, for clients such as EventSource that cannot set headers."""
+    query_param = 'access_token'
+
+    def get_header(self, request):
+        token = request.query_params.get(self.query_param)
+        if not token:
+            return None
+        return f'{jwt_settings.AUTH_HEADER_TYPES[0]} {token}'.encode()
+
+
+def invalidate_user(instance):
+    """Drop `instance`'s cached tokens here and bump its version for every process (see `api.receivers`)."""
+    tokens.discard_user(instance.pk)
+    key = user_version_key(getattr(instance, jwt_settings.USER_ID_FIELD))
+    caches[auth_cache_settings()['ALIAS']].set(key, time.time_ns(), timeout=None)
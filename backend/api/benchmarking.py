@@ -0,0 +1,203 @@
+"""Helpers shared by the `bench_*` management commands."""
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+from api.models import (
+    ArchivedTask, Change, ChangeSequence, Contact, ContactKey, DuplicateIndexState, DuplicatePair, PendingChange, Reminder,
+    StatCounter, Task,
+)
+from api.signals import notify_data_changed
+
+FIRST_NAMES = [
+    'Ahmad', 'Sara', 'Omar', 'Lina', 'Khaled', 'Rania', 'Yousef', 'Dina', 'Tariq', 'Nour',
+    'Fadi', 'Hala', 'Zaid', 'Mona', 'Basem', 'Maya', 'Sami', 'Leen', 'Hadi', 'Reem',
+]
+LAST_NAMES = [
+    'Al-Zoubi', 'Khalil', 'Hassan', 'Mansour', 'Nasser', 'Faris', 'Barakat', 'Sharif', 'Awad', 'Haddad',
+    'Khatib', 'Jubran', 'Qasem', 'Atiyeh', 'Taha', 'Saleh', 'Odeh', 'Daher', 'Hijazi', 'Shami',
+]
+TASK_TITLES = [
+    'Schedule follow-up call', 'Send proposal document', 'Review contract terms',
+    'Prepare meeting agenda', 'Update contact information', 'Send invoice',
+    'Complete onboarding', 'Draft partnership agreement', 'Conduct needs assessment',
+    'Deliver project update', 'Arrange site visit', 'Submit quarterly report',
+]
+# Generated timestamps and due dates are laid out around a fixed point so the
+# same seed always yields the same rows.
+DATASET_EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Summarize a list of millisecond timings."""
+    return {
+        'runs': len(samples),
+        'min_ms': round(min(samples), 3),
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+        'max_ms': round(max(samples), 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+    }
+
+
+@contextmanager
+def added_db_latency(seconds):
+    """Sleep before every query, standing in for the network round trip to a remote database."""
+    if not seconds:
+        yield
+        return
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    connection_created.connect(install, dispatch_uid='benchmarking.db_latency')
+    try:
+        yield
+    finally:
+        connection_created.disconnect(dispatch_uid='benchmarking.db_latency')
+        for connection in connections.all(initialized_only=True):
+            if delay in connection.execute_wrappers:
+                connection.execute_wrappers.remove(delay)
+
+
+def measure(func, repeat=5, warmup=1):
+    """Call `func` `warmup + repeat` times and return the timed runs in ms."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def synthetic_name(n):
+    first = FIRST_NAMES[n % len(FIRST_NAMES)]
+    last = LAST_NAMES[(n // len(FIRST_NAMES)) % len(LAST_NAMES)]
+    return f'{first} {last} {n:x}'
+
+
+def ensure_rows(contacts, tasks_per_contact=1, batch_size=5000):
+    """
+    Top the database up to at least `contacts` contacts with `tasks_per_contact`
+    tasks each. Rows are synthetic and spread over `created_at` so orderings
+    and date filters behave like real data. Existing rows are kept.
+    """
+    existing = Contact.objects.count()
+    now = timezone.now()
+    for start in range(existing, contacts, batch_size):
+        stop = min(start + batch_size, contacts)
+        batch = Contact.objects.bulk_create([
+            Contact(full_name=synthetic_name(n), phone=f'+1{n:011d}', email=f'bench{n}@example.com')
+            for n in range(start, stop)
+        ], batch_size=batch_size)
+        Contact.objects.filter(pk__in=[c.pk for c in batch]).update(created_at=now - timedelta(seconds=contacts - start))
+        Task.objects.bulk_create([
+            Task(contact=contact, title=f'Bench task {i}', is_done=i % 4 == 0)
+            for contact in batch for i in range(tasks_per_contact)
+        ], batch_size=batch_size)
+
+
+def reset_data():
+    """
+    Empty the contact, task (live and archived), counter and change log tables,
+    and those that refer to contacts, and restart their id sequences.
+    """
+    tables = [
+        Task._meta.db_table, ArchivedTask._meta.db_table, Reminder._meta.db_table, ContactKey._meta.db_table,
+        DuplicatePair._meta.db_table, DuplicateIndexState._meta.db_table, Contact._meta.db_table,
+        StatCounter._meta.db_table, Change._meta.db_table, ChangeSequence._meta.db_table,
+        PendingChange._meta.db_table,
+    ]
+    if connection.vendor == 'postgresql' and connection.in_atomic_block:
+        # TRUNCATE refuses to run while deferred FK checks are pending.
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+    connection.ops.execute_sql_flush(connection.ops.sql_flush(no_style(), tables, reset_sequences=True))
+    notify_data_changed(Contact)
+
+
+def generate_dataset(contacts, tasks_per_contact, seed=0, batch_size=5000):
+    """
+    Insert `contacts` synthetic contacts with `tasks_per_contact` tasks each.
+
+    Rows depend only on `seed` and the row number, so two runs on empty tables
+    produce identical data. Roughly 10% of contacts have no phone and 5% no
+    email; a quarter of the tasks are done and 10% have no due date. Contacts
+    are one minute apart starting at `DATASET_EPOCH`.
+    """
+    rng = random.Random(seed)
+    for start in range(0, contacts, batch_size):
+        batch, created = [], []
+        for n in range(start, min(start + batch_size, contacts)):
+            batch.append(Contact(
+                full_name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {n:x}',
+                phone='' if rng.random() < 0.1 else f'+3{n:011d}',
+                email='' if rng.random() < 0.05 else f'contact{n}@example.com',
+                status='inactive' if rng.random() < 0.2 else 'active',
+            ))
+            created.append(DATASET_EPOCH + timedelta(minutes=n))
+        tasks, task_created = [], []
+        for contact, contact_created in zip(batch, created):
+            for i in range(tasks_per_contact):
+                tasks.append(Task(
+                    contact=contact,
+                    title=f'{rng.choice(TASK_TITLES)} #{i + 1}',
+                    due_date=None if rng.random() < 0.1 else (
+                        DATASET_EPOCH.date() + timedelta(days=rng.randint(-90, 365))
+                    ),
+                    priority=rng.choice(('low', 'medium', 'high')),
+                    is_done=rng.random() < 0.25,
+                ))
+                task_created.append(contact_created + timedelta(seconds=rng.randint(0, 86400 * 30)))
+        with transaction.atomic():
+            Contact.objects.bulk_create(batch)
+            Task.objects.bulk_create(tasks, batch_size=batch_size)
+            # auto_now_add overrides created_at on insert, so the generated times are written afterwards.
+            # The base managers skip change logging: created_at is neither logged nor counted.
+            for model, objs, times in ((Contact, batch, created), (Task, tasks, task_created)):
+                for obj, created_at in zip(objs, times):
+                    obj.created_at = created_at
+                model._base_manager.bulk_update(objs, ['created_at'], batch_size=1000)
+
+
+def bench_user():
+    return User(username='bench', is_staff=True)
+
+
+def call_view(view, path, params=None, user=None, method='get', data=None, view_kwargs=None):
+    """Run a DRF view through the full request cycle and return the rendered response."""
+    from rest_framework.test import APIRequestFactory, force_authenticate  # not needed by `seed`
+
+    host = next((h for h in settings.ALLOWED_HOSTS if h != '*' and not h.startswith('.')), 'localhost')
+    factory = APIRequestFactory(SERVER_NAME=host)
+    request = getattr(factory, method)(path, params if method == 'get' else data, format=None if method == 'get' else 'json')
+    force_authenticate(request, user=user or bench_user())
+    response = view(request, **(view_kwargs or {}))
+    if hasattr(response, 'render'):
+        response.render()
+    return response
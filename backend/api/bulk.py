@@ -0,0 +1,308 @@
+"""
+Batch write paths behind the `bulk` actions of ContactViewSet and TaskViewSet.
+
+Rows are validated with the regular serializers (which leave uniqueness to
+the database constraints), uniqueness is then checked for a whole chunk with
+one set-based query, and accepted rows are written with `bulk_create` /
+`bulk_update`. Every rejected row is reported with its index in the request.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.serializers import as_serializer_error
+
+from api.deletion import delete_contacts
+from api.jobs import accepted, background_requested, enqueue
+from api.models import Contact, Task
+from api.serializers import (
+    DUPLICATE_EMAIL_MESSAGE,
+    DUPLICATE_PHONE_MESSAGE,
+    DUPLICATE_TASK_TITLE_MESSAGE,
+    BulkContactSerializer,
+    BulkTaskSerializer,
+    constraint_error,
+)
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield start, items[start:start + size]
+
+
+class BulkResult:
+    def __init__(self):
+        self.ids = []
+        self.errors = []
+
+    def error(self, index, errors):
+        self.errors.append({'index': index, 'errors': errors})
+
+    def as_dict(self, verb):
+        self.errors.sort(key=lambda error: error['index'])
+        return {verb: len(self.ids), 'ids': self.ids, 'errors': self.errors}
+
+
+class BulkWriter:
+    """Validates and writes rows for one model in chunks of `chunk_size`."""
+    model = None
+    serializer_class = None
+
+    def __init__(self, chunk_size=500, context=None):
+        self.chunk_size = chunk_size
+        self.context = context or {}
+
+    def get_context(self, rows, instances=None):
+        return dict(self.context)
+
+    def find_conflicts(self, items):
+        """Return `{index: errors}` for rows clashing with the database or each other."""
+        return {}
+
+    def validate(self, start, rows, result, instances=None, check_conflicts=True):
+        # One serializer for the whole chunk, like ListSerializer's child:
+        # building a ModelSerializer's fields costs far more than validating a row.
+        serializer = self.serializer_class(context=self.get_context(rows, instances), partial=instances is not None)
+        valid = []
+        for offset, row in enumerate(rows):
+            index = start + offset
+            instance = None
+            if instances is not None:
+                instance = instances.get(self.row_id(row))
+                if instance is None:
+                    result.error(index, {'id': ['Not found.']})
+                    continue
+            serializer.instance = instance
+            try:
+                valid.append((index, serializer.run_validation(row), instance))
+            except ValidationError as exc:
+                result.error(index, as_serializer_error(exc))
+
+        conflicts = self.find_conflicts(valid) if check_conflicts else {}
+        for index, errors in conflicts.items():
+            result.error(index, errors)
+        return [item for item in valid if item[0] not in conflicts]
+
+    @staticmethod
+    def row_id(row):
+        try:
+            return int(row.get('id'))
+        except (AttributeError, TypeError, ValueError):
+            return None
+
+    def create(self, rows):
+        result = BulkResult()
+        for start, chunk in chunked(rows, self.chunk_size):
+            accepted = self.validate(start, chunk, result)
+            objs = [(index, self.model(**data)) for index, data, _ in accepted]
+            self.write(objs, result, lambda batch: self.model.objects.bulk_create(batch))
+        return result
+
+    def update(self, rows):
+        result = BulkResult()
+        for start, chunk in chunked(rows, self.chunk_size):
+            ids = [pk for pk in map(self.row_id, chunk) if pk is not None]
+            instances = self.model.objects.in_bulk(ids)
+            accepted = self.validate(start, chunk, result, instances)
+            objs, fields = [], set()
+            for index, data, instance in accepted:
+                for name, value in data.items():
+                    setattr(instance, name, value)
+                fields.update(data)
+                objs.append((index, instance))
+            if fields:
+                self.write(objs, result, lambda batch: self.model.objects.bulk_update(batch, sorted(fields)))
+            else:
+                result.ids.extend(obj.pk for _, obj in objs)
+        return result
+
+    def delete(self, ids):
+        result = BulkResult()
+        for start, chunk in chunked(ids, self.chunk_size):
+            pks = {}
+            for offset, pk in enumerate(chunk):
+                try:
+                    pks[int(pk)] = start + offset
+                except (TypeError, ValueError):
+                    result.error(start + offset, {'id': ['A valid integer is required.']})
+            existing = self.delete_rows(pks)
+            for pk, index in pks.items():
+                if pk in existing:
+                    result.ids.append(pk)
+                else:
+                    result.error(index, {'id': ['Not found.']})
+        return result
+
+    def delete_rows(self, pks):
+        """Delete those of the rows `pks` that exist; return their pks."""
+        with transaction.atomic():
+            existing = set(self.model.objects.filter(pk__in=pks).values_list('pk', flat=True))
+            self.model.objects.filter(pk__in=existing).delete()
+        return existing
+
+    def write(self, objs, result, writer):
+        """
+        Write a chunk in one transaction. If a concurrent writer slipped a
+        duplicate in after the conflict check, retry row by row so only the
+        offending rows are rejected.
+        """
+        if not objs:
+            return
+        try:
+            with transaction.atomic():
+                writer([obj for _, obj in objs])
+        except IntegrityError:
+            for index, obj in objs:
+                try:
+                    with transaction.atomic():
+                        writer([obj])
+                except IntegrityError as exc:
+                    result.error(index, constraint_error(exc, self.model) or {'non_field_errors': [str(exc)]})
+                    continue
+                result.ids.append(obj.pk)
+            return
+        result.ids.extend(obj.pk for _, obj in objs)
+
+
+class ContactBulkWriter(BulkWriter):
+    model = Contact
+    serializer_class = BulkContactSerializer
+
+    def delete_rows(self, pks):
+        return set(delete_contacts(pks))  # tasks in bounded chunks, see api.deletion
+
+    def find_conflicts(self, items):
+        emails = {data['email'] for _, data, _ in items if data.get('email')}
+        phones = {data['phone'] for _, data, _ in items if data.get('phone')}
+        if not emails and not phones:
+            return {}
+
+        taken_emails, taken_phones = {}, {}
+        # The `<> ''` guards match the partial unique indexes so both branches use them.
+        for pk, email, phone in Contact.objects.filter(
+            (Q(email__in=emails) & ~Q(email='')) | (Q(phone__in=phones) & ~Q(phone=''))
+        ).values_list('pk', 'email', 'phone'):
+            if email in emails:
+                taken_emails[email] = pk
+            if phone in phones:
+                taken_phones[phone] = pk
+
+        conflicts = {}
+        for index, data, instance in items:
+            own_pk = instance.pk if instance else None
+            errors = {}
+            for field, taken, message in (
+                ('email', taken_emails, DUPLICATE_EMAIL_MESSAGE),
+                ('phone', taken_phones, DUPLICATE_PHONE_MESSAGE),
+            ):
+                value = data.get(field)
+                if not value:
+                    continue
+                if value in taken and taken[value] != own_pk:
+                    errors[field] = [message]
+                else:
+                    # Later rows in the same batch clash with this one.
+                    taken[value] = own_pk if own_pk is not None else ('row', index)
+            if errors:
+                conflicts[index] = errors
+        return conflicts
+
+
+class TaskBulkWriter(BulkWriter):
+    model = Task
+    serializer_class = BulkTaskSerializer
+
+    def get_context(self, rows, instances=None):
+        context = super().get_context(rows, instances)
+        contact_ids = set()
+        for row in rows:
+            try:
+                contact_ids.add(int(row.get('contact')))
+            except (AttributeError, TypeError, ValueError):
+                pass
+        for instance in (instances or {}).values():
+            contact_ids.add(instance.contact_id)
+        context['contacts'] = Contact.objects.only('pk').in_bulk(contact_ids)
+        return context
+
+    def find_conflicts(self, items):
+        pairs = {}
+        for index, data, instance in items:
+            contact_id = data['contact'].pk if 'contact' in data else instance.contact_id
+            title = data['title'] if 'title' in data else instance.title
+            pairs[index] = (contact_id, title, instance.pk if instance else None)
+        if not pairs:
+            return {}
+
+        contact_ids = {contact_id for contact_id, _, _ in pairs.values()}
+        titles = {title for _, title, _ in pairs.values()}
+        taken = {
+            (contact_id, title): pk
+            for pk, contact_id, title in Task.objects.filter(
+                contact_id__in=contact_ids, title__in=titles
+            ).values_list('pk', 'contact_id', 'title')
+        }
+
+        conflicts = {}
+        for index, (contact_id, title, own_pk) in pairs.items():
+            key = (contact_id, title)
+            if key in taken and taken[key] != own_pk:
+                conflicts[index] = {'title': [DUPLICATE_TASK_TITLE_MESSAGE]}
+            else:
+                taken[key] = own_pk if own_pk is not None else ('row', index)
+        return conflicts
+
+
+class BulkModelMixin:
+    """
+    Adds `POST|PATCH|DELETE <list url>/bulk/` to a viewset.
+
+    POST takes a list of objects to create, PATCH a list of partial objects
+    with `id`, DELETE `{"ids": [...]}`. Valid rows are written even when others
+    fail; the response lists the written ids and per-row errors. With
+    `?background=true` the rows are written by a job (`api.jobs`) instead.
+    """
+    bulk_writer_class = None
+    bulk_chunk_size = 500
+    bulk_max_rows = 10000
+    bulk_background_max_rows = 100000
+
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request):
+        if request.method == 'DELETE':
+            rows = request.data.get('ids') if isinstance(request.data, dict) else None
+        else:
+            rows = request.data
+        if not isinstance(rows, list):
+            expected = '{"ids": [...]}' if request.method == 'DELETE' else 'a list of objects'
+            raise ValidationError({'non_field_errors': [f'Expected {expected}.']})
+        background = background_requested(request)
+        max_rows = self.bulk_background_max_rows if background else self.bulk_max_rows
+        if len(rows) > max_rows:
+            raise ValidationError({'non_field_errors': [f'At most {max_rows} rows per request.']})
+        if background:
+            job = enqueue('bulk', {
+                'model': self.queryset.model._meta.model_name, 'method': request.method, 'rows': rows,
+            }, user=request.user)
+            return accepted(request, job)
+
+        writer = self.bulk_writer_class(chunk_size=self.bulk_chunk_size, context=self.get_serializer_context())
+        result, verb, ok_status = bulk_write(writer, request.method, rows)
+        if not result.errors:
+            response_status = ok_status
+        elif result.ids:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response(result.as_dict(verb), status=response_status)
+
+
+def bulk_write(writer, method, rows):
+    """Run the write for HTTP `method`: `(BulkResult, verb, status when no row failed)`."""
+    if method == 'POST':
+        return writer.create(rows), 'created', status.HTTP_201_CREATED
+    if method == 'PATCH':
+        return writer.update(rows), 'updated', status.HTTP_200_OK
+    return writer.delete(rows), 'deleted', status.HTTP_200_OK
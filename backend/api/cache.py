@@ -0,0 +1,184 @@
+"""
+Per-user response cache for the list and detail endpoints.
+
+Rendered responses are stored under a key built from a global data version,
+the user, the URL (path and sorted query params) and the negotiated media
+type. Any write to Contact or Task (`api.signals.data_changed`) bumps the
+version, so older entries are simply never read again and expire on their
+own. Responses carry an ETag and `If-None-Match` is answered with 304.
+
+The backend is any Django cache (`CRM_RESPONSE_CACHE['ALIAS']`). The default
+locmem cache is per process: with several workers, or writes from management
+commands running elsewhere, use a shared backend such as Redis.
+"""
+import hashlib
+import json
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.http import parse_etags, quote_etag
+
+from api.signals import data_changed
+
+VERSION_KEY = 'crm:data-version'
+DEFAULTS = {'ALIAS': 'default', 'TIMEOUT': 300, 'ENABLED': True}
+
+
+def cache_settings():
+    return {**DEFAULTS, **getattr(settings, 'CRM_RESPONSE_CACHE', {})}
+
+
+def get_cache():
+    return caches[cache_settings()['ALIAS']]
+
+
+class CacheMetrics:
+    """Process-local hit/miss counters."""
+
+    names = ('hits', 'misses', 'not_modified', 'invalidations')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.counts = dict.fromkeys(self.names, 0)
+
+    def record(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def snapshot(self):
+        with self.lock:
+            data = dict(self.counts)
+        lookups = data['hits'] + data['misses']
+        data['hit_ratio'] = round(data['hits'] / lookups, 4) if lookups else None
+        return data
+
+
+metrics = CacheMetrics()
+
+
+def data_version():
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock so a version key lost to eviction can never
+        # come back with a value that old entries were stored under.
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_data_version():
+    cache = get_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+    metrics.record('invalidations')
+
+
+@receiver(data_changed, dispatch_uid='api.cache.invalidate_responses')
+def invalidate_responses(sender, **kwargs):
+    bump_data_version()
+    if connection.in_atomic_block:
+        # A request that read the old rows before the commit may have cached
+        # them under the new version; bump again once the data is visible.
+        transaction.on_commit(bump_data_version)
+
+
+def response_cache_key(request, version):
+    params = sorted((key, request.query_params.getlist(key)) for key in request.query_params)
+    raw = json.dumps([request.build_absolute_uri(request.path), params, request.accepted_media_type])
+    digest = hashlib.sha256(raw.encode()).hexdigest()
+    return f'crm:response:{version}:{request.user.pk}:{digest}'
+
+
+class CachedResponseMixin:
+    """
+    Serves `list` and `retrieve` from the response cache.
+
+    Only 200 responses are stored. `X-Cache` tells whether the body came from
+    the cache; clients can revalidate with `If-None-Match`.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.acached_response(request, super().alist, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.acached_response(request, super().aretrieve, *args, **kwargs)
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        options = cache_settings()
+        if not options['ENABLED']:
+            return handler(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = response_cache_key(request, data_version())
+        entry = cache.get(key)
+        if entry is not None:
+            return self.conditional_response(request, entry)
+        metrics.record('misses')
+        response = handler(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        entry = self.cache_entry(request, response)
+        cache.set(key, entry, options['TIMEOUT'])
+        return self.conditional_response(request, entry, response)
+
+    async def acached_response(self, request, handler, *args, **kwargs):
+        options = cache_settings()
+        if not options['ENABLED']:
+            return await handler(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = response_cache_key(request, await sync_to_async(data_version)())
+        entry = await cache.aget(key)
+        if entry is not None:
+            return self.conditional_response(request, entry)
+        metrics.record('misses')
+        response = await handler(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        entry = self.cache_entry(request, response)
+        await cache.aset(key, entry, options['TIMEOUT'])
+        return self.conditional_response(request, entry, response)
+
+    def cache_entry(self, request, response):
+        """Render `response` and return the `(content, content_type, etag)` to store."""
+        response.accepted_renderer = request.accepted_renderer
+        response.accepted_media_type = request.accepted_media_type
+        response.renderer_context = self.get_renderer_context()
+        content = response.render().content
+        return content, response['Content-Type'], quote_etag(hashlib.sha256(content).hexdigest()[:32])
+
+    def conditional_response(self, request, entry, response=None):
+        """Answer from a cache entry: 304, the stored body (HIT) or `response` itself (MISS)."""
+        content, content_type, etag = entry
+        state = 'MISS' if response is not None else 'HIT'
+        if state == 'HIT':
+            metrics.record('hits')
+
+        client_etags = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in client_etags or '*' in client_etags:
+            metrics.record('not_modified')
+            response = HttpResponse(status=304)
+        elif response is None:
+            response = HttpResponse(content, content_type=content_type)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        response['X-Cache'] = state
+        return response
@@ -0,0 +1,127 @@
+"""
+Change feed behind `GET /api/changes/?since=<cursor>` (`api.views.ChangeFeedView`).
+
+Every Contact and Task write logs `(seq, model, id, action)` rows in `Change`
+(see `api.models.recording_changes` and `publish_changes`). Sequence numbers
+become visible in commit order, so a client that stores the `next` cursor of each page and
+asks for `?since=<cursor>` sees every later change exactly once, without
+re-reading whole lists. A page lists each object once, with its latest
+change: `created` / `updated` (both are upserts) carry the current row as the
+list endpoints render it, `deleted` carries only the id.
+
+`compact_changes` keeps the log at one entry per object and drops deletions
+older than the retention period. A client whose cursor is older than a
+dropped deletion gets `410 Gone` and reloads from `?since=0`, which returns
+the current state of every object.
+"""
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from api.models import Change, ChangeAction, ChangeSequence, publish_changes
+
+# Imported on use: the viewsets pull in every API module, which `compact_changes` does not need.
+FEEDS = {'contact': 'api.views.ContactViewSet', 'task': 'api.views.TaskViewSet'}
+ACTIONS = {ChangeAction.CREATED: 'created', ChangeAction.UPDATED: 'updated', ChangeAction.DELETED: 'deleted'}
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 1000
+
+
+def sequence_state():
+    """`(last seq handed out, last seq of a dropped deletion)`, after publishing any committed changes."""
+    publish_changes()
+    return ChangeSequence.objects.filter(pk=1).values_list('value', 'pruned_through').first() or (0, 0)
+
+
+def collapse(rows):
+    """Reduce `(seq, model, object_id, action)` rows to each object's latest change, in seq order."""
+    latest = {}
+    for seq, model, object_id, action in rows:
+        key = (model, object_id)
+        first = latest[key][2] if key in latest else action
+        latest[key] = (seq, action, first)
+    changes = []
+    for (model, object_id), (seq, action, first) in latest.items():
+        if first == ChangeAction.CREATED:
+            if action == ChangeAction.DELETED:
+                continue  # created and deleted within the page: the client never needs to know
+            action = ChangeAction.CREATED
+        changes.append((seq, model, object_id, action))
+    return sorted(changes)
+
+
+def current_rows(model, pks):
+    """The current list-endpoint representation of the `model` rows `pks`, by primary key."""
+    viewset = import_string(FEEDS[model])
+    queryset = viewset.queryset.model.objects.filter(pk__in=pks).order_by()
+    values, convert = viewset().fast_read_rows(queryset, list(viewset.fast_read_fields))
+    return {row.id: convert(row) for row in values}
+
+
+def compact_changes(retention_days, batch_size=10000):
+    """
+    Drop log entries that a later entry for the same object supersedes, then
+    deletions older than `retention_days`. Return `(superseded, expired)` counts.
+    """
+    publish_changes()
+    table = connection.ops.quote_name(Change._meta.db_table)
+    last = Change.objects.aggregate(last=Max('seq'))['last'] or 0
+    superseded = 0
+    for start in range(0, last, batch_size):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE seq > %s AND seq <= %s AND EXISTS ('
+                f'SELECT 1 FROM {table} later WHERE later.model = {table}.model '
+                f'AND later.object_id = {table}.object_id AND later.seq > {table}.seq)',
+                [start, start + batch_size],
+            )
+            superseded += cursor.rowcount
+
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    expired = Change.objects.filter(action=ChangeAction.DELETED, changed_at__lt=cutoff)
+    with transaction.atomic():
+        pruned_through = expired.aggregate(last=Max('seq'))['last']
+        if pruned_through is None:
+            return superseded, 0
+        # Raise the 410 boundary first: a reader past it never needed the dropped deletions.
+        ChangeSequence.objects.filter(pk=1, pruned_through__lt=pruned_through).update(pruned_through=pruned_through)
+        count, _ = expired.filter(seq__lte=pruned_through).delete()
+    return superseded, count
+
+
+def render_changes(changes):
+    """
+    Feed entries for `(seq, model, object_id, action)` changes. Rows deleted
+    since are left out; their deletion comes later in the log.
+    """
+    wanted = {}
+    for seq, model, object_id, action in changes:
+        if action != ChangeAction.DELETED:
+            wanted.setdefault(model, []).append(object_id)
+    data = {model: current_rows(model, pks) for model, pks in wanted.items()}
+
+    entries = []
+    for seq, model, object_id, action in changes:
+        entry = {'seq': seq, 'type': model, 'op': ACTIONS[action], 'id': object_id}
+        if action != ChangeAction.DELETED:
+            row = data[model].get(object_id)
+            if row is None:
+                continue
+            entry['data'] = row
+        entries.append(entry)
+    return entries
+
+
+def read_changes(since, limit):
+    """One page of the feed after `since`: `(entries, next cursor, has_more)`."""
+    rows = list(
+        Change.objects.filter(seq__gt=since).order_by('seq')
+        .values_list('seq', 'model', 'object_id', 'action')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return render_changes(collapse(rows)), rows[-1][0] if rows else since, has_more
+
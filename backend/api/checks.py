@@ -0,0 +1,46 @@
+"""System checks for settings that would otherwise only fail on first use."""
+from importlib.util import find_spec
+
+from django.conf import settings
+from django.core.checks import Error, register
+
+
+@register()
+def database_pool_check(app_configs, **kwargs):
+    """DB_POOL needs psycopg 3 with psycopg-pool; psycopg2 fails when the first connection is made."""
+    errors = []
+    for alias, database in settings.DATABASES.items():
+        if 'pool' not in database.get('OPTIONS', {}):
+            continue
+        if find_spec('psycopg') is None or find_spec('psycopg_pool') is None:
+            errors.append(Error(
+                f"DATABASES[{alias!r}] uses a connection pool (DB_POOL) but psycopg 3 or psycopg-pool is not installed.",
+                hint="Install psycopg[binary,pool] from requirements.txt, or set DB_POOL=False.",
+                id='api.E001',
+            ))
+    return errors
+
+
+# Backends whose entries only the process that wrote them can read.
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register()
+def auth_cache_check(app_configs, **kwargs):
+    """The token cache relies on user versions every worker can read; a per-process cache keeps stale users."""
+    # Not api.authentication.auth_cache_settings: it would load simplejwt into every management command.
+    options = {'ALIAS': 'default', 'TIMEOUT': 60, **getattr(settings, 'CRM_AUTH_CACHE', {})}
+    if not options['TIMEOUT']:
+        return []
+    backend = settings.CACHES.get(options['ALIAS'], {}).get('BACKEND')
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            f"CRM_AUTH_CACHE is on but its cache {options['ALIAS']!r} ({backend}) is not shared between workers, "
+            f"so a user changed in one worker keeps their cached tokens in the others.",
+            hint="Set REDIS_URL (or point CRM_AUTH_CACHE['ALIAS'] at a shared cache), or set CRM_AUTH_CACHE_SECONDS=0.",
+            id='api.E002',
+        )]
+    return []
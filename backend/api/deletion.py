@@ -0,0 +1,100 @@
+"""
+Deleting contacts with many tasks.
+
+`Contact.delete()` and `ContactQuerySet.delete()` remove the tasks of a
+contact in the same transaction as the contact and log a change for each of
+them, so a contact with 100k tasks means one long transaction that holds
+every task row lock, and 100k task ids and change log rows in memory, until
+it commits. `delete_contacts` deletes the tasks first, in chunks of
+`chunk_size` that each commit on their own with `open_tasks_count`,
+StatCounter and the change log updated for the chunk, then the archived
+tasks and finally the contacts. Tasks added
+to a contact meanwhile go with the contact, through the regular cascade.
+If the delete stops half way, the contact is still there with fewer tasks
+and deleting it again finishes the job.
+"""
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import F
+
+from api.models import (
+    ArchivedTask, ChangeAction, Contact, Task, apply_stat_deltas, bump_open_tasks_count, log_change, recording_changes, stat_counts,
+)
+from api.signals import notify_data_changed
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def delete_task_chunk(contact_pks, chunk_size):
+    """Delete up to `chunk_size` live tasks of the contacts; return how many were deleted."""
+    table = connection.ops.quote_name(Task._meta.db_table)
+    placeholders = ', '.join(['%s'] * len(contact_pks))
+    with recording_changes():
+        # One statement finds, deletes and returns the rows: no ids sent back in IN lists, no instances.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE id IN (SELECT id FROM {table} WHERE contact_id IN ({placeholders}) LIMIT %s) '
+                f'RETURNING id, contact_id, {", ".join(Task.STAT_FIELDS)}',
+                [*contact_pks, chunk_size],
+            )
+            rows = cursor.fetchall()
+        if not rows:
+            return 0
+        fields = [Task._meta.get_field(name) for name in Task.STAT_FIELDS]
+        deltas, open_tasks = Counter(), Counter()
+        for pk, contact_id, *values in rows:
+            values = [field.to_python(value) for field, value in zip(fields, values)]
+            deltas.subtract(Task.stat_keys(*values))
+            if not values[Task.STAT_FIELDS.index('is_done')]:
+                open_tasks[contact_id] += 1
+        by_count = {}
+        for contact_id, count in open_tasks.items():
+            by_count.setdefault(count, []).append(contact_id)
+        for count, pks in sorted(by_count.items()):
+            bump_open_tasks_count(pks, F('open_tasks_count') - count)
+        apply_stat_deltas(deltas)
+        log_change(Task, ChangeAction.DELETED, [row[0] for row in rows])
+    notify_data_changed(Task)
+    return len(rows)
+
+
+def delete_archived_chunk(contact_pks, chunk_size):
+    """Delete up to `chunk_size` archived tasks of the contacts; return how many were deleted."""
+    with transaction.atomic():
+        # Locked first, so a concurrent delete of the same rows can't count them out of StatCounter twice.
+        ids = list(
+            ArchivedTask.objects.filter(contact__in=contact_pks).order_by()
+            .select_for_update().values_list('pk', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return 0
+        archived = ArchivedTask.objects.filter(pk__in=ids)
+        deltas = stat_counts(archived, -1)
+        deleted, _ = archived.delete()
+        apply_stat_deltas(deltas)
+    return deleted
+
+
+def delete_contacts(pks, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Delete the contacts `pks` with their tasks, in short transactions; return
+    the pks deleted. `progress(tasks deleted so far)` is called after each chunk.
+    """
+    pks = sorted({int(pk) for pk in pks})
+    if not pks:
+        return []
+    deleted_tasks = 0
+    for delete_chunk in (delete_task_chunk, delete_archived_chunk):
+        while True:
+            deleted = delete_chunk(pks, chunk_size)
+            deleted_tasks += deleted
+            if progress and deleted:
+                progress(deleted_tasks)
+            if deleted < chunk_size:
+                break
+    with transaction.atomic():
+        deleted = list(Contact.objects.filter(pk__in=pks).order_by('pk').select_for_update().values_list('pk', flat=True))
+        if deleted:
+            Contact.objects.filter(pk__in=deleted).delete()
+    return deleted
@@ -0,0 +1,420 @@
+"""
+Duplicate contact detection and merging.
+
+The unique constraints on `Contact.phone` and `Contact.email` only stop
+exact repeats. Here phones are reduced to their last PHONE_DIGITS digits,
+emails are lowercased without `+tags` (and without dots for Gmail) and
+names are casefolded, stripped of accents and punctuation, and have their
+words sorted. Each contact gets blocking keys (`ContactKey`), 64-bit hashes
+of:
+
+- its normalized phone, its normalized email and all three fields together;
+- its name's skeleton: every word without its later vowels and doubled
+  letters ("Mohammed" and "Mohamad" are both "mhmd");
+- NAME_BANDS MinHash bands of NAME_ROWS rows over the character trigrams of
+  its name. Two names share a band with a probability that grows with
+  their trigram overlap, so spelling variants meet without comparing every
+  name with every other.
+
+Only contacts that share a key are compared, and keys held by more than
+MAX_BLOCK contacts (a common name) are skipped. The work is therefore
+proportional to the contacts scanned times the block size, not to the square
+of the book. A compared pair scores NAME_WEIGHT times the name similarity
+(trigram Jaccard, at least SKELETON_SIMILARITY for equal skeletons), plus
+MATCH_WEIGHT per equal phone or email, minus CONFLICT_PENALTY per phone or
+email that both contacts have and that differs. Pairs scoring MIN_SCORE or
+more are stored as `DuplicatePair`s.
+
+`refresh_duplicates` (`manage.py find_duplicates`) rebuilds everything on
+its first run. After that it rescans only the contacts the change log
+(`api.changes`) shows changed since the last refresh, and then only those
+whose keys changed. Pairs of deleted contacts go with them.
+`merge_contacts` folds duplicates into one contact.
+"""
+import hashlib
+import unicodedata
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from api.changes import sequence_state
+from api.models import (
+    ArchivedTask, Change, Contact, ContactKey, DuplicateIndexState, DuplicatePair, Task, apply_stat_deltas,
+    recording_changes, stat_counts,
+)
+
+DEFAULTS = {
+    'PHONE_DIGITS': 9,
+    'NAME_BANDS': 4,
+    'NAME_ROWS': 2,
+    'MAX_BLOCK': 100,
+    'MIN_SCORE': 0.5,
+    'CHUNK_SIZE': 1000,
+}
+NAME_WEIGHT = 0.5
+MATCH_WEIGHT = 0.35
+CONFLICT_PENALTY = 0.15
+SKELETON_SIMILARITY = 0.9
+VOWELS = frozenset('aeiouy')
+MASK = (1 << 64) - 1
+
+Features = namedtuple('Features', 'name grams skeleton phone email')
+
+
+def duplicates_settings():
+    return {**DEFAULTS, **getattr(settings, 'CRM_DUPLICATES', {})}
+
+
+# ---------------------------------------------------------------------------
+# Normalization and keys
+# ---------------------------------------------------------------------------
+
+def normalize_phone(phone, digits=DEFAULTS['PHONE_DIGITS']):
+    """The last `digits` digits of `phone`, so that `+962791234567` and `0791234567` match; '' if too short."""
+    number = ''.join(ch for ch in phone or '' if ch.isdigit())
+    return number[-digits:] if len(number) >= min(digits, 7) else ''
+
+
+def normalize_email(email):
+    """`email` lowercased and without a `+tag`; Gmail addresses also without dots in the local part."""
+    local, _, domain = (email or '').strip().lower().rpartition('@')
+    if not local or not domain:
+        return ''
+    local = local.split('+', 1)[0]
+    if domain in ('gmail.com', 'googlemail.com'):
+        local, domain = local.replace('.', ''), 'gmail.com'
+    return f'{local}@{domain}'
+
+
+def normalize_name(name):
+    """`name` casefolded, without accents or punctuation, words sorted: "Al-Zoubi, Ahmad" is "ahmad al zoubi"."""
+    text = ''.join(ch for ch in unicodedata.normalize('NFKD', name or '') if not unicodedata.combining(ch))
+    return ' '.join(sorted(''.join(ch if ch.isalnum() else ' ' for ch in text.casefold()).split()))
+
+
+def skeleton(word):
+    """`word` without its vowels after the first letter and without doubled letters."""
+    letters = [word[0]] + [ch for ch in word[1:] if ch not in VOWELS]
+    return ''.join(ch for i, ch in enumerate(letters) if not i or ch != letters[i - 1])
+
+
+def trigrams(name):
+    return frozenset(
+        padded[i:i + 3] for word in name.split() for padded in [f' {word} '] for i in range(len(padded) - 2)
+    )
+
+
+def features(full_name, phone, email, options):
+    name = normalize_name(full_name)
+    return Features(
+        name=name,
+        grams=trigrams(name),
+        skeleton=' '.join(sorted(skeleton(word) for word in name.split())),
+        phone=normalize_phone(phone, options['PHONE_DIGITS']),
+        email=normalize_email(email),
+    )
+
+
+def hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), 'big')
+
+
+def permutations(count):
+    """`count` fixed `(a, b)` pairs of the multiply-shift hash `(a * x + b) mod 2**64 >> 32`."""
+    return [(hash64(f'a{i}') | 1, hash64(f'b{i}')) for i in range(count)]
+
+
+PERMUTATIONS = {}
+
+
+def name_bands(grams, bands, rows):
+    """The MinHash signature of the trigram set `grams`, cut into `bands` tuples of `rows` values."""
+    if (bands, rows) not in PERMUTATIONS:
+        PERMUTATIONS[bands, rows] = permutations(bands * rows)
+    hashes = [hash64(gram) for gram in grams]
+    signature = [min(((a * x + b) & MASK) >> 32 for x in hashes) for a, b in PERMUTATIONS[bands, rows]]
+    return [tuple(signature[band * rows:(band + 1) * rows]) for band in range(bands)]
+
+
+def blocking_key(kind, value):
+    """A signed 64-bit key (it is stored in a BIGINT) for `value` of `kind`."""
+    return int.from_bytes(hashlib.blake2b(f'{kind}:{value}'.encode(), digest_size=8).digest(), 'big', signed=True)
+
+
+def contact_keys(contact, options):
+    """The blocking keys of a contact's `Features`."""
+    values = [('all', (contact.name, contact.phone, contact.email))]
+    if contact.phone:
+        values.append(('phone', contact.phone))
+    if contact.email:
+        values.append(('email', contact.email))
+    if contact.grams:
+        values.append(('skeleton', contact.skeleton))
+        bands = name_bands(contact.grams, options['NAME_BANDS'], options['NAME_ROWS'])
+        values.extend((f'band{band}', value) for band, value in enumerate(bands))
+    return {blocking_key(kind, value) for kind, value in values}
+
+
+# ---------------------------------------------------------------------------
+# Scoring
+# ---------------------------------------------------------------------------
+
+def name_similarity(a, b):
+    if not a.grams or not b.grams:
+        return 0.0
+    similarity = len(a.grams & b.grams) / len(a.grams | b.grams)
+    if a.skeleton == b.skeleton:
+        similarity = max(similarity, SKELETON_SIMILARITY)
+    return similarity
+
+
+def score_pair(a, b):
+    """`(score between 0 and 1, reasons)` for two contacts' `Features`."""
+    name = name_similarity(a, b)
+    score = NAME_WEIGHT * name
+    reasons = ['name'] if name >= 0.5 else []
+    for field in ('phone', 'email'):
+        mine, theirs = getattr(a, field), getattr(b, field)
+        if mine and theirs:
+            if mine == theirs:
+                score += MATCH_WEIGHT
+                reasons.append(field)
+            else:
+                score -= CONFLICT_PENALTY
+    return round(min(max(score, 0.0), 1.0), 3), reasons
+
+
+def contact_features(pks, options):
+    return {
+        pk: features(full_name, phone, email, options)
+        for pk, full_name, phone, email in Contact.objects.filter(pk__in=pks).values_list('pk', 'full_name', 'phone', 'email')
+    }
+
+
+def refresh_keys(pks, options, compare=True):
+    """Store the keys of the contacts `pks`; return the pks whose keys changed (all of them without `compare`)."""
+    new = {pk: contact_keys(contact, options) for pk, contact in contact_features(pks, options).items()}
+    stored = defaultdict(set)
+    if compare:
+        for pk, key in ContactKey.objects.filter(contact__in=list(new)).values_list('contact_id', 'key'):
+            stored[pk].add(key)
+    changed = [pk for pk, keys in new.items() if keys != stored[pk]]
+    with transaction.atomic():
+        if compare:
+            ContactKey.objects.filter(contact__in=changed).delete()
+        ContactKey.objects.bulk_create(
+            [ContactKey(contact_id=pk, key=key) for pk in changed for key in new[pk]], batch_size=5000,
+        )
+    return changed
+
+
+def find_pairs(pks, scanned, options):
+    """
+    `(DuplicatePairs, pairs compared)` for the contacts `pks` and every contact
+    they share a block of at most MAX_BLOCK contacts with. A pair with another
+    contact for which `scanned(pk)` holds is only taken from its older contact.
+    """
+    blocks = defaultdict(list)
+    for pk, key in ContactKey.objects.filter(contact__in=pks).values_list('contact_id', 'key'):
+        blocks[key].append(pk)
+    sizes = (
+        ContactKey.objects.filter(key__in=list(blocks)).order_by().values('key')
+        .annotate(size=Count('contact')).values_list('key', 'size')
+    )
+    small = [key for key, size in sizes if 1 < size <= options['MAX_BLOCK']]
+    members = defaultdict(list)
+    for key, pk in ContactKey.objects.filter(key__in=small).values_list('key', 'contact_id'):
+        members[key].append(pk)
+
+    candidates = set()
+    for key in small:
+        for pk in blocks[key]:
+            for other in members[key]:
+                if other != pk and not (other < pk and scanned(other)):
+                    candidates.add((min(pk, other), max(pk, other)))
+    found = contact_features({pk for pair in candidates for pk in pair}, options)
+    pairs = []
+    for pk, other in sorted(candidates):
+        if pk not in found or other not in found:
+            continue  # deleted meanwhile
+        score, reasons = score_pair(found[pk], found[other])
+        if score >= options['MIN_SCORE']:
+            pairs.append(DuplicatePair(contact_id=pk, other_id=other, score=score, reasons=reasons))
+    return pairs, len(candidates)
+
+
+def contact_chunks(chunk_size):
+    """Every contact pk, in ascending chunks of `chunk_size`."""
+    last = 0
+    while True:
+        chunk = list(Contact.objects.filter(pk__gt=last).order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]
+
+
+def refresh_duplicates(full=False, chunk_size=None, progress=None):
+    """
+    Bring the keys and pairs up to date with the contact changes logged since
+    the last refresh, or rebuild them with `full` (and on the first run).
+    `progress(stage, contacts done)` is called after each chunk. Return counts.
+    """
+    options = duplicates_settings()
+    chunk_size = chunk_size or options['CHUNK_SIZE']
+    last_seq, _ = sequence_state()
+    state, _ = DuplicateIndexState.objects.get_or_create(pk=1)
+    full = full or state.refreshed_at is None
+    scanned, compared, stored = 0, 0, 0
+
+    if full:
+        DuplicatePair.objects.all().delete()
+        ContactKey.objects.all().delete()
+        for chunk in contact_chunks(chunk_size):
+            scanned += len(refresh_keys(chunk, options, compare=False))
+            if progress:
+                progress('keys', scanned)
+        chunks, is_scanned = contact_chunks(chunk_size), lambda pk: True
+    else:
+        # Change.seq becomes visible in commit order, so nothing at or below `last_seq` is still to come.
+        logged = sorted(set(
+            Change.objects.filter(model=Contact._meta.model_name, seq__gt=state.seq, seq__lte=last_seq)
+            .values_list('object_id', flat=True)
+        ))
+        changed = []
+        for start in range(0, len(logged), chunk_size):
+            changed.extend(refresh_keys(logged[start:start + chunk_size], options))
+            if progress:
+                progress('keys', len(changed))
+        for start in range(0, len(changed), chunk_size):
+            chunk = changed[start:start + chunk_size]
+            DuplicatePair.objects.filter(Q(contact__in=chunk) | Q(other__in=chunk)).delete()
+        scanned = len(changed)
+        chunks = (changed[start:start + chunk_size] for start in range(0, len(changed), chunk_size))
+        is_scanned = set(changed).__contains__
+
+    done = 0
+    for chunk in chunks:
+        pairs, count = find_pairs(chunk, is_scanned, options)
+        DuplicatePair.objects.bulk_create(pairs, batch_size=1000, ignore_conflicts=True)
+        compared += count
+        stored += len(pairs)
+        done += len(chunk)
+        if progress:
+            progress('pairs', done)
+
+    DuplicateIndexState.objects.filter(pk=1).update(seq=last_seq, refreshed_at=timezone.now())
+    return {'full': full, 'contacts': scanned, 'compared': compared, 'pairs': stored}
+
+
+# ---------------------------------------------------------------------------
+# Merging
+# ---------------------------------------------------------------------------
+
+def suffixed(title, n):
+    """`title (n)`, cut to fit Task.title."""
+    suffix = f' ({n})'
+    return title[:Task._meta.get_field('title').max_length - len(suffix)] + suffix
+
+
+def merge_contacts(target_pk, pks, title_conflicts='rename'):
+    """
+    Fold the contacts `pks` into `target_pk` in one transaction: move their live
+    and archived tasks to it with one UPDATE each, fill its empty phone and
+    email from the first of them that has one, and delete them.
+
+    A moved task whose title the target already has (unique_task_title_per_contact)
+    is renamed "<title> (2)", "(3)"..., or deleted with `title_conflicts='drop'`.
+    Moved archived tasks follow the same rule against the target's live titles,
+    so restoring one can't break the constraint. Contacts deleted meanwhile are
+    left out. Return what was done, with the target as it is after the merge.
+    """
+    pks = sorted(set(pks) - {target_pk})
+    with recording_changes():
+        # FOR UPDATE also holds off tasks being added to the merged contacts until the merge commits.
+        contacts = {
+            contact.pk: contact
+            for contact in Contact.objects.filter(pk__in=[target_pk, *pks]).order_by('pk').select_for_update()
+        }
+        target = contacts[target_pk]
+        pks = [pk for pk in pks if pk in contacts]
+
+        titles = set(Task.objects.filter(contact=target_pk).values_list('title', flat=True))
+        incoming = list(Task.objects.filter(contact__in=pks).order_by('contact_id', 'id').values_list('pk', 'contact_id', 'title'))
+        incoming_archived = list(
+            ArchivedTask.objects.filter(contact__in=pks).order_by('contact_id', 'id').values_list('pk', 'contact_id', 'title')
+        )
+        taken = titles | {title for _, _, title in incoming + incoming_archived} | set(
+            ArchivedTask.objects.filter(contact=target_pk).values_list('title', flat=True)
+        )
+
+        def resolve(tasks, live):
+            """Split `tasks` into `({pk: (contact_id, new title)}, [dropped pks])` against the live `titles`."""
+            renamed, dropped = {}, []
+            for pk, contact_id, title in tasks:
+                if title not in titles:
+                    if live:
+                        titles.add(title)
+                elif title_conflicts == 'drop':
+                    dropped.append(pk)
+                else:
+                    n = 2
+                    while suffixed(title, n) in taken:
+                        n += 1
+                    renamed[pk] = (contact_id, suffixed(title, n))
+                    taken.add(renamed[pk][1])
+                    if live:
+                        titles.add(renamed[pk][1])
+            return renamed, dropped
+
+        renamed, dropped = resolve(incoming, live=True)
+        renamed_archived, dropped_archived = resolve(incoming_archived, live=False)
+
+        if dropped:
+            Task.objects.filter(pk__in=dropped).delete()
+        if renamed:
+            # New titles are unique across the target and every merged contact, so the renames cannot collide.
+            Task.objects.bulk_update(
+                [Task(pk=pk, contact_id=contact_id, title=title) for pk, (contact_id, title) in renamed.items()],
+                ['title'], batch_size=500,
+            )
+        if dropped_archived:
+            # Archived tasks still count in StatCounter; their queryset does not adjust it.
+            archived = ArchivedTask.objects.filter(pk__in=dropped_archived)
+            deltas = stat_counts(archived, -1)
+            archived.delete()
+            apply_stat_deltas(deltas)
+        if renamed_archived:
+            ArchivedTask.objects.bulk_update(
+                [ArchivedTask(pk=pk, title=title) for pk, (_, title) in renamed_archived.items()], ['title'], batch_size=500,
+            )
+        moved = Task.objects.filter(contact__in=pks).update(contact_id=target_pk) if pks else 0
+        moved_archived = ArchivedTask.objects.filter(contact__in=pks).update(contact_id=target_pk) if pks else 0
+
+        filled = {}
+        for field in ('phone', 'email'):
+            if not getattr(target, field):
+                filled[field] = next((getattr(contacts[pk], field) for pk in pks if getattr(contacts[pk], field)), None)
+        filled = {field: value for field, value in filled.items() if value}
+        if pks:
+            Contact.objects.filter(pk__in=pks).delete()
+        if filled:
+            for field, value in filled.items():
+                setattr(target, field, value)
+            target.save(update_fields=list(filled))
+        # The moves changed open_tasks_count in the database, not on the instance loaded above.
+        target.refresh_from_db()
+
+    return {
+        'contact': target,
+        'merged': pks,
+        'moved_tasks': moved,
+        'moved_archived_tasks': moved_archived,
+        'renamed_tasks': {pk: title for pk, (_, title) in renamed.items()},
+        'dropped_tasks': dropped,
+        'renamed_archived_tasks': {pk: title for pk, (_, title) in renamed_archived.items()},
+        'dropped_archived_tasks': dropped_archived,
+    }
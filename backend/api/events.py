@@ -0,0 +1,365 @@
+"""
+Server-sent events behind `GET /api/events/` (ASGI only, see `config/asgi.py`).
+
+A client keeps one connection open and receives every Contact and Task
+change as it commits, as the entries of `/api/changes/` (`api.changes`) in
+SSE frames whose `id` is the change's sequence number; `?contact=<id>`
+narrows the stream to one contact and its tasks. A reconnecting EventSource
+sends its last id as `Last-Event-ID` and is first replayed what it missed
+from the change log, so a dropped connection loses nothing. If the log no
+longer reaches back that far, the stream sends a `reset` event (reload,
+then carry on).
+
+Each worker process runs one `Hub`. It renders committed changes into
+frames once per batch (one query, whatever the number of clients) and
+offers them to the bounded queue of every matching stream. A stream that
+falls `QUEUE_SIZE` frames behind is closed instead of slowing down the
+others or buffering without limit; its client reconnects and catches up
+from the log.
+
+`CRM_EVENTS['BACKEND']` decides when the hub reads the change log (which
+also publishes the changes committed since the last read):
+`ChangeLogBackend` (the default) polls it every `POLL_INTERVAL` seconds
+while streams are open, so every worker sees every worker's writes;
+`LocalBackend` reads it as soon as a write of its own process commits, for
+single-process servers and tests.
+"""
+import asyncio
+import logging
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.module_loading import import_string
+from django.views import View
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from api.asyncviews import AsyncReadView
+from api.authentication import QueryParamJWTAuthentication
+from api.changes import read_changes, render_changes, sequence_state
+from api.models import Change, Contact, publish_changes
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'BACKEND': 'api.events.ChangeLogBackend',
+    'POLL_INTERVAL': 0.5,
+    'QUEUE_SIZE': 1000,
+    'MAX_CLIENTS': 5000,
+    'HEARTBEAT': 15,
+    'RETRY_MS': 3000,
+}
+REPLAY_PAGE = 1000
+POLL_LIMIT = 10000
+CLOSED = object()
+PING = (None, b': ping\n\n')
+
+
+def events_settings():
+    return {**DEFAULTS, **getattr(settings, 'CRM_EVENTS', {})}
+
+
+def sse_frame(entry):
+    return b'id: %d\ndata: %s\n\n' % (entry['seq'], JSONRenderer().render(entry))
+
+
+def render_batch(changes):
+    try:
+        return render_changes(sorted(changes))
+    except DatabaseError:
+        connection.close_if_unusable_or_obsolete()
+        raise
+
+
+def changes_after(seq):
+    publish_changes()
+    return list(
+        Change.objects.filter(seq__gt=seq).order_by('seq')
+        .values_list('seq', 'model', 'object_id', 'action')[:POLL_LIMIT]
+    )
+
+
+class Subscriber:
+    """One open stream: up to `queue_size` pending `(seq, frame)` items and the contact it is limited to, if any."""
+
+    def __init__(self, contact, queue_size):
+        self.contact = contact
+        self.queue_size = queue_size
+        self.items = deque()
+        self.ready = asyncio.Event()
+        self.closed = False
+
+    def wants(self, entry):
+        if self.contact is None:
+            return True
+        if entry['type'] == 'contact':
+            return entry['id'] == self.contact
+        # The contact of a deleted task is no longer known; contact streams get every task deletion.
+        return 'data' not in entry or entry['data']['contact'] == self.contact
+
+    def offer(self, item):
+        if self.closed:
+            return
+        if len(self.items) >= self.queue_size:
+            self.close()
+            return
+        self.items.append(item)
+        self.ready.set()
+
+    def close(self):
+        """Drop the backlog and end the stream; the client resumes from its last id."""
+        self.closed = True
+        self.items.clear()
+        self.items.append(CLOSED)
+        self.ready.set()
+
+    def take(self):
+        """Remove and return everything pending."""
+        items = list(self.items)
+        self.items.clear()
+        self.ready.clear()
+        return items
+
+
+class ChangeLogBackend:
+    """Polls the shared change log, so the hub of every worker sees the changes committed by all of them."""
+
+    def __init__(self, options):
+        self.interval = options['POLL_INTERVAL']
+        self.task = None
+
+    async def start(self, hub):
+        last, _ = await sync_to_async(sequence_state)()
+        self.task = asyncio.create_task(self.poll(hub, last))
+
+    def changes_committed(self):
+        pass  # `poll` reads them back from the log
+
+    def stop(self):
+        if self.task is not None and not self.task.get_loop().is_closed():
+            self.task.cancel()
+
+    async def wait(self):
+        await asyncio.sleep(self.interval)
+
+    async def poll(self, hub, last):
+        while True:
+            try:
+                changes = await sync_to_async(changes_after)(last)
+            except DatabaseError:
+                logger.exception('Could not poll the change log')
+                changes = []
+            if changes:
+                last = changes[-1][0]
+                hub.deliver(changes)
+            if len(changes) < POLL_LIMIT:
+                await self.wait()
+
+
+class LocalBackend(ChangeLogBackend):
+    """Reads the change log when a write of this process commits instead of on a timer."""
+
+    def __init__(self, options):
+        super().__init__(options)
+        self.loop = self.committed = None
+
+    async def start(self, hub):
+        self.loop = asyncio.get_running_loop()
+        self.committed = asyncio.Event()
+        await super().start(hub)
+
+    def changes_committed(self):
+        """Wake `poll`; callable from any thread. Commits that land while it reads are caught by the next read."""
+        try:
+            self.loop.call_soon_threadsafe(self.committed.set)
+        except RuntimeError:
+            pass  # the loop has been closed
+
+    async def wait(self):
+        await self.committed.wait()
+        self.committed.clear()
+
+
+class Hub:
+    """Fans committed changes out to the streams of this process, on the event loop they run on."""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.loop = self.batches = self.backend = self.started = self.dispatcher = self.heartbeat = None
+
+    def full(self):
+        return len(self.subscribers) >= events_settings()['MAX_CLIENTS']
+
+    async def subscribe(self, contact=None):
+        options = events_settings()
+        subscriber = Subscriber(contact, options['QUEUE_SIZE'])
+        self.subscribers.add(subscriber)
+        try:
+            if self.started is None:
+                self.started = asyncio.ensure_future(self.start(options))
+            await asyncio.shield(self.started)
+        except BaseException:
+            self.unsubscribe(subscriber)
+            raise
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+        if not self.subscribers:
+            self.stop()
+
+    async def start(self, options):
+        self.loop = asyncio.get_running_loop()
+        self.batches = asyncio.Queue()
+        self.backend = import_string(options['BACKEND'])(options)
+        await self.backend.start(self)
+        self.dispatcher = asyncio.create_task(self.dispatch())
+        self.heartbeat = asyncio.create_task(self.beat(options['HEARTBEAT']))
+
+    def stop(self):
+        """Close every stream and stop the backend; the next subscriber starts them again."""
+        for subscriber in list(self.subscribers):
+            subscriber.close()
+        self.subscribers.clear()
+        for task in (self.started, self.dispatcher, self.heartbeat):
+            if task is not None and not task.get_loop().is_closed():
+                task.cancel()
+        if self.backend is not None:
+            self.backend.stop()
+        self.loop = self.batches = self.backend = self.started = self.dispatcher = self.heartbeat = None
+
+    def deliver(self, changes):
+        if self.batches is not None:
+            self.batches.put_nowait(changes)
+
+    async def dispatch(self):
+        while True:
+            changes = list(await self.batches.get())
+            while not self.batches.empty():
+                changes += self.batches.get_nowait()
+            try:
+                entries = await sync_to_async(render_batch)(changes)
+            except Exception:
+                logger.exception('Could not render change events; closing the streams so they replay them')
+                for subscriber in list(self.subscribers):
+                    subscriber.close()
+                continue
+            self.fan_out(entries)
+
+    async def beat(self, interval):
+        """Keep idle connections (and the proxies in between) open with an SSE comment."""
+        while True:
+            await asyncio.sleep(interval)
+            for subscriber in list(self.subscribers):
+                subscriber.offer(PING)
+
+    def fan_out(self, entries):
+        subscribers = list(self.subscribers)
+        for entry in entries:
+            item = (entry['seq'], sse_frame(entry))
+            for subscriber in subscribers:
+                if subscriber.wants(entry):
+                    subscriber.offer(item)
+
+
+hub = Hub()
+
+
+def forward_changes():
+    """Tell this process's hub that a transaction logged changes (connected in `api.receivers`)."""
+    backend = hub.backend
+    if backend is not None:
+        backend.changes_committed()
+
+
+class EventStreamAuthView(APIView):
+    """Authentication and permissions of `/api/events/`; also accepts `?access_token=`."""
+    authentication_classes = [*api_settings.DEFAULT_AUTHENTICATION_CLASSES, QueryParamJWTAuthentication]
+
+    def perform_content_negotiation(self, request, force=False):
+        # EventSource asks for text/event-stream; errors are JSON regardless.
+        return JSONRenderer(), JSONRenderer.media_type
+
+    def get_stream_params(self, request):
+        """`(contact id or None, cursor or None)` from `?contact=`, `Last-Event-ID` or `?since=`."""
+        params = {}
+        for name, value in (
+            ('contact', request.query_params.get('contact')),
+            ('since', request.headers.get('Last-Event-ID') or request.query_params.get('since')),
+        ):
+            if value is None or value == '':
+                params[name] = None
+                continue
+            try:
+                params[name] = int(value)
+                if params[name] < 0:
+                    raise ValueError
+            except ValueError:
+                raise ValidationError({name: ['A valid non-negative integer is required.']})
+        if params['contact'] is not None and not Contact.objects.filter(pk=params['contact']).exists():
+            raise NotFound('Contact not found.')
+        return params['contact'], params['since']
+
+
+class EventStreamView(View):
+    """`GET /api/events/`: the change stream of this worker's hub."""
+
+    async def get(self, request):
+        view = EventStreamAuthView()
+        view.args, view.kwargs = (), {}
+        drf_request = view.initialize_request(request)
+        view.request = drf_request
+        view.headers = view.default_response_headers
+        try:
+            # Authentication and the contact lookup query the database; run them in a thread.
+            await sync_to_async(view.initial)(drf_request)
+            contact, since = await sync_to_async(view.get_stream_params)(drf_request)
+        except Exception as exc:
+            response = view.finalize_response(drf_request, view.handle_exception(exc))
+            return AsyncReadView.rendered(request, response)
+        if hub.full():
+            return JsonResponse(
+                {'detail': 'Too many open event streams; retry later.'}, status=503, headers={'Retry-After': '5'})
+        response = StreamingHttpResponse(self.stream(contact, since), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # nginx: pass frames through as they come
+        return response
+
+    @staticmethod
+    async def stream(contact, since):
+        options = events_settings()
+        # Subscribe before reading the log, so every later commit reaches the queue.
+        subscriber = await hub.subscribe(contact)
+        try:
+            last, pruned_through = await sync_to_async(sequence_state)()
+            yield b'retry: %d\n\n' % options['RETRY_MS']
+            if since is None:
+                since = last
+            elif 0 < since < pruned_through:
+                yield b'event: reset\ndata: {}\n\n'
+                since = last
+            else:
+                has_more = True
+                while has_more:
+                    entries, since, has_more = await sync_to_async(read_changes)(since, REPLAY_PAGE)
+                    for entry in entries:
+                        if subscriber.wants(entry):
+                            yield sse_frame(entry)
+
+            while True:
+                await subscriber.ready.wait()
+                # Everything pending goes out as one chunk, so a stream that fell behind catches up in fewer writes.
+                items = subscriber.take()
+                if CLOSED in items:
+                    return
+                # Frames up to `since` were replayed from the log; pings have no seq.
+                chunk = b''.join(frame for seq, frame in items if seq is None or seq > since)
+                if chunk:
+                    yield chunk
+        finally:
+            hub.unsubscribe(subscriber)
@@ -0,0 +1,100 @@
+"""
+`?expand=tasks` and `?fields=` for ContactViewSet.
+
+`expand=tasks` embeds each contact's tasks (newest first) using one
+`Prefetch` per request, so a page of contacts costs the same number of
+queries whatever its size. The embedded tasks can be narrowed with
+`tasks_is_done`, `tasks_priority` and `tasks_limit` (at most
+`expand_tasks_max_limit`, which is also the default).
+
+`fields=id,full_name,tasks.title` is a sparse fieldset: plain names select
+contact fields, `tasks.<name>` selects embedded task fields. Only the
+selected columns are loaded (`.only()`), plus what ordering needs.
+"""
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from api.models import PriorityChoice, Task
+from api.serializers import ContactTaskSerializer
+
+EXPANSIONS = ('tasks',)
+
+
+def split_param(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+class ExpandTasksMixin:
+    expand_actions = ('list', 'retrieve')
+    expand_tasks_max_limit = 100
+
+    def get_expansion(self):
+        """Parse and validate the expansion params once per request."""
+        if hasattr(self, '_expansion'):
+            return self._expansion
+        params = self.request.query_params
+        expand = set(split_param(params.get('expand', '')))
+        unknown = expand - set(EXPANSIONS)
+        if unknown:
+            raise ValidationError({'expand': [f"Unknown expansion: {', '.join(sorted(unknown))}. Choose from: tasks."]})
+
+        fields, task_fields = [], []
+        for name in split_param(params.get('fields', '')):
+            if name.startswith('tasks.'):
+                task_fields.append(name[len('tasks.'):])
+            else:
+                fields.append(name)
+        self.check_fields('fields', fields, self.get_serializer_class().Meta.fields)
+        self.check_fields('fields', task_fields, ContactTaskSerializer.Meta.fields, prefix='tasks.')
+        if fields and 'tasks' in expand:
+            fields.append('tasks')
+
+        self._expansion = {'expand': expand, 'fields': fields, 'task_fields': task_fields}
+        return self._expansion
+
+    @staticmethod
+    def check_fields(param, names, available, prefix=''):
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise ValidationError({param: [f"Unknown field: {', '.join(prefix + name for name in unknown)}."]})
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if getattr(self, 'action', None) in self.expand_actions:
+            context.update(self.get_expansion())
+        return context
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if getattr(self, 'action', None) not in self.expand_actions:
+            return queryset
+        expansion = self.get_expansion()
+        if expansion['fields']:
+            model_fields = {field.name for field in queryset.model._meta.concrete_fields}
+            columns = {name for name in expansion['fields'] if name in model_fields}
+            queryset = queryset.only('id', *columns, *self.ordering_fields)
+        if 'tasks' in expansion['expand']:
+            queryset = queryset.prefetch_related(self.tasks_prefetch(expansion['task_fields']))
+        return queryset
+
+    def tasks_prefetch(self, task_fields):
+        params = self.request.query_params
+        tasks = Task.objects.order_by('-created_at', '-id')
+        if 'tasks_is_done' in params:
+            tasks = tasks.filter(is_done=self.parse_param('tasks_is_done', serializers.BooleanField()))
+        if 'tasks_priority' in params:
+            tasks = tasks.filter(priority=self.parse_param(
+                'tasks_priority', serializers.ChoiceField(choices=PriorityChoice.choices)))
+        if task_fields:
+            tasks = tasks.only('id', 'contact_id', *task_fields)
+        limit = self.expand_tasks_max_limit
+        if 'tasks_limit' in params:
+            limit = self.parse_param('tasks_limit', serializers.IntegerField(min_value=1, max_value=limit))
+        return Prefetch('tasks', queryset=tasks[:limit], to_attr='expanded_tasks')
+
+    def parse_param(self, name, field):
+        try:
+            return field.run_validation(self.request.query_params[name])
+        except serializers.ValidationError as exc:
+            raise ValidationError({name: exc.detail})
@@ -0,0 +1,132 @@
+"""
+Streaming CSV / NDJSON export for ContactViewSet and TaskViewSet.
+
+Rows are read with `.values_list().iterator(chunk_size=...)` (a server-side
+cursor on PostgreSQL) and encoded in small batches, so memory use stays flat
+regardless of how many rows are exported. Under ASGI the chunks are handed
+to the server as an async iterator (`aiterate`), since Django reads a sync
+streaming body into a list before sending any of it.
+"""
+import csv
+import json
+from datetime import date, datetime
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+
+from api.jobs import accepted, background_requested, enqueue
+
+
+def encode_value(value):
+    """Format a column value the way the API serializers render it."""
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        text = value.isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+class Echo:
+    """File-like object whose `write` returns the value, for `csv.writer`."""
+
+    def write(self, value):
+        return value
+
+
+def encode_csv(columns, rows, batch_size=500):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    batch = []
+    for row in rows:
+        batch.append(writer.writerow([
+            '' if value is None else encode_value(value) for value in row
+        ]))
+        if len(batch) >= batch_size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def encode_ndjson(columns, rows, batch_size=500):
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    batch = []
+    for row in rows:
+        batch.append(dumps(dict(zip(columns, map(encode_value, row)))) + '\n')
+        if len(batch) >= batch_size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+async def aiterate(chunks):
+    """
+    `chunks` as an async iterator, each chunk made in the request's sync
+    thread, where the view ran and the rows' database cursor lives.
+    """
+    chunks = iter(chunks)
+    produce = sync_to_async(next)
+    try:
+        while (chunk := await produce(chunks, None)) is not None:
+            yield chunk
+    finally:
+        if hasattr(chunks, 'close'):
+            await sync_to_async(chunks.close)()
+
+
+EXPORT_FORMATS = {
+    'csv': (encode_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (encode_ndjson, 'application/x-ndjson; charset=utf-8'),
+}
+
+
+class ExportMixin:
+    """
+    Adds `GET <list url>/export/?export_format=csv|ndjson` to a viewset.
+
+    The export honours the same filter, search and ordering params as the list
+    endpoint but is not paginated. `export_fields` maps output column names to
+    model field paths. `?background=true` writes the file in a job instead, to
+    be fetched from `/api/jobs/<id>/download/`.
+    """
+    export_name = 'export'
+    export_fields = {}
+    export_chunk_size = 2000
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({'export_format': [f"Choose one of: {', '.join(EXPORT_FORMATS)}."]})
+        encoder, content_type = EXPORT_FORMATS[export_format]
+
+        if background_requested(request):
+            self.filter_queryset(self.get_queryset())  # reject bad filters now rather than in the job
+            query = request.query_params.copy()
+            query.pop('background')
+            job = enqueue('export', {
+                'model': self.queryset.model._meta.model_name, 'query': query.urlencode(), 'format': export_format,
+            }, user=request.user)
+            return accepted(request, job)
+
+        columns, rows = self.export_rows()
+        chunks = encoder(columns, rows)
+        if isinstance(request._request, ASGIRequest):
+            chunks = aiterate(chunks)
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{self.export_name}.{export_format}"'
+        return response
+
+    def export_rows(self):
+        """`(column names, row tuple iterator)` for the current request's filters."""
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = queryset.values_list(*self.export_fields.values()).iterator(chunk_size=self.export_chunk_size)
+        return list(self.export_fields), rows
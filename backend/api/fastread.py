@@ -0,0 +1,197 @@
+"""
+Read-only fast path for the `list` and `retrieve` endpoints.
+
+Plain JSON reads skip model instances and the serializer: rows are fetched
+with `.values_list(named=True)` and turned into dicts by a row converter
+compiled once per viewset and field selection from the serializer's own
+field types, so the output is the same as the serializer's. Responses built
+this way are encoded with orjson when it is installed (see
+`FastJSONRenderer`), byte for byte like DRF's `JSONRenderer`.
+
+Requests the fast path does not cover (other renderers, `?expand=`,
+object-level permissions) take the regular serializer path. Set
+`CRM_FAST_READS = False` to turn it off everywhere. `alist` / `aretrieve`
+are the async ORM versions used by `api.asyncviews` under ASGI.
+"""
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.http import Http404
+from rest_framework import serializers
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import BasePermission
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601, api_settings
+
+from api.export import encode_value
+
+try:
+    import orjson
+except ImportError:  # optional; JSONRenderer's output is the same, only slower
+    orjson = None
+
+# Field types whose `to_representation` returns database values unchanged.
+PASSTHROUGH_FIELDS = (
+    serializers.CharField, serializers.EmailField, serializers.ChoiceField,
+    serializers.IntegerField, serializers.BooleanField,
+)
+
+
+def fast_reads_enabled():
+    return getattr(settings, 'CRM_FAST_READS', True)
+
+
+def column_encoder(field):
+    """Return a callable for `field` values, or None when they pass through unchanged."""
+    field_type = type(field)
+    if field_type in PASSTHROUGH_FIELDS:
+        return None
+    if field_type is serializers.PrimaryKeyRelatedField and field.pk_field is None:
+        return None
+    if field_type in (serializers.DateTimeField, serializers.DateField):
+        output_format = getattr(field, 'format', None) or getattr(
+            api_settings, 'DATETIME_FORMAT' if field_type is serializers.DateTimeField else 'DATE_FORMAT')
+        if output_format == ISO_8601 and not hasattr(field, 'timezone'):
+            return encode_value
+    return field.to_representation
+
+
+def compile_converter(names, positions, encoders):
+    """Build `convert(row) -> dict` for tuples, as straight-line code."""
+    namespace = {}
+    items = []
+    for name, position, encoder in zip(names, positions, encoders):
+        value = f'row[{position}]'
+        if encoder is not None:
+            namespace[f'encode_{position}'] = encoder
+            value = f'(None if {value} is None else encode_{position}({value}))'
+        items.append(f'{name!r}: {value}')
+    exec(f"def convert(row):\n    return {{{', '.join(items)}}}\n", namespace)
+    return namespace['convert']
+
+
+class FastJSONRenderer(JSONRenderer):
+    """`JSONRenderer` that uses orjson for responses built by `FastReadMixin`."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if (
+            orjson is None or data is None or not getattr(response, 'fast_read', False)
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+            or self.ensure_ascii or not self.compact
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer, so the output is a strict JavaScript subset.
+        return orjson.dumps(data).replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastReadMixin:
+    """
+    Serves JSON `list` / `retrieve` from `fast_read_fields` (output name to
+    field path, in serializer field order) without building model instances.
+    """
+    fast_read_fields = {}
+    renderer_classes = [
+        FastJSONRenderer if renderer is JSONRenderer else renderer for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+    ]
+
+    _converters = {}
+    _converters_lock = threading.Lock()
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_read():
+            return super().list(request, *args, **kwargs)
+        queryset, convert = self.fast_read_queryset()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.fast_read_response(self.get_paginated_response([convert(row) for row in page]))
+        return self.fast_read_response(Response([convert(row) for row in queryset]))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_fast_read() or not self.fast_read_permits_objects():
+            return super().retrieve(request, *args, **kwargs)
+        queryset, convert = self.fast_read_queryset()
+        row = get_object_or_404(queryset, **self.fast_read_lookup())
+        return self.fast_read_response(Response(convert(row)))
+
+    async def alist(self, request, *args, **kwargs):
+        """`list` with the async ORM; callers check `use_fast_read()` first."""
+        queryset, convert = self.fast_read_queryset()
+        if self.paginator is None:
+            page = None
+        elif hasattr(self.paginator, 'apaginate_queryset'):
+            page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+        else:
+            page = await sync_to_async(self.paginate_queryset)(queryset)
+        if page is not None:
+            return self.fast_read_response(self.get_paginated_response([convert(row) for row in page]))
+        return self.fast_read_response(Response([convert(row) async for row in queryset]))
+
+    async def aretrieve(self, request, *args, **kwargs):
+        """`retrieve` with the async ORM; callers check `fast_read_permits_objects()` too."""
+        queryset, convert = self.fast_read_queryset()
+        # Same 404s as DRF's get_object_or_404.
+        try:
+            row = await queryset.aget(**self.fast_read_lookup())
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        except queryset.model.DoesNotExist:
+            raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+        return self.fast_read_response(Response(convert(row)))
+
+    def fast_read_queryset(self):
+        return self.fast_read_rows(self.filter_queryset(self.get_queryset()), self.fast_read_names())
+
+    def fast_read_lookup(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+
+    @staticmethod
+    def fast_read_response(response):
+        response.fast_read = True
+        return response
+
+    def use_fast_read(self):
+        if not fast_reads_enabled() or not self.fast_read_fields:
+            return False
+        if not isinstance(self.request.accepted_renderer, JSONRenderer):
+            return False
+        return not (hasattr(self, 'get_expansion') and self.get_expansion()['expand'])
+
+    def fast_read_permits_objects(self):
+        # Row tuples cannot go through `has_object_permission`; only skip it when it is a no-op.
+        return all(
+            type(permission).has_object_permission is BasePermission.has_object_permission
+            for permission in self.get_permissions()
+        )
+
+    def fast_read_names(self):
+        names = list(self.fast_read_fields)
+        if hasattr(self, 'get_expansion'):
+            selected = self.get_expansion()['fields']
+            if selected:
+                names = [name for name in names if name in selected]
+        return names
+
+    def fast_read_rows(self, queryset, names):
+        """Return the `values_list` queryset and the converter for its rows."""
+        paths = [self.fast_read_fields[name] for name in names]
+        # Keyset pagination reads the ordering columns from the last row.
+        ordering = queryset.query.order_by or getattr(self, 'ordering', None) or ()
+        ordering = [name.lstrip('-') for name in ordering if isinstance(name, str)]
+        columns = list(dict.fromkeys([*paths, *ordering, 'id']))
+        key = (type(self), tuple(names), tuple(columns))
+        convert = self._converters.get(key)
+        if convert is None:
+            fields = self.get_serializer_class()().fields
+            if list(fields) != list(self.fast_read_fields):
+                raise ImproperlyConfigured(
+                    f'{type(self).__name__}.fast_read_fields must list the serializer fields in order.')
+            convert = compile_converter(
+                names, [columns.index(path) for path in paths], [column_encoder(fields[name]) for name in names])
+            with self._converters_lock:
+                self._converters[key] = convert
+        return queryset.values_list(*columns, named=True), convert
@@ -1,6 +1,9 @@
 # api/filters.py
 import django_filters
-from .models import Task
+from django.db import connections
+from django.db.models import Q
+from rest_framework.filters import SearchFilter
+from .models import Task, TaskRecord
 
 
 class TaskFilter(django_filters.FilterSet):
@@ -10,4 +13,32 @@ class TaskFilter(django_filters.FilterSet):
 
     class Meta:
         model = Task
-        fields = ['contact_id', 'is_done', 'priority', 'due_from', 'due_to']
\ No newline at end of file
+        fields = ['contact_id', 'is_done', 'priority', 'due_from', 'due_to']
+
+
+class TaskRecordFilter(TaskFilter):
+    class Meta(TaskFilter.Meta):
+        model = TaskRecord
+
+
+class ContactSearchFilter(SearchFilter):
+    """
+    `?search=` for contacts that PostgreSQL can answer from indexes.
+
+    Every term is DRF's substring match on name, phone and email, served by
+    `pg_trgm` GIN indexes on `UPPER(col)`. A trigram index only helps terms
+    of three or more characters; shorter terms scan the table. Other
+    backends keep DRF's plain `search_fields` behaviour; both return the
+    same rows.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if connections[queryset.db].vendor != 'postgresql':
+            return super().filter_queryset(request, queryset, view)
+        for term in self.get_search_terms(request):
+            queryset = queryset.filter(self.term_query(term))
+        return queryset
+
+    @staticmethod
+    def term_query(term):
+        return Q(full_name__icontains=term) | Q(phone__icontains=term) | Q(email__icontains=term)
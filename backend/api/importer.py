@@ -0,0 +1,253 @@
+"""
+Streaming CSV / NDJSON importer behind the `import_crm` command.
+
+The file is read in chunks. Each chunk is validated with the bulk serializers
+(same rules as the API minus per-row uniqueness queries), then:
+
+* on PostgreSQL, accepted rows are streamed into a temporary staging table
+  with `COPY` and merged into the real table with set-based SQL that rejects
+  rows clashing with existing data or with earlier rows of the file;
+* elsewhere, the chunk goes through the bulk writers (`bulk_create`).
+
+Rejected rows are written as NDJSON (`{"line", "errors", "row"}`) next to
+the input file.
+"""
+import csv
+import io
+import json
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from django.db import IntegrityError, connection
+from django.utils import timezone
+
+from api.bulk import BulkResult, ContactBulkWriter, TaskBulkWriter
+from api.models import (
+    ChangeAction, Contact, Task, apply_stat_deltas, log_change, object_stat_counts, recording_changes,
+    refresh_open_tasks_count,
+)
+from api.serializers import DUPLICATE_EMAIL_MESSAGE, DUPLICATE_PHONE_MESSAGE, DUPLICATE_TASK_TITLE_MESSAGE
+from api.signals import notify_data_changed
+
+
+def read_rows(path):
+    """Yield `(line_number, row)` pairs from a CSV or NDJSON file."""
+    path = Path(path)
+    with path.open(newline='', encoding='utf-8-sig') as handle:
+        if path.suffix.lower() in ('.ndjson', '.jsonl'):
+            for line_number, line in enumerate(handle, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    # Passed on as-is so the serializer rejects it like any other bad row.
+                    row = line.rstrip('\n')
+                yield line_number, row
+        else:
+            reader = csv.DictReader(handle)
+            for row in reader:
+                # Empty cells mean "not provided" so model defaults and NULLs apply.
+                yield reader.line_num, {key: value for key, value in row.items() if value != ''}
+
+
+def copy_literal(value):
+    if value is None:
+        return r'\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+class Importer(ABC):
+    model = None
+    writer_class = None
+    columns = ()
+    staging_ddl = ''
+    conflict_sql = ''
+    extra_insert_columns = ''
+    extra_insert_values = ''
+
+    def __init__(self, chunk_size=5000, use_copy=None):
+        self.chunk_size = chunk_size
+        self.use_copy = connection.vendor == 'postgresql' if use_copy is None else use_copy
+        self.table = connection.ops.quote_name(self.model._meta.db_table)
+        self.staging = connection.ops.quote_name(f'import_staging_{self.model._meta.model_name}')
+        self.imported = 0
+        self.rejected = 0
+
+    def run(self, rows, rejects):
+        """Import `(line, row)` pairs, writing rejects with `rejects(line, errors, row)`."""
+        chunk = []
+        for item in rows:
+            chunk.append(item)
+            if len(chunk) >= self.chunk_size:
+                self.import_chunk(chunk, rejects)
+                chunk = []
+        if chunk:
+            self.import_chunk(chunk, rejects)
+
+    def import_chunk(self, chunk, rejects):
+        lines = [line for line, _ in chunk]
+        rows = [row for _, row in chunk]
+        writer = self.writer_class(chunk_size=len(rows))
+
+        if self.use_copy:
+            result, written = self.merge_chunk(writer, lines, rows)
+        else:
+            result = writer.create(rows)
+            written = len(result.ids)
+
+        self.imported += written
+        self.report(result, lines, rows, rejects)
+
+    def merge_chunk(self, writer, lines, rows):
+        result = BulkResult()
+        accepted = writer.validate(0, rows, result, check_conflicts=False)
+        try:
+            conflicts = self.copy_and_merge([(lines[index], data) for index, data, _ in accepted])
+        except IntegrityError:
+            # A concurrent delete broke a foreign key; let the row-by-row path sort it out.
+            result = writer.create(rows)
+            return result, len(result.ids)
+        line_index = {line: index for index, line in enumerate(lines)}
+        for line, errors in conflicts.items():
+            result.error(line_index[line], errors)
+        return result, len(accepted) - len(conflicts)
+
+    def report(self, result, lines, rows, rejects):
+        for error in result.errors:
+            self.rejected += 1
+            rejects(lines[error['index']], error['errors'], rows[error['index']])
+
+    def copy_and_merge(self, items):
+        if not items:
+            return {}
+        now = timezone.now()
+        buffer = io.StringIO()
+        for line, data in items:
+            values = self.staging_values(self.model(**data), now)
+            buffer.write(','.join(copy_literal(value) for value in (line, *values)) + '\n')
+        buffer.seek(0)
+
+        columns = ', '.join(self.columns)
+        with recording_changes(), connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE IF NOT EXISTS {self.staging} '
+                f'(line_no bigint PRIMARY KEY, {self.staging_ddl})'
+            )
+            cursor.execute(f'TRUNCATE {self.staging}')
+            self.copy(cursor, f"COPY {self.staging} (line_no, {columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+            # Temp tables are never auto-analyzed; without stats the planner guesses badly.
+            cursor.execute(f'ANALYZE {self.staging}')
+            # Block concurrent writers for the short merge so the conflict check stays exact.
+            cursor.execute(f'LOCK TABLE {self.table} IN SHARE ROW EXCLUSIVE MODE')
+            cursor.execute(self.conflict_sql.format(staging=self.staging, table=self.table))
+            conflicts = {line: self.conflict_errors(*flags) for line, *flags in cursor.fetchall()}
+            if conflicts:
+                cursor.execute(f'DELETE FROM {self.staging} WHERE line_no = ANY(%s)', [list(conflicts)])
+            cursor.execute(
+                f'INSERT INTO {self.table} ({columns}{self.extra_insert_columns}) '
+                f'SELECT {columns}{self.extra_insert_values} FROM {self.staging} ORDER BY line_no RETURNING id'
+            )
+            created = [pk for pk, in cursor.fetchall()]
+            apply_stat_deltas(object_stat_counts(self.model(**data) for line, data in items if line not in conflicts))
+            self.after_merge(items, conflicts)
+            log_change(self.model, ChangeAction.CREATED, created)
+        notify_data_changed(self.model)
+        return conflicts
+
+    @staticmethod
+    def copy(cursor, sql, buffer):
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):  # psycopg2
+            raw.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with raw.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+    @abstractmethod
+    def staging_values(self, obj, now):
+        """The staging table row for the validated, unsaved `obj`, in `columns` order."""
+
+    @abstractmethod
+    def conflict_errors(self, *flags):
+        """The row errors for one rejected row, given the clash flags `conflict_sql` selects."""
+
+    def after_merge(self, items, conflicts):
+        pass
+
+
+class ContactImporter(Importer):
+    model = Contact
+    writer_class = ContactBulkWriter
+    columns = ('full_name', 'phone', 'email', 'status', 'created_at')
+    staging_ddl = 'full_name text, phone text, email text, status text, created_at timestamptz'
+    extra_insert_columns = ', open_tasks_count'
+    extra_insert_values = ', 0'
+    conflict_sql = """
+        SELECT line_no, email_taken, phone_taken FROM (
+            SELECT s.line_no,
+                s.email <> '' AND (
+                    s.email_rank > 1
+                    OR EXISTS (SELECT 1 FROM {table} c WHERE c.email = s.email AND c.email <> '')
+                ) AS email_taken,
+                s.phone <> '' AND (
+                    s.phone_rank > 1
+                    OR EXISTS (SELECT 1 FROM {table} c WHERE c.phone = s.phone AND c.phone <> '')
+                ) AS phone_taken
+            FROM (
+                SELECT line_no, email, phone,
+                    row_number() OVER (PARTITION BY email ORDER BY line_no) AS email_rank,
+                    row_number() OVER (PARTITION BY phone ORDER BY line_no) AS phone_rank
+                FROM {staging}
+            ) s
+        ) flagged
+        WHERE email_taken OR phone_taken
+    """
+
+    def staging_values(self, obj, now):
+        return obj.full_name, obj.phone, obj.email, obj.status, now
+
+    def conflict_errors(self, email_taken, phone_taken):
+        errors = {}
+        if email_taken:
+            errors['email'] = [DUPLICATE_EMAIL_MESSAGE]
+        if phone_taken:
+            errors['phone'] = [DUPLICATE_PHONE_MESSAGE]
+        return errors
+
+
+class TaskImporter(Importer):
+    model = Task
+    writer_class = TaskBulkWriter
+    columns = ('contact_id', 'title', 'due_date', 'priority', 'is_done', 'created_at')
+    staging_ddl = 'contact_id bigint, title text, due_date date, priority text, is_done boolean, created_at timestamptz'
+    conflict_sql = """
+        SELECT s.line_no FROM (
+            SELECT line_no, contact_id, title,
+                row_number() OVER (PARTITION BY contact_id, title ORDER BY line_no) AS title_rank
+            FROM {staging}
+        ) s
+        WHERE s.title_rank > 1
+           OR EXISTS (SELECT 1 FROM {table} t WHERE t.contact_id = s.contact_id AND t.title = s.title)
+    """
+
+    def staging_values(self, obj, now):
+        return obj.contact_id, obj.title, obj.due_date, obj.priority, obj.is_done, now
+
+    def conflict_errors(self):
+        return {'title': [DUPLICATE_TASK_TITLE_MESSAGE]}
+
+    def after_merge(self, items, conflicts):
+        refresh_open_tasks_count(
+            data['contact'].pk for line, data in items if line not in conflicts and not data.get('is_done')
+        )
+
+
+IMPORTERS = {
+    'contacts': ContactImporter,
+    'tasks': TaskImporter,
+}
@@ -0,0 +1,256 @@
+"""
+Per-request query count and latency instrumentation for `/api/`.
+
+`RequestMetricsMiddleware` counts and times every SQL query of a request
+and reports `Server-Timing` headers. Queries are seen by an execute wrapper
+installed on every database connection, which finds the current request
+through a context variable, so queries the async ORM runs in worker threads
+are counted too (no SQL is captured). `InstrumentedViewMixin` labels the request with the
+viewset action and marks where the view starts and ends, so time spent in
+the view and renderer outside the database is reported as `serialize`.
+
+Observations are aggregated into in-process histograms served in the
+Prometheus text format by `api.views.MetricsView` (`/api/metrics/`).
+Queries slower than `CRM_METRICS['SLOW_QUERY_MS']` are logged to
+`api.slow_queries`.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from api import cache
+
+slow_query_logger = logging.getLogger('api.slow_queries')
+
+DEFAULTS = {'ENABLED': True, 'PATH_PREFIX': '/api/', 'SERVER_TIMING': True, 'SLOW_QUERY_MS': 500}
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def metrics_settings():
+    return {**DEFAULTS, **getattr(settings, 'CRM_METRICS', {})}
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            # One slot per bucket plus +Inf, then sum.
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self, label_names):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        for labels, series in sorted(self.series.items()):
+            base = ','.join(f'{name}="{value}"' for name, value in zip(label_names, labels))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), series):
+                cumulative += count
+                yield f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}'
+            yield f'{self.name}_sum{{{base}}} {series[-1]:.6f}'
+            yield f'{self.name}_count{{{base}}} {cumulative}'
+
+
+class MetricsRegistry:
+    label_names = ('view', 'method', 'status')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.histograms = {
+            'total': Histogram('crm_request_duration_seconds', 'Total time per request.', LATENCY_BUCKETS),
+            'db': Histogram('crm_request_db_duration_seconds', 'Time spent in SQL per request.', LATENCY_BUCKETS),
+            'serialize': Histogram(
+                'crm_request_serialize_duration_seconds',
+                'Time spent in the view and renderer outside SQL per request.', LATENCY_BUCKETS,
+            ),
+            'queries': Histogram('crm_request_db_queries', 'SQL queries per request.', QUERY_BUCKETS),
+        }
+        self.slow_queries = 0
+
+    def observe(self, labels, timings):
+        with self.lock:
+            for name, value in timings.items():
+                self.histograms[name].observe(labels, value)
+
+    def record_slow_query(self):
+        with self.lock:
+            self.slow_queries += 1
+
+    def render(self):
+        with self.lock:
+            lines = [line for histogram in self.histograms.values() for line in histogram.render(self.label_names)]
+            lines += [
+                '# HELP crm_slow_queries_total SQL queries slower than CRM_METRICS["SLOW_QUERY_MS"].',
+                '# TYPE crm_slow_queries_total counter',
+                f'crm_slow_queries_total {self.slow_queries}',
+            ]
+        for name, value in cache.metrics.snapshot().items():
+            if name != 'hit_ratio':
+                lines += [f'# TYPE crm_response_cache_{name}_total counter', f'crm_response_cache_{name}_total {value}']
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+current_metrics = ContextVar('crm_request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Timings of one request, also used as the `execute_wrapper` callable."""
+
+    def __init__(self, slow_query_ms):
+        self.slow_query_seconds = slow_query_ms / 1000 if slow_query_ms is not None else None
+        self.start = time.perf_counter()
+        self.label = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.view_start = None
+        self.view_time = None
+        self.view_db_time = 0.0
+        self.render_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += elapsed
+            if self.slow_query_seconds is not None and elapsed >= self.slow_query_seconds:
+                registry.record_slow_query()
+                slow_query_logger.warning(
+                    'Slow query (%.1f ms) in %s: %s', elapsed * 1000, self.label or 'request', sql[:1000],
+                )
+
+    def view_started(self):
+        self.view_start = time.perf_counter()
+        self.view_db_start = self.db_time
+
+    def view_finished(self):
+        self.view_time = time.perf_counter() - self.view_start
+        self.view_db_time = self.db_time - self.view_db_start
+
+    def serialize_time(self):
+        if self.view_time is None:
+            return None
+        return max(self.view_time - self.view_db_time, 0.0) + self.render_time
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+@receiver(connection_created, dispatch_uid='api.instrumentation.install_query_wrapper')
+def install_query_wrapper(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class RequestMetricsMiddleware:
+    """Instruments requests under `CRM_METRICS['PATH_PREFIX']`, under WSGI or ASGI."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = self.start(request)
+        if metrics is None:
+            return self.get_response(request)
+        token = current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, metrics, response)
+
+    async def __acall__(self, request):
+        metrics = self.start(request)
+        if metrics is None:
+            return await self.get_response(request)
+        token = current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, metrics, response)
+
+    def start(self, request):
+        options = metrics_settings()
+        if not options['ENABLED'] or not request.path.startswith(options['PATH_PREFIX']):
+            return None
+        request.crm_metrics = RequestMetrics(options['SLOW_QUERY_MS'])
+        return request.crm_metrics
+
+    def finish(self, request, metrics, response):
+        options = metrics_settings()
+        total = time.perf_counter() - metrics.start
+
+        timings = {'total': total, 'db': metrics.db_time, 'queries': metrics.queries}
+        serialize = metrics.serialize_time()
+        if serialize is not None:
+            timings['serialize'] = serialize
+        label = metrics.label or getattr(request.resolver_match, 'view_name', None) or 'unmatched'
+        registry.observe((label, request.method, f'{response.status_code // 100}xx'), timings)
+
+        if options['SERVER_TIMING']:
+            parts = [f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.queries} queries"']
+            if serialize is not None:
+                parts.append(f'serialize;dur={serialize * 1000:.2f}')
+            parts.append(f'total;dur={total * 1000:.2f}')
+            response['Server-Timing'] = ', '.join(parts)
+        return response
+
+    def process_template_response(self, request, response):
+        metrics = getattr(request, 'crm_metrics', None)
+        if metrics is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                metrics.render_time = time.perf_counter() - start
+
+            response.add_post_render_callback(rendered)
+        return response
+
+
+class InstrumentedViewMixin:
+    """Labels metrics with `<basename>.<action>` and times the view body."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        metrics = getattr(request._request, 'crm_metrics', None)
+        if metrics is not None:
+            metrics.label = f'{self.basename}.{self.action}'
+            metrics.view_started()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        metrics = getattr(request._request, 'crm_metrics', None)
+        if metrics is not None and metrics.view_start is not None:
+            metrics.view_finished()
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,327 @@
+"""
+Database-backed queue for operations too big for a request.
+
+`enqueue(kind, payload)` stores a `Job`. The `run_jobs` worker claims due
+jobs with `SELECT ... FOR UPDATE SKIP LOCKED`, so any number of workers take
+different jobs without waiting on each other, runs them on a thread pool
+and stores the handler's JSON result. A job that raises is retried up to
+`max_attempts` times, `RETRY_DELAY * 2**n` seconds apart. A claim is a lease
+that the worker renews while the job runs; when a worker dies its lease runs
+out and the job is queued again, so handlers must be safe to run twice.
+
+Endpoints that take `?background=true` answer `202 Accepted` with the job id
+and its status URL (`/api/jobs/<id>/`) instead of doing the work in the
+request. Handlers are registered with `@handler('<kind>')`. Kinds registered
+with `exclusive=True`, such as `seed`, which replaces all the data, are left
+to a `run_jobs --exclusive` worker; it runs them one at a time and claims
+nothing else.
+"""
+import logging
+import os
+import socket
+import tempfile
+import threading
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+from io import StringIO
+from itertools import count
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import F
+from django.http import HttpRequest, QueryDict
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from api.models import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'THREADS': 4,
+    'POLL_INTERVAL': 1.0,
+    'LEASE': 300,
+    'MAX_ATTEMPTS': 3,
+    'RETRY_DELAY': 10,
+    'EXPORT_DIR': 'exports',
+}
+VIEWSETS = {'contact': 'api.views.ContactViewSet', 'task': 'api.views.TaskViewSet'}
+HANDLERS = {}
+EXCLUSIVE_KINDS = set()
+worker_ids = count(1)
+
+
+def jobs_settings():
+    return {**DEFAULTS, **getattr(settings, 'CRM_JOBS', {})}
+
+
+def export_storage():
+    return FileSystemStorage(location=jobs_settings()['EXPORT_DIR'])
+
+
+def handler(kind, exclusive=False):
+    """
+    Register `func(job)`, returning a JSON-serializable result, for jobs of `kind`.
+
+    `exclusive` jobs must not share a process with other jobs; only an exclusive worker claims them.
+    """
+    def register(func):
+        HANDLERS[kind] = func
+        if exclusive:
+            EXCLUSIVE_KINDS.add(kind)
+        return func
+    return register
+
+
+def enqueue(kind, payload, user=None, max_attempts=None):
+    if kind not in HANDLERS:
+        raise ValueError(f'Unknown job kind {kind!r}.')
+    return Job.objects.create(
+        kind=kind, payload=payload,
+        created_by=user if user is not None and user.is_authenticated else None,
+        max_attempts=max_attempts or jobs_settings()['MAX_ATTEMPTS'],
+    )
+
+
+# ---------------------------------------------------------------------------
+# Request side: Django REST framework is imported on use, so `run_jobs`
+# starts without it.
+# ---------------------------------------------------------------------------
+
+def background_requested(request):
+    from rest_framework import serializers
+    from rest_framework.exceptions import ValidationError
+
+    value = request.query_params.get('background')
+    if value is None:
+        return False
+    try:
+        return serializers.BooleanField().run_validation(value)
+    except serializers.ValidationError as exc:
+        raise ValidationError({'background': exc.detail})
+
+
+def accepted(request, job):
+    """`202 Accepted` for an enqueued job, pointing at its status URL."""
+    from rest_framework import status
+    from rest_framework.response import Response
+
+    url = request.build_absolute_uri(reverse('job-detail', args=[job.pk]))
+    return Response(
+        {'job': job.pk, 'status': job.status, 'status_url': url},
+        status=status.HTTP_202_ACCEPTED, headers={'Location': url},
+    )
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+def claim(worker, limit, lease, exclusive=False):
+    """
+    Lock up to `limit` due jobs for `worker` for `lease` seconds and return them.
+
+    Exclusive workers claim only the exclusive kinds, other workers everything else.
+    """
+    now = timezone.now()
+    due = Job.objects.filter(status=JobStatus.QUEUED, run_after__lte=now)
+    due = due.filter(kind__in=EXCLUSIVE_KINDS) if exclusive else due.exclude(kind__in=EXCLUSIVE_KINDS)
+    with transaction.atomic():
+        pks = list(
+            due.order_by('run_after', 'id')
+            .select_for_update(skip_locked=True)
+            .values_list('pk', flat=True)[:limit]
+        )
+        if not pks:
+            return []
+        Job.objects.filter(pk__in=pks).update(
+            status=JobStatus.RUNNING, attempts=F('attempts') + 1, locked_by=worker,
+            locked_until=now + timedelta(seconds=lease), started_at=now,
+        )
+    return list(Job.objects.filter(pk__in=pks).select_related('created_by').order_by('run_after', 'id'))
+
+
+def renew(worker, pks, lease):
+    Job.objects.filter(pk__in=pks, locked_by=worker, status=JobStatus.RUNNING).update(
+        locked_until=timezone.now() + timedelta(seconds=lease))
+
+
+def requeue_expired():
+    """Give the jobs of workers that stopped renewing their lease to someone else (or fail them)."""
+    now = timezone.now()
+    expired = Job.objects.filter(status=JobStatus.RUNNING, locked_until__lt=now)
+    failed = expired.filter(attempts__gte=F('max_attempts')).update(
+        status=JobStatus.FAILED, error='The worker running this job stopped.', finished_at=now,
+        locked_by='', locked_until=None,
+    )
+    return failed + expired.update(status=JobStatus.QUEUED, run_after=now, locked_by='', locked_until=None)
+
+
+def run_job(job, worker):
+    """Run `job` and record the outcome, unless the job was taken away from `worker` meanwhile."""
+    claimed = Job.objects.filter(pk=job.pk, locked_by=worker, status=JobStatus.RUNNING)
+    released = {'locked_by': '', 'locked_until': None}
+    func = HANDLERS.get(job.kind)
+    if func is None:
+        claimed.update(status=JobStatus.FAILED, error=f'Unknown job kind {job.kind!r}.',
+                       finished_at=timezone.now(), **released)
+        return
+    try:
+        result = func(job)
+    except Exception as exc:
+        logger.exception('Job %s (%s) failed on attempt %s', job.pk, job.kind, job.attempts)
+        error = ''.join(traceback.format_exception_only(exc)).strip()
+        if job.attempts < job.max_attempts:
+            delay = jobs_settings()['RETRY_DELAY'] * 2 ** (job.attempts - 1)
+            claimed.update(status=JobStatus.QUEUED, error=error,
+                           run_after=timezone.now() + timedelta(seconds=delay), **released)
+        else:
+            claimed.update(status=JobStatus.FAILED, error=error, finished_at=timezone.now(), **released)
+        return
+    claimed.update(status=JobStatus.SUCCEEDED, result=result, error='', finished_at=timezone.now(), **released)
+
+
+def run_in_thread(job, worker):
+    try:
+        run_job(job, worker)
+    finally:
+        connection.close()  # pool threads outlive the job; don't keep a connection per thread
+
+
+class Worker:
+    """
+    Claims due jobs and runs up to `threads` of them at a time until stopped.
+
+    An `exclusive` worker runs only the exclusive kinds, on a single thread.
+    """
+
+    def __init__(self, threads=None, poll_interval=None, lease=None, name=None, exclusive=False):
+        options = jobs_settings()
+        if exclusive and threads not in (None, 1):
+            raise ValueError('An exclusive worker runs one job at a time.')
+        self.threads = 1 if exclusive else threads or options['THREADS']
+        self.exclusive = exclusive
+        self.poll_interval = options['POLL_INTERVAL'] if poll_interval is None else poll_interval
+        self.lease = lease or options['LEASE']
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}:{next(worker_ids)}'
+        self.stopping = threading.Event()
+
+    def stop(self):
+        """Stop claiming jobs; `run` returns once the running ones finish."""
+        self.stopping.set()
+
+    def run(self, once=False):
+        """Process jobs until `stop()`, or with `once` until none is due. Return how many were run."""
+        processed = 0
+        running = {}
+        renewed = timezone.now()
+        with ThreadPoolExecutor(self.threads, thread_name_prefix='crm-job') as pool:
+            while True:
+                if not self.stopping.is_set() and len(running) < self.threads:
+                    requeue_expired()
+                    for job in claim(self.name, self.threads - len(running), self.lease, self.exclusive):
+                        running[pool.submit(run_in_thread, job, self.name)] = job.pk
+                if not running:
+                    if once or self.stopping.is_set():
+                        break
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                done, _ = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    running.pop(future)
+                    processed += 1
+                if running and (timezone.now() - renewed).total_seconds() > self.lease / 3:
+                    renew(self.name, list(running.values()), self.lease)
+                    renewed = timezone.now()
+        return processed
+
+
+def prune_jobs(days):
+    """Delete jobs that finished more than `days` days ago, and their export files."""
+    finished = Job.objects.filter(
+        status__in=[JobStatus.SUCCEEDED, JobStatus.FAILED], finished_at__lt=timezone.now() - timedelta(days=days))
+    storage = export_storage()
+    for result in finished.filter(kind='export', status=JobStatus.SUCCEEDED).values_list('result', flat=True):
+        if result and result.get('file'):
+            storage.delete(result['file'])
+    deleted, _ = finished.delete()
+    return deleted
+
+
+# ---------------------------------------------------------------------------
+# Handlers
+# ---------------------------------------------------------------------------
+
+def prepared_viewset(model, action, user, query=''):
+    """The `model` viewset set up as for `GET ?<query>` of `action` by `user`, outside any request."""
+    http_request = HttpRequest()
+    http_request.method = 'GET'
+    http_request.GET = QueryDict(query)
+    viewset = import_string(VIEWSETS[model])(action_map={'get': action})
+    viewset.args, viewset.kwargs = (), {}
+    request = viewset.initialize_request(http_request)
+    request.user = user or AnonymousUser()
+    viewset.request = request
+    viewset.headers = viewset.default_response_headers
+    viewset.initial(request)  # permissions, ?include_archived=
+    return viewset
+
+
+@handler('bulk')
+def run_bulk(job):
+    """`{"model", "method", "rows"}`: what the bulk endpoint would do with `method`."""
+    from api.bulk import bulk_write
+
+    viewset_class = import_string(VIEWSETS[job.payload['model']])
+    writer = viewset_class.bulk_writer_class(chunk_size=viewset_class.bulk_chunk_size)
+    result, verb, _ = bulk_write(writer, job.payload['method'], job.payload['rows'])
+    return result.as_dict(verb)
+
+
+@handler('export')
+def run_export(job):
+    """`{"model", "query", "format"}`: the export endpoint's file, saved under EXPORT_DIR."""
+    from api.export import EXPORT_FORMATS
+
+    viewset = prepared_viewset(job.payload['model'], 'export', job.created_by, job.payload['query'])
+    columns, rows = viewset.export_rows()
+    encoder, _ = EXPORT_FORMATS[job.payload['format']]
+    exported = 0
+
+    def counted(rows):
+        nonlocal exported
+        for row in rows:
+            exported += 1
+            yield row
+
+    storage = export_storage()
+    name = f"{viewset.export_name}-{job.pk}.{job.payload['format']}"
+    with tempfile.TemporaryFile() as handle:
+        for chunk in encoder(columns, counted(rows)):
+            handle.write(chunk.encode())
+        handle.seek(0)
+        storage.delete(name)  # left over from an earlier attempt
+        name = storage.save(name, File(handle))
+    return {'rows': exported, 'file': name, 'format': job.payload['format']}
+
+
+@handler('seed', exclusive=True)
+def run_seed(job):
+    """The `seed` command with the payload as its options; it deletes all the data, so it runs alone."""
+    out = StringIO()
+    call_command('seed', stdout=out, **job.payload)
+    return {'output': out.getvalue().strip()}
+
+
+@handler('reminders')
+def run_reminders(job):
+    """`{"ids"}`: send those reminders (see `api.reminders`)."""
+    from api.reminders import deliver_reminders
+
+    return deliver_reminders(job.payload['ids'])
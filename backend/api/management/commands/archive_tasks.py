@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.archive import archive_done_tasks
+from api.models import Task
+
+
+class Command(BaseCommand):
+    help = (
+        'Move done tasks created more than --days days ago into the archive table, in batches of --batch-size '
+        'with --sleep seconds between them (run periodically)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help='Archive done tasks created before this many days ago')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0.1, help='Pause between batches, to go easy on the database')
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many tasks would be archived')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--days must be >= 0 and --batch-size >= 1.')
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        if options['dry_run']:
+            count = Task.objects.filter(is_done=True, created_at__lt=cutoff).count()
+            self.stdout.write(f'{count} done tasks created before {cutoff.isoformat()} would be archived')
+            return
+        archived = archive_done_tasks(
+            cutoff, batch_size=options['batch_size'], pause=options['sleep'], max_batches=options['max_batches'],
+            progress=lambda total: self.stdout.write(f'  {total} archived') if options['verbosity'] > 1 else None,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} done tasks created before {cutoff.isoformat()}'))
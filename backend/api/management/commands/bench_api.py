@@ -0,0 +1,99 @@
+import json
+import random
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.benchmarking import DATASET_EPOCH, call_view, measure, summarize
+from api.cache import cache_settings
+from api.models import Contact, Task
+from api.views import ContactViewSet, TaskViewSet
+
+
+class Command(BaseCommand):
+    help = 'Measure latency and query counts of the main API endpoints against the current data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0, help='Seed for picking ids and search terms')
+        parser.add_argument('--output', help='Also write the JSON report to this file')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        contact_ids = list(Contact.objects.order_by('pk').values_list('pk', flat=True)[:10000])
+        if not contact_ids:
+            raise CommandError('No contacts found; run `seed --contacts N` first.')
+        rng = random.Random(options['seed'])
+        run = uuid.uuid4().hex[:8]
+        created = []
+
+        contact_list = ContactViewSet.as_view({'get': 'list', 'post': 'create'})
+        contact_detail = ContactViewSet.as_view({'get': 'retrieve'})
+        task_list = TaskViewSet.as_view({'get': 'list'})
+        names = list(Contact.objects.filter(pk__in=contact_ids[:100]).values_list('full_name', flat=True))
+        due_from = DATASET_EPOCH.date()
+
+        def detail(pk):
+            return call_view(contact_detail, f'/api/contacts/{pk}/', view_kwargs={'pk': pk})
+
+        def create_contact():
+            response = call_view(contact_list, '/api/contacts/', method='post', data={
+                'full_name': f'Bench create {run} {len(created)}',
+                'email': f'bench.{run}.{len(created)}@example.com',
+            })
+            created.append(response.data.get('id'))
+            return response
+
+        cases = [
+            ('contacts:list', lambda: call_view(contact_list, '/api/contacts/')),
+            ('contacts:list-filtered', lambda: call_view(
+                contact_list, '/api/contacts/', {'status': 'active', 'ordering': 'full_name'})),
+            ('contacts:search', lambda: call_view(
+                contact_list, '/api/contacts/', {'search': rng.choice(names).split()[1]})),
+            ('contacts:detail', lambda: detail(rng.choice(contact_ids))),
+            ('tasks:due-range', lambda: call_view(task_list, '/api/tasks/', {
+                'due_from': due_from.isoformat(), 'due_to': (due_from + timedelta(days=30)).isoformat()})),
+            ('tasks:due-range-open', lambda: call_view(task_list, '/api/tasks/', {
+                'due_from': due_from.isoformat(), 'due_to': (due_from + timedelta(days=30)).isoformat(),
+                'is_done': 'false', 'priority': 'high'})),
+            ('tasks:by-contact', lambda: call_view(task_list, '/api/tasks/', {'contact_id': rng.choice(contact_ids)})),
+            ('contacts:create', create_contact),
+        ]
+
+        results = []
+        try:
+            for label, func in cases:
+                with CaptureQueriesContext(connection) as queries:
+                    response = func()
+                samples = measure(func, repeat=options['repeat'], warmup=options['warmup'])
+                results.append({
+                    'case': label, 'status': response.status_code, 'queries': len(queries), **summarize(samples),
+                })
+        finally:
+            Contact.objects.filter(pk__in=[pk for pk in created if pk]).delete()
+
+        report = {
+            'backend': connection.vendor,
+            'response_cache': cache_settings()['ENABLED'],
+            'contacts': Contact.objects.count(),
+            'tasks': Task.objects.count(),
+            'repeat': options['repeat'],
+            'measured_at': timezone.now().isoformat(),
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        for row in results:
+            self.stdout.write(
+                f"{row['case']:<24} q={row['queries']:<3} p50={row['p50_ms']:>9.2f}ms  "
+                f"p95={row['p95_ms']:>9.2f}ms  p99={row['p99_ms']:>9.2f}ms"
+            )
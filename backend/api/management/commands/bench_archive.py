@@ -0,0 +1,80 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+
+from api.archive import archive_done_tasks
+from api.benchmarking import call_view, measure, summarize
+from api.models import ArchivedTask, Contact, Task
+from api.views import TaskViewSet
+
+CASES = (
+    ('tasks:list', {}),
+    ('tasks:open', {'is_done': 'false'}),
+    ('tasks:priority', {'priority': 'high'}),
+    ('tasks:contact', {'contact_id': None}),
+)
+
+
+class Command(BaseCommand):
+    help = 'Time the task list endpoints, archive done tasks (see archive_tasks) and time them again'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help='Archive done tasks created before this many days ago')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        contact = Contact.objects.order_by('pk').first()
+        if contact is None:
+            raise CommandError('No contacts found; run `seed --contacts N` first.')
+        view = TaskViewSet.as_view({'get': 'list'})
+        cases = [(label, {**params, 'contact_id': contact.pk} if 'contact_id' in params else params)
+                 for label, params in CASES]
+
+        def run(extra=None):
+            with override_settings(CRM_RESPONSE_CACHE={'ENABLED': False}):
+                return {
+                    label: summarize(measure(
+                        lambda: call_view(view, '/api/tasks/', {**params, **(extra or {})}), repeat=options['repeat'],
+                    ))['p50_ms']
+                    for label, params in cases
+                }
+
+        def snapshot():
+            return {'live_tasks': Task.objects.count(), 'archived_tasks': ArchivedTask.objects.count()}
+
+        before = {**snapshot(), 'p50_ms': run()}
+        started = timezone.now()
+        archived = archive_done_tasks(started - timedelta(days=options['days']), batch_size=options['batch_size'])
+        archive_seconds = round((timezone.now() - started).total_seconds(), 2)
+        if connection.vendor == 'postgresql':
+            # Fresh planner statistics, as autovacuum would gather after a large archive run.
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {Task._meta.db_table}')
+        after = {**snapshot(), 'p50_ms': run(), 'include_archived_p50_ms': run({'include_archived': 'true'})}
+
+        report = {
+            'backend': connection.vendor,
+            'archived': archived,
+            'archive_seconds': archive_seconds,
+            'before': before,
+            'after': after,
+            'measured_at': timezone.now().isoformat(),
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(
+            f"archived {archived} tasks in {archive_seconds}s: live {before['live_tasks']} -> {after['live_tasks']}, "
+            f"archived {before['archived_tasks']} -> {after['archived_tasks']}"
+        )
+        for label, _ in cases:
+            self.stdout.write(
+                f"{label:<16} before p50={before['p50_ms'][label]:>8.2f}ms  after p50={after['p50_ms'][label]:>8.2f}ms  "
+                f"include_archived p50={after['include_archived_p50_ms'][label]:>8.2f}ms"
+            )
@@ -0,0 +1,68 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.authentication import CachedJWTAuthentication, tokens
+from api.benchmarking import measure, summarize
+from api.views import ContactViewSet
+
+
+class Command(BaseCommand):
+    help = 'Compare JWT authentication with and without the token/user cache: auth queries and time per request'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(username='bench-auth')
+        factory = APIRequestFactory()
+        header = f'Bearer {AccessToken.for_user(user)}'
+        view = ContactViewSet.as_view({'get': 'list'})
+        authenticator = CachedJWTAuthentication()
+        repeat = options['repeat']
+
+        def authenticate():
+            return authenticator.authenticate(Request(factory.get('/api/contacts/', HTTP_AUTHORIZATION=header)))
+
+        def endpoint():
+            response = view(factory.get('/api/contacts/', HTTP_AUTHORIZATION=header))
+            response.render()
+            assert response.status_code == 200, response.status_code
+
+        results = []
+        for label, timeout in (('uncached', 0), ('cached', 60)):
+            tokens.clear()
+            with override_settings(
+                CRM_AUTH_CACHE={'TIMEOUT': timeout}, CRM_RESPONSE_CACHE={'ENABLED': False},
+                ALLOWED_HOSTS=['testserver'],
+            ):
+                auth = summarize(measure(authenticate, repeat=repeat))
+                endpoint_ms = summarize(measure(endpoint, repeat=repeat))
+                with CaptureQueriesContext(connection) as queries:
+                    endpoint()
+            results.append({
+                'auth': label,
+                'auth_p50_us': round(auth['p50_ms'] * 1000, 1),
+                'auth_queries_per_request': sum(1 for query in queries if 'auth_user' in query['sql']),
+                'queries_per_request': len(queries),
+                'endpoint_p50_ms': endpoint_ms['p50_ms'],
+            })
+
+        report = {'backend': connection.vendor, 'measured_at': timezone.now().isoformat(), 'results': results}
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        for row in results:
+            self.stdout.write(
+                f"{row['auth']:<9} auth p50={row['auth_p50_us']:>8.1f}us  auth queries={row['auth_queries_per_request']}  "
+                f"queries/request={row['queries_per_request']}  /api/contacts/ p50={row['endpoint_p50_ms']:>7.2f}ms"
+            )
@@ -0,0 +1,74 @@
+import json
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+
+from api.benchmarking import call_view
+from api.models import Contact
+from api.views import ContactViewSet, TaskViewSet
+
+
+class Command(BaseCommand):
+    help = 'Compare rows/sec of one POST per row against the bulk endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000)
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        run = uuid.uuid4().hex[:8]
+        contact_single = ContactViewSet.as_view({'post': 'create'})
+        contact_bulk = ContactViewSet.as_view({'post': 'bulk'})
+        task_single = TaskViewSet.as_view({'post': 'create'})
+        task_bulk = TaskViewSet.as_view({'post': 'bulk'})
+
+        def contact_rows(mode):
+            return [
+                {'full_name': f'Bulk {mode} {n}', 'email': f'{run}.{mode}.{n}@example.com'}
+                for n in range(rows)
+            ]
+
+        results = []
+        try:
+            results.append(self.time_single(
+                'contacts', contact_single, '/api/contacts/', contact_rows('single')))
+            results.append(self.time_bulk(
+                'contacts', contact_bulk, '/api/contacts/bulk/', contact_rows('bulk')))
+
+            owner = Contact.objects.create(full_name=f'Bulk owner {run}')
+            task_rows = [{'contact': owner.pk, 'title': f'Task {mode} {n}'} for mode in ('single', 'bulk') for n in range(rows)]
+            results.append(self.time_single('tasks', task_single, '/api/tasks/', task_rows[:rows]))
+            results.append(self.time_bulk('tasks', task_bulk, '/api/tasks/bulk/', task_rows[rows:]))
+        finally:
+            Contact.objects.filter(email__startswith=f'{run}.').delete()
+            Contact.objects.filter(full_name=f'Bulk owner {run}').delete()
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for row in results:
+            self.stdout.write(
+                f"{row['endpoint']:<9} {row['mode']:<7} {row['rows']:>7} rows  "
+                f"{row['seconds']:>8.2f}s  {row['rows_per_sec']:>10.0f} rows/s"
+            )
+
+    def time_single(self, endpoint, view, path, rows):
+        start = time.perf_counter()
+        for row in rows:
+            call_view(view, path, method='post', data=row)
+        return self.result(endpoint, 'single', len(rows), time.perf_counter() - start)
+
+    def time_bulk(self, endpoint, view, path, rows):
+        start = time.perf_counter()
+        response = call_view(view, path, method='post', data=rows)
+        elapsed = time.perf_counter() - start
+        if response.data['errors']:
+            self.stderr.write(f'{len(response.data["errors"])} bulk rows rejected')
+        return self.result(endpoint, 'bulk', len(rows), elapsed)
+
+    @staticmethod
+    def result(endpoint, mode, rows, seconds):
+        return {'endpoint': endpoint, 'mode': mode, 'rows': rows, 'seconds': round(seconds, 3),
+                'rows_per_sec': round(rows / seconds, 1) if seconds else None}
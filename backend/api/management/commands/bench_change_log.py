@@ -0,0 +1,110 @@
+import json
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from api.benchmarking import added_db_latency, summarize
+from api.changes import sequence_state
+from api.models import Change, Contact, PendingChange
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure write throughput with 1 and then --writers concurrent writers, each renaming its own contact in '
+        'transactions held open for --hold-ms; every write logs a change. Report writes/s per run, the speedup '
+        'of the concurrent run and whether every change was published with gap-free seqs'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--writes', type=int, default=200, help='Write transactions per writer')
+        parser.add_argument(
+            '--hold-ms', type=float, default=5, help='Time each write transaction stays open after its write')
+        parser.add_argument(
+            '--db-latency-ms', type=float, default=0, help='Extra delay per SQL query, to mimic a remote database')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        writers = options['writers']
+        if writers < 1 or options['writes'] < 1 or options['hold_ms'] < 0:
+            raise CommandError('--writers and --writes must be >= 1, --hold-ms >= 0.')
+        if writers > 1 and connection.vendor == 'sqlite':
+            raise CommandError('SQLite runs one writer at a time; use PostgreSQL or --writers 1.')
+        contacts = Contact.objects.bulk_create([Contact(full_name=f'Change Log Writer {n}') for n in range(writers)])
+        first_seq, _ = sequence_state()
+
+        # Close the main thread's connection so the latency wrapper reaches every connection used.
+        connections.close_all()
+        with added_db_latency(options['db_latency_ms'] / 1000):
+            results = [self.run(contacts[:count], options) for count in sorted({1, writers})]
+
+        last_seq, _ = sequence_state()
+        published = Change.objects.filter(seq__gt=first_seq).count()
+        report = {
+            'backend': connection.vendor,
+            'writers': writers,
+            'hold_ms': options['hold_ms'],
+            'db_latency_ms': options['db_latency_ms'],
+            'results': results,
+            'speedup': round(results[-1]['writes_per_sec'] / results[0]['writes_per_sec'], 2),
+            # Every write logged one change; seqs are unique, so as many as the seqs handed out means no gaps.
+            'written': sum(row['writes'] for row in results),
+            'published': published,
+            'pending': PendingChange.objects.count(),
+            'gap_free': published == last_seq - first_seq,
+            'measured_at': timezone.now().isoformat(),
+        }
+        Contact.objects.filter(pk__in=[contact.pk for contact in contacts]).delete()
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        for row in results:
+            self.stdout.write(
+                f"{row['writers']:>3} writers  {row['writes_per_sec']:>9.1f} writes/s  "
+                f"p50={row['p50_ms']:>8.2f}ms  p95={row['p95_ms']:>8.2f}ms  p99={row['p99_ms']:>8.2f}ms"
+            )
+        self.stdout.write(
+            f"speedup {report['speedup']}x with {writers} writers; {report['published']} of {report['written']} "
+            f"changes published, {report['pending']} pending, seqs gap-free: {report['gap_free']}"
+        )
+
+    def run(self, contacts, options):
+        """Every contact's writer renames it `--writes` times; return the run's throughput and latencies."""
+        hold = options['hold_ms'] / 1000
+        samples, lock = [], threading.Lock()
+        barrier = threading.Barrier(len(contacts) + 1)
+
+        def write(contact):
+            timings = []
+            try:
+                barrier.wait()
+                for n in range(options['writes']):
+                    start = time.perf_counter()
+                    with transaction.atomic():
+                        contact.full_name = f'Change Log Writer {contact.pk} #{n}'
+                        contact.save(update_fields=['full_name'])
+                        time.sleep(hold)  # the rest of the request's work, done before it commits
+                    # Publishing is left to the log's readers; `sequence_state` below publishes these.
+                    timings.append((time.perf_counter() - start) * 1000)
+            finally:
+                connections.close_all()
+                with lock:
+                    samples.extend(timings)
+
+        threads = [threading.Thread(target=write, args=(contact,)) for contact in contacts]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        return {
+            'writers': len(contacts),
+            'writes': len(samples),
+            'writes_per_sec': round(len(samples) / elapsed, 1),
+            **summarize(samples),
+        }
@@ -0,0 +1,195 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from wsgiref.util import setup_testing_defaults
+
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.asyncviews import AsyncReadsASGIHandler
+from api.benchmarking import added_db_latency, summarize
+from api.models import Contact
+
+
+@contextmanager
+def conn_max_age(value):
+    """Temporarily change CONN_MAX_AGE for connections opened from now on."""
+    settings_dict = connections.settings[DEFAULT_DB_ALIAS]
+    previous = settings_dict.get('CONN_MAX_AGE', 0)
+    settings_dict['CONN_MAX_AGE'] = value
+    try:
+        yield
+    finally:
+        settings_dict['CONN_MAX_AGE'] = previous
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare WSGI and ASGI throughput with many concurrent clients, driving Django\'s handlers in process: '
+        'WSGI from a pool of worker threads, ASGI with one coroutine per client on a single event loop'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=100)
+        parser.add_argument('--requests', type=int, default=2000, help='Total requests per server type')
+        parser.add_argument(
+            '--wsgi-threads', type=int, help='WSGI worker threads (default: one per client, the best case for WSGI)')
+        parser.add_argument(
+            '--db-latency-ms', type=float, default=0, help='Extra delay per SQL query, to mimic a remote database')
+        parser.add_argument('--path', action='append', help='URL to request (repeatable); clients rotate through them')
+        parser.add_argument('--output', help='Also write the JSON report to this file')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        if not Contact.objects.exists():
+            raise CommandError('No contacts found; run `seed --contacts N` first.')
+        user, _ = User.objects.get_or_create(username='bench-concurrency')
+        self.authorization = f'Bearer {AccessToken.for_user(user)}'
+        self.host = 'localhost'
+        paths = options['path'] or ['/api/contacts/', '/api/tasks/?page_size=20&is_done=false']
+        urls = [paths[n % len(paths)] for n in range(options['requests'])]
+
+        settings_dict = connections.settings[DEFAULT_DB_ALIAS]
+        pooled = 'pool' in settings_dict.get('OPTIONS', {})
+        # Close the main thread's connection so the latency wrapper reaches every connection used.
+        connections.close_all()
+        with override_settings(ALLOWED_HOSTS=[self.host]), added_db_latency(options['db_latency_ms'] / 1000):
+            results = [self.run_wsgi(urls, options['clients'], options['wsgi_threads'] or options['clients'])]
+            # Same as config/asgi.py: per-request threads never reuse a persistent connection.
+            with conn_max_age(settings_dict.get('CONN_MAX_AGE', 0) if pooled else 0):
+                results.append(self.run_asgi(urls, options['clients']))
+
+        report = {
+            'backend': connections[DEFAULT_DB_ALIAS].vendor,
+            'clients': options['clients'],
+            'requests': options['requests'],
+            'wsgi_threads': options['wsgi_threads'] or options['clients'],
+            'db_latency_ms': options['db_latency_ms'],
+            'paths': paths,
+            'pool': pooled,
+            'measured_at': timezone.now().isoformat(),
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        for row in results:
+            self.stdout.write(
+                f"{row['server']:<5} conn_max_age={row['conn_max_age']:<4} {row['requests_per_sec']:>8.1f} req/s  "
+                f"p50={row['p50_ms']:>8.2f}ms  p95={row['p95_ms']:>8.2f}ms  p99={row['p99_ms']:>8.2f}ms  "
+                f"errors={row['errors']}"
+            )
+
+    def split_url(self, url):
+        path, _, query = url.partition('?')
+        return path, query
+
+    def summarize_run(self, server, samples, statuses, elapsed):
+        return {
+            'server': server,
+            'conn_max_age': connections.settings[DEFAULT_DB_ALIAS].get('CONN_MAX_AGE', 0),
+            'requests_per_sec': round(len(samples) / elapsed, 1),
+            'errors': sum(1 for code in statuses if code != 200),
+            **summarize(samples),
+        }
+
+    def run_wsgi(self, urls, clients, threads):
+        handler = WSGIHandler()
+        pending = iter(urls)
+        lock = threading.Lock()
+        samples, statuses = [], []
+
+        def serve(url):
+            path, query = self.split_url(url)
+            environ = {
+                'PATH_INFO': path, 'QUERY_STRING': query, 'HTTP_HOST': self.host,
+                'HTTP_AUTHORIZATION': self.authorization, 'SERVER_NAME': self.host,
+            }
+            setup_testing_defaults(environ)
+            status = []
+            response = handler(environ, lambda code, headers: status.append(int(code.split()[0])))
+            b''.join(response)
+            response.close()  # fires request_finished, which closes or recycles the connection
+            return status[0]
+
+        def client(workers):
+            while True:
+                with lock:
+                    url = next(pending, None)
+                if url is None:
+                    return
+                start = time.perf_counter()
+                code = workers.submit(serve, url).result()
+                with lock:
+                    samples.append((time.perf_counter() - start) * 1000)
+                    statuses.append(code)
+
+        start = time.perf_counter()
+        # `threads` WSGI workers serve one request each at a time; other clients wait in line,
+        # and that wait counts towards their latency.
+        with ThreadPoolExecutor(max_workers=threads) as workers, ThreadPoolExecutor(max_workers=clients) as users:
+            for future in [users.submit(client, workers) for _ in range(clients)]:
+                future.result()
+            # One task per worker thread (the barrier keeps any thread from taking two).
+            barrier = threading.Barrier(threads)
+            for future in [workers.submit(self.close_connections, barrier) for _ in range(threads)]:
+                future.result()
+        return self.summarize_run('wsgi', samples, statuses, time.perf_counter() - start)
+
+    @staticmethod
+    def close_connections(barrier):
+        barrier.wait()
+        connections.close_all()
+
+    def run_asgi(self, urls, clients):
+        application = AsyncReadsASGIHandler()
+        samples, statuses = [], []
+
+        async def request(url):
+            path, query = self.split_url(url)
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+                'root_path': '', 'server': (self.host, 80), 'client': ('127.0.0.1', 50000),
+                'headers': [(b'host', self.host.encode()), (b'authorization', self.authorization.encode())],
+            }
+            received = False
+
+            async def receive():
+                nonlocal received
+                if not received:
+                    received = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await asyncio.Event().wait()  # the client never disconnects early
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            start = time.perf_counter()
+            await application(scope, receive, send)
+            samples.append((time.perf_counter() - start) * 1000)
+
+        async def main():
+            pending = iter(urls)
+
+            async def client():
+                for url in pending:
+                    await request(url)
+
+            await asyncio.gather(*(client() for _ in range(clients)))
+
+        start = time.perf_counter()
+        asyncio.run(main())
+        return self.summarize_run('asgi', samples, statuses, time.perf_counter() - start)
@@ -0,0 +1,91 @@
+import json
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+
+from api.deletion import DEFAULT_CHUNK_SIZE, delete_contacts
+from api.models import Contact, Task
+
+
+class Command(BaseCommand):
+    help = (
+        'Create contacts with increasing numbers of tasks and time deleting each one with the single-transaction '
+        'cascade (Contact.delete) and with delete_contacts (tasks in chunks): total time, longest transaction '
+        'and peak Python memory'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fan-out', default='100,1000,10000,100000', help='Comma-separated tasks per contact')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        try:
+            fan_outs = [int(value) for value in options['fan_out'].split(',')]
+        except ValueError:
+            raise CommandError('--fan-out must be a comma-separated list of integers.')
+        if options['chunk_size'] < 1 or any(value < 0 for value in fan_outs):
+            raise CommandError('--chunk-size must be >= 1 and --fan-out values >= 0.')
+
+        results = []
+        # DEBUG keeps the SQL of every query, which would show up as memory growing with the task count.
+        with override_settings(DEBUG=False):
+            for tasks in fan_outs:
+                for method in ('cascade', 'chunked'):
+                    # tracemalloc slows Python down several times, so memory is measured on a second, untimed run.
+                    timings = self.measure(self.contact_with_tasks(tasks), method, options)
+                    peak = self.measure(self.contact_with_tasks(tasks), method, options, trace=True)['peak_mib']
+                    results.append({'tasks': tasks, 'method': method, **timings, 'peak_mib': peak})
+
+        report = {
+            'backend': connection.vendor,
+            'chunk_size': options['chunk_size'],
+            'measured_at': timezone.now().isoformat(),
+            'results': results,
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        for row in results:
+            self.stdout.write(
+                f"{row['tasks']:>8} tasks  {row['method']:<8} {row['seconds']:>8.2f}s  "
+                f"longest transaction {row['longest_transaction_seconds']:>7.2f}s  peak {row['peak_mib']:>7.1f} MiB"
+            )
+
+    @staticmethod
+    def contact_with_tasks(tasks, batch_size=5000):
+        contact = Contact.objects.create(full_name='Bench fan-out contact')
+        for start in range(0, tasks, batch_size):
+            Task.objects.bulk_create([
+                Task(contact=contact, title=f'Fan-out task {n}', is_done=n % 4 == 0)
+                for n in range(start, min(start + batch_size, tasks))
+            ])
+        return contact
+
+    @staticmethod
+    def measure(contact, method, options, trace=False):
+        marks = []
+        if trace:
+            tracemalloc.start()
+        start = time.perf_counter()
+        if method == 'cascade':
+            contact.delete()
+        else:
+            delete_contacts([contact.pk], chunk_size=options['chunk_size'], progress=lambda _: marks.append(time.perf_counter()))
+        end = time.perf_counter()
+        peak = 0
+        if trace:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        # Each chunk commits on its own; the last mark to `end` is the contact delete itself.
+        bounds = [start, *marks, end]
+        return {
+            'seconds': round(end - start, 3),
+            'transactions': len(bounds) - 1,
+            'longest_transaction_seconds': round(max(b - a for a, b in zip(bounds, bounds[1:])), 3),
+            'peak_mib': round(peak / 2 ** 20, 2),
+        }
@@ -0,0 +1,146 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.test import override_settings
+from django.utils import timezone
+
+from api.benchmarking import call_view, generate_dataset, measure, reset_data, summarize
+from api.duplicates import merge_contacts, refresh_duplicates
+from api.models import Contact, DuplicatePair
+from api.views import ContactViewSet
+
+VOWELS = 'aeiou'
+
+
+def typo(name, rng):
+    """`name` with one vowel of its first word changed, or its last letter dropped when it has none."""
+    first, _, rest = name.partition(' ')
+    positions = [i for i, ch in enumerate(first.lower()) if ch in VOWELS and i]
+    if positions:
+        i = rng.choice(positions)
+        first = first[:i] + rng.choice([v for v in VOWELS if v != first[i].lower()]) + first[i + 1:]
+    else:
+        first = first[:-1]
+    return f'{first} {rest}'
+
+
+def variant(contact, kind, rng):
+    """A near duplicate of `contact`: another phone format, email case and tag, name typo or word order."""
+    digits = contact.phone.lstrip('+') if contact.phone else ''
+    local, _, domain = contact.email.partition('@') if contact.email else ('', '', '')
+    if kind == 0:
+        return Contact(full_name=typo(contact.full_name, rng), phone=f'00{digits}' if digits else '', email='')
+    if kind == 1:
+        words = contact.full_name.upper().split()
+        email = f'{local.title()}+crm@{domain.upper()}' if local else ''
+        return Contact(full_name=' '.join(words[1:] + words[:1]), phone='', email=email)
+    return Contact(
+        full_name=typo(contact.full_name, rng), phone=digits, email=f'{local}+dup@{domain}' if local else '',
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Replace the data with --contacts synthetic contacts plus near duplicates of --duplicates of them, then '
+        'time a full and an incremental duplicate refresh, the /api/contacts/duplicates/ endpoint and a merge; '
+        'report pairs compared against all pairs, precision and recall'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--contacts', type=int, default=100_000)
+        parser.add_argument('--duplicates', type=float, default=0.02, help='Fraction of contacts given a near duplicate')
+        parser.add_argument('--changed', type=float, default=0.001, help='Fraction of contacts renamed before the incremental refresh')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        contacts = options['contacts']
+        if contacts < 2 or not 0 <= options['duplicates'] <= 1 or not 0 <= options['changed'] <= 1 or options['repeat'] < 1:
+            raise CommandError('--contacts must be >= 2, --duplicates and --changed between 0 and 1, --repeat >= 1.')
+        rng = random.Random(options['seed'])
+
+        # DEBUG keeps the SQL of every query, which would grow with the number of contacts.
+        with override_settings(DEBUG=False):
+            start = time.perf_counter()
+            reset_data()
+            generate_dataset(contacts, 0, seed=options['seed'])
+            truth = self.add_duplicates(contacts, options['duplicates'], rng)
+            generated = time.perf_counter() - start
+            total = Contact.objects.count()
+
+            start = time.perf_counter()
+            full = refresh_duplicates(full=True)
+            full_seconds = time.perf_counter() - start
+            found = set(DuplicatePair.objects.values_list('contact_id', 'other_id'))
+
+            renamed = list(Contact.objects.order_by('?').values_list('pk', flat=True)[:max(1, int(total * options['changed']))])
+            Contact.objects.filter(pk__in=renamed).update(full_name=Concat(F('full_name'), Value(' Jr')))
+            start = time.perf_counter()
+            incremental = refresh_duplicates()
+            incremental_seconds = time.perf_counter() - start
+
+            view = ContactViewSet.as_view({'get': 'duplicates'})
+            listing = {
+                'first_page': summarize(measure(lambda: call_view(view, '/api/contacts/duplicates/'), repeat=options['repeat'])),
+                'cursor_page': summarize(measure(
+                    lambda: call_view(view, '/api/contacts/duplicates/', {'cursor': ''}), repeat=options['repeat'],
+                )),
+            }
+            pair = DuplicatePair.objects.order_by('-score', 'id').first()
+            merge_ms = None
+            if pair is not None:
+                start = time.perf_counter()
+                merge_contacts(pair.contact_id, [pair.other_id])
+                merge_ms = round((time.perf_counter() - start) * 1000, 3)
+
+        hits = len(found & truth)
+        report = {
+            'backend': connection.vendor,
+            'contacts': total,
+            'true_pairs': len(truth),
+            'generate_seconds': round(generated, 1),
+            'full_refresh': {
+                **full, 'seconds': round(full_seconds, 2), 'contacts_per_second': round(total / full_seconds),
+                'all_pairs': total * (total - 1) // 2,
+                'compared_per_contact': round(full['compared'] / total, 2),
+            },
+            'incremental_refresh': {**incremental, 'renamed': len(renamed), 'seconds': round(incremental_seconds, 3)},
+            'precision': round(hits / len(found), 4) if found else None,
+            'recall': round(hits / len(truth), 4) if truth else None,
+            'list': listing,
+            'merge_ms': merge_ms,
+            'measured_at': timezone.now().isoformat(),
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        full = report['full_refresh']
+        self.stdout.write(
+            f"{total} contacts, {len(truth)} planted duplicates ({connection.vendor})\n"
+            f"full refresh         {full['seconds']:>9.2f}s  {full['contacts_per_second']} contacts/s, "
+            f"{full['compared']} pairs compared of {full['all_pairs']} ({full['compared_per_contact']} per contact)\n"
+            f"incremental refresh  {report['incremental_refresh']['seconds']:>9.3f}s  "
+            f"{report['incremental_refresh']['contacts']} contacts rescanned after renaming {len(renamed)}\n"
+            f"found {len(found)} pairs: precision {report['precision']}, recall {report['recall']}\n"
+            f"GET /api/contacts/duplicates/  p50={listing['first_page']['p50_ms']:.2f}ms  "
+            f"cursor p50={listing['cursor_page']['p50_ms']:.2f}ms  merge {merge_ms} ms"
+        )
+
+    @staticmethod
+    def add_duplicates(contacts, rate, rng):
+        """Insert a near duplicate of `rate` of the contacts; return the `(older pk, newer pk)` pairs."""
+        originals = list(Contact.objects.order_by('pk').values_list('pk', flat=True))
+        chosen = sorted(rng.sample(originals, int(contacts * rate)))
+        truth = set()
+        for start in range(0, len(chosen), 5000):
+            batch = Contact.objects.filter(pk__in=chosen[start:start + 5000]).order_by('pk')
+            sources = list(batch)
+            copies = Contact.objects.bulk_create([variant(contact, n % 3, rng) for n, contact in enumerate(sources, start)])
+            truth.update((source.pk, copy.pk) for source, copy in zip(sources, copies))
+        return truth
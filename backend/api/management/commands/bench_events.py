@@ -0,0 +1,122 @@
+import asyncio
+import json
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import F
+from django.test import override_settings
+from django.utils import timezone
+
+from api.benchmarking import summarize
+from api.events import EventStreamView, hub
+from api.changes import sequence_state
+from api.models import Contact
+
+BACKENDS = {'local': 'api.events.LocalBackend', 'changelog': 'api.events.ChangeLogBackend'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Open many /api/events/ streams in one process (one worker) and measure the memory and time per '
+        'connected client and the latency from commit to each client for a series of contact updates'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=1000)
+        parser.add_argument('--events', type=int, default=50, help='Contact updates to fan out')
+        parser.add_argument('--interval-ms', type=float, default=20, help='Pause between updates')
+        parser.add_argument('--backend', choices=[*BACKENDS, 'both'], default='both')
+        parser.add_argument('--poll-interval', type=float, default=0.5, help='ChangeLogBackend POLL_INTERVAL')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        contacts = list(Contact.objects.order_by('pk').values_list('pk', flat=True)[:options['events']])
+        if not contacts:
+            raise CommandError('No contacts found; run `seed --contacts N` first.')
+        backends = list(BACKENDS) if options['backend'] == 'both' else [options['backend']]
+        results = []
+        for name in backends:
+            with override_settings(CRM_EVENTS={
+                'BACKEND': BACKENDS[name], 'POLL_INTERVAL': options['poll_interval'],
+                'QUEUE_SIZE': options['events'] * 2 + 10, 'MAX_CLIENTS': options['clients'],
+            }):
+                results.append({'backend': name, **asyncio.run(self.run(contacts, options))})
+
+        report = {
+            'database': connection.vendor,
+            'clients': options['clients'],
+            'events': options['events'],
+            'measured_at': timezone.now().isoformat(),
+            'results': results,
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        for row in results:
+            self.stdout.write(
+                f"{row['backend']:<9} connect {row['connect_ms_per_client']:.3f} ms/client, "
+                f"{row['memory_kb_per_client']:.1f} KiB/client; delivered {row['delivered']}/{row['expected']}; "
+                f"latency p50={row['latency']['p50_ms']:.2f}ms p99={row['latency']['p99_ms']:.2f}ms; "
+                f"all clients p50={row['fan_out']['p50_ms']:.2f}ms p99={row['fan_out']['p99_ms']:.2f}ms"
+            )
+
+    async def run(self, contacts, options):
+        clients, events = options['clients'], len(contacts)
+        committed, received = {}, {}
+        ready = asyncio.Event()
+        connected = 0
+
+        async def client():
+            nonlocal connected
+            async for chunk in EventStreamView.stream(None, None):
+                now = time.perf_counter()
+                for frame in chunk.split(b'\n\n'):
+                    if frame.startswith(b'id: '):
+                        received.setdefault(int(frame[4:frame.index(b'\n')]), []).append(now)
+                if chunk.startswith(b'retry:'):
+                    connected += 1
+                    if connected == clients:
+                        ready.set()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        tasks = [asyncio.create_task(client()) for _ in range(clients)]
+        await ready.wait()
+        connect_seconds = time.perf_counter() - start
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        def write():
+            try:
+                # One change per update, from one writer: the nth update commits under the nth seq after `last`.
+                last, _ = sequence_state()
+                for seq, pk in enumerate(contacts, last + 1):
+                    Contact.objects.filter(pk=pk).update(full_name=F('full_name'))
+                    committed[seq] = time.perf_counter()
+                    time.sleep(options['interval_ms'] / 1000)
+            finally:
+                connection.close()
+
+        try:
+            await asyncio.to_thread(write)
+            deadline = time.perf_counter() + options['poll_interval'] + 10
+            while sum(map(len, received.values())) < clients * events and time.perf_counter() < deadline:
+                await asyncio.sleep(0.01)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            hub.stop()
+
+        latency = [(at - committed[seq]) * 1000 for seq, times in received.items() for at in times if seq in committed]
+        fan_out = [(max(times) - committed[seq]) * 1000 for seq, times in received.items() if seq in committed]
+        return {
+            'connect_ms_per_client': round(connect_seconds * 1000 / clients, 3),
+            'memory_kb_per_client': round(memory / 1024 / clients, 1),
+            'delivered': sum(map(len, received.values())),
+            'expected': clients * events,
+            'latency': summarize(latency or [0]),
+            'fan_out': summarize(fan_out or [0]),
+        }
@@ -0,0 +1,50 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.benchmarking import ensure_rows, measure, summarize
+
+
+class Command(BaseCommand):
+    help = 'Measure the latency overhead of the request metrics middleware through the full Django stack'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--contacts', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=300)
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        ensure_rows(options['contacts'], tasks_per_contact=1)
+        user, _ = User.objects.get_or_create(username='bench-metrics', defaults={'is_staff': True})
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}', SERVER_NAME='localhost')
+
+        results = []
+        for path in ('/api/contacts/', '/api/tasks/?is_done=false', '/api/contacts/?search=Haddad'):
+            samples = {'off': [], 'on': []}
+            with override_settings(CRM_RESPONSE_CACHE={'ENABLED': False}, ALLOWED_HOSTS=['localhost']):
+                # Alternate the two modes request by request so drift (caches,
+                # CPU frequency) affects both equally.
+                for run in range(options['repeat'] * 2):
+                    mode = ('off', 'on')[run % 2]
+                    with override_settings(CRM_METRICS={'ENABLED': mode == 'on'}):
+                        samples[mode].extend(measure(lambda: client.get(path), repeat=1, warmup=int(run < 10)))
+            off, on = summarize(samples['off']), summarize(samples['on'])
+            results.append({
+                'path': path,
+                'off_p50_ms': off['p50_ms'], 'on_p50_ms': on['p50_ms'],
+                'off_p95_ms': off['p95_ms'], 'on_p95_ms': on['p95_ms'],
+                'overhead_p50_ms': round(on['p50_ms'] - off['p50_ms'], 3),
+                'overhead_p50_pct': round((on['p50_ms'] - off['p50_ms']) / off['p50_ms'] * 100, 2),
+            })
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for row in results:
+            self.stdout.write(
+                f"{row['path']:<32} off p50={row['off_p50_ms']:>7.2f}ms  on p50={row['on_p50_ms']:>7.2f}ms  "
+                f"overhead={row['overhead_p50_ms']:>+6.3f}ms ({row['overhead_p50_pct']:+.1f}%)"
+            )
@@ -0,0 +1,61 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from api.benchmarking import call_view, ensure_rows, measure, summarize
+from api.models import Contact, Task
+from api.pagination import KeysetPagination
+from api.views import ContactViewSet, TaskViewSet
+
+
+class Command(BaseCommand):
+    help = 'Compare page-number and cursor pagination latency on the first and a deep page'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page', type=int, default=10000, help='Deep page number to measure')
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        page, page_size = options['page'], options['page_size']
+        rows = page * page_size
+        self.stdout.write(f'Ensuring at least {rows} contacts and tasks exist...')
+        ensure_rows(rows, tasks_per_contact=1)
+
+        results = []
+        for name, viewset, model, path in (
+            ('contacts', ContactViewSet, Contact, '/api/contacts/'),
+            ('tasks', TaskViewSet, Task, '/api/tasks/'),
+        ):
+            view = viewset.as_view({'get': 'list'})
+            deep_cursor = self.cursor_for_page(model, page, page_size)
+            cases = {
+                'page:1': {'page': 1},
+                f'page:{page}': {'page': page},
+                'cursor:1': {'cursor': ''},
+                f'cursor:{page}': {'cursor': deep_cursor},
+            }
+            for label, params in cases.items():
+                if name == 'tasks':
+                    params = {**params, 'page_size': page_size}
+                samples = measure(lambda: call_view(view, path, params), repeat=options['repeat'])
+                results.append({'endpoint': name, 'case': label, **summarize(samples)})
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for row in results:
+            self.stdout.write(
+                f"{row['endpoint']:<9} {row['case']:<14} p50={row['p50_ms']:>9.2f}ms  p95={row['p95_ms']:>9.2f}ms"
+            )
+
+    def cursor_for_page(self, model, page, page_size):
+        """Cursor pointing at the last row of page `page - 1`, i.e. one that opens `page`."""
+        paginator = KeysetPagination(page_size)
+        queryset = model.objects.order_by('-created_at')
+        paginator.prepare(queryset)
+        last = queryset.order_by(*paginator.ordering).values(*[f.attname for f in paginator.fields])[
+            (page - 1) * page_size - 1
+        ]
+        return paginator.make_cursor(paginator.position(last))
@@ -0,0 +1,87 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from api.benchmarking import call_view, measure, summarize
+from api.fastread import FastJSONRenderer, orjson
+from api.views import ContactViewSet, TaskViewSet
+
+
+class Command(BaseCommand):
+    help = 'Compare the serializer and fast read paths: rows/sec for fetch+serialize+render, and list latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Rows per run of the row throughput benchmark')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        results = []
+        for viewset in (ContactViewSet, TaskViewSet):
+            view = viewset()
+            # Primary key order keeps the SQL cheap so the numbers are about Python-side cost.
+            queryset = viewset.queryset.order_by('pk')[:rows]
+            count = queryset.count()
+            if not count:
+                raise CommandError('No rows found; run `seed --contacts N` first.')
+
+            def serializer_path():
+                data = viewset.serializer_class(list(queryset), many=True).data
+                return JSONRenderer().render(data)
+
+            def fast_path():
+                values, convert = view.fast_read_rows(queryset, list(viewset.fast_read_fields))
+                response = Response([convert(row) for row in values])
+                response.fast_read = True
+                return FastJSONRenderer().render(response.data, renderer_context={'response': response})
+
+            if serializer_path() != fast_path():
+                raise CommandError(f'{viewset.__name__}: fast path output differs from the serializers.')
+            timings = {name: summarize(measure(func, repeat=repeat)) for name, func in (
+                ('serializer', serializer_path), ('fast', fast_path))}
+            results.append({
+                'case': f'{viewset.export_name}:rows',
+                'rows': count,
+                'serializer_rows_per_sec': round(count / timings['serializer']['p50_ms'] * 1000),
+                'fast_rows_per_sec': round(count / timings['fast']['p50_ms'] * 1000),
+                'speedup': round(timings['serializer']['p50_ms'] / timings['fast']['p50_ms'], 2),
+            })
+
+        list_views = (
+            ('contacts:list', ContactViewSet.as_view({'get': 'list'}), '/api/contacts/', {}),
+            ('tasks:list-100', TaskViewSet.as_view({'get': 'list'}), '/api/tasks/', {'page_size': 100}),
+        )
+        with override_settings(CRM_RESPONSE_CACHE={'ENABLED': False}):
+            for label, view, path, params in list_views:
+                samples = {}
+                for mode in (False, True):
+                    with override_settings(CRM_FAST_READS=mode):
+                        samples[mode] = summarize(measure(lambda: call_view(view, path, params), repeat=repeat))
+                results.append({
+                    'case': label,
+                    'serializer_p50_ms': samples[False]['p50_ms'],
+                    'fast_p50_ms': samples[True]['p50_ms'],
+                    'speedup': round(samples[False]['p50_ms'] / samples[True]['p50_ms'], 2),
+                })
+
+        report = {'orjson': orjson is not None, 'measured_at': timezone.now().isoformat(), 'results': results}
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(f"orjson: {'yes' if report['orjson'] else 'no (stdlib json)'}")
+        for row in results:
+            if 'rows' in row:
+                self.stdout.write(
+                    f"{row['case']:<16} serializer={row['serializer_rows_per_sec']:>9} rows/s  "
+                    f"fast={row['fast_rows_per_sec']:>9} rows/s  x{row['speedup']}"
+                )
+            else:
+                self.stdout.write(
+                    f"{row['case']:<16} serializer p50={row['serializer_p50_ms']:>7.2f}ms  "
+                    f"fast p50={row['fast_p50_ms']:>7.2f}ms  x{row['speedup']}"
+                )
@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.benchmarking import call_view, ensure_rows, measure, summarize
+from api.views import ContactViewSet
+
+
+class Command(BaseCommand):
+    help = 'Measure /api/contacts/?search= latency for name, phone and email terms'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--contacts', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        contacts = options['contacts']
+        self.stdout.write(f'Ensuring at least {contacts} contacts exist...')
+        ensure_rows(contacts, tasks_per_contact=0)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE api_contact')
+
+        probe = contacts // 2
+        terms = {
+            'name-substring': 'Haddad',
+            'name-rare': f'{probe:x}',
+            'name-two-terms': 'Lina Khalil',
+            'phone-prefix': f'+1{probe:011d}'[:10],
+            'email-prefix': f'bench{probe}@',
+            'no-match': 'zzqqxx',
+        }
+        view = ContactViewSet.as_view({'get': 'list'})
+        results = []
+        for label, term in terms.items():
+            samples = measure(lambda: call_view(view, '/api/contacts/', {'search': term}), repeat=options['repeat'])
+            results.append({'case': label, 'term': term, 'backend': connection.vendor, **summarize(samples)})
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for row in results:
+            self.stdout.write(
+                f"{row['case']:<16} p50={row['p50_ms']:>9.2f}ms  p95={row['p95_ms']:>9.2f}ms  p99={row['p99_ms']:>9.2f}ms"
+            )
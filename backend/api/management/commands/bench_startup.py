@@ -0,0 +1,147 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter per sample: set Django up, then serve one
+# unauthenticated GET through the WSGI handler (URLconf, views, DRF and
+# authentication load, no query runs) and print the timings.
+PROBE = r'''
+import json, os, sys, time
+from io import BytesIO
+spawned = float(os.environ['CRM_BENCH_SPAWNED_AT'])
+start = time.time()
+import django
+django.setup()
+setup = time.time()
+print('-- setup done', file=sys.stderr, flush=True)
+from django.core.handlers.wsgi import WSGIHandler
+statuses = []
+WSGIHandler()({
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': sys.argv[1], 'QUERY_STRING': '', 'SERVER_NAME': sys.argv[2],
+    'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1', 'wsgi.input': BytesIO(), 'wsgi.url_scheme': 'http',
+    'wsgi.errors': sys.stderr,
+}, lambda status, headers, exc_info=None: statuses.append(status))
+served = time.time()
+print(json.dumps({
+    'interpreter_ms': (start - spawned) * 1000, 'setup_ms': (setup - spawned) * 1000,
+    'first_request_ms': (served - spawned) * 1000, 'status': statuses[0],
+}))
+'''
+IMPORT_TIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+SETUP_DONE = '-- setup done'
+
+
+def parse_importtime(stderr):
+    """
+    `{'setup': [...], 'request': [...]}` lists of `(module, self µs)` from the
+    `python -X importtime` output of PROBE, split at the end of django.setup().
+    """
+    phases = {'setup': [], 'request': []}
+    phase = phases['setup']
+    for line in stderr.splitlines():
+        if line == SETUP_DONE:
+            phase = phases['request']
+            continue
+        match = IMPORT_TIME.match(line)
+        if match:
+            phase.append((match[4], int(match[1])))
+    return phases
+
+
+def package_of(module):
+    """Group modules two levels deep (`rest_framework.serializers`), three under `django.contrib`."""
+    parts = module.split('.')
+    return '.'.join(parts[:3 if module.startswith('django.contrib.') else 2])
+
+
+def import_report(modules, top):
+    """Module count, total self import time and the `top` costliest packages."""
+    packages = {}
+    for name, self_us in modules:
+        packages[package_of(name)] = packages.get(package_of(name), 0) + self_us
+    return {
+        'modules': len(modules),
+        'import_ms': round(sum(self_us for _, self_us in modules) / 1000, 1),
+        'packages': [[name, round(us / 1000, 1)] for name, us in sorted(packages.items(), key=lambda i: -i[1])[:top]],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Time Django startup (django.setup) and time-to-first-request in fresh processes for each settings '
+        'profile, with a -X importtime breakdown per package; fail when the first request exceeds --budget-ms'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles', default='',
+            help='Comma-separated settings modules (default: the current settings and config.settings.lean on top of them)',
+        )
+        parser.add_argument('--path', default='/api/contacts/', help='Path of the first request')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--top', type=int, default=10, help='Packages and modules to list per profile')
+        parser.add_argument('--budget-ms', type=float, help='Maximum median time to first request, per profile')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be >= 1.')
+        base = settings.SETTINGS_MODULE
+        profiles = [name for name in options['profiles'].split(',') if name] or [base, 'config.settings.lean']
+        host = next((h for h in settings.ALLOWED_HOSTS if h != '*' and not h.startswith('.')), 'localhost')
+
+        results = []
+        for profile in profiles:
+            env = {**os.environ, 'DJANGO_SETTINGS_MODULE': profile}
+            if profile != base:
+                env.setdefault('CRM_BASE_SETTINGS', base)
+            samples = [self.probe(env, options['path'], host) for _ in range(options['repeat'])]
+            imports = self.probe(env, options['path'], host, importtime=True)
+            results.append({
+                'profile': profile,
+                'status': samples[0]['status'],
+                **{
+                    name: round(statistics.median(sample[name] for sample in samples), 1)
+                    for name in ('interpreter_ms', 'setup_ms', 'first_request_ms')
+                },
+                'imports': {phase: import_report(modules, options['top']) for phase, modules in imports['modules'].items()},
+            })
+
+        report = {'path': options['path'], 'repeat': options['repeat'], 'budget_ms': options['budget_ms'], 'results': results}
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            for row in results:
+                self.stdout.write(
+                    f"{row['profile']}: django.setup {row['setup_ms']:.1f} ms, "
+                    f"first request {row['first_request_ms']:.1f} ms ({row['status']})"
+                )
+                for phase, imports in row['imports'].items():
+                    self.stdout.write(f"  {phase}: {imports['modules']} modules, {imports['import_ms']:.1f} ms of imports")
+                    for package, ms in imports['packages']:
+                        self.stdout.write(f'    {ms:>8.1f} ms  {package}')
+
+        over = [row for row in results if options['budget_ms'] is not None and row['first_request_ms'] > options['budget_ms']]
+        if over:
+            raise CommandError('; '.join(
+                f"{row['profile']}: first request after {row['first_request_ms']:.1f} ms, "
+                f"over the {options['budget_ms']:g} ms budget" for row in over
+            ))
+
+    def probe(self, env, path, host, importtime=False):
+        command = [sys.executable, *(['-X', 'importtime'] if importtime else []), '-c', PROBE, path, host]
+        env = {**env, 'CRM_BENCH_SPAWNED_AT': repr(time.time())}
+        process = subprocess.run(command, env=env, cwd=settings.BASE_DIR, capture_output=True, text=True)
+        if process.returncode:
+            raise CommandError(f"{env['DJANGO_SETTINGS_MODULE']} failed to start:\n{process.stderr[-2000:]}")
+        sample = json.loads(process.stdout.strip().splitlines()[-1])
+        if importtime:
+            sample['modules'] = parse_importtime(process.stderr)
+        return sample
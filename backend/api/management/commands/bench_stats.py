@@ -0,0 +1,69 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+from django.test import override_settings
+from django.utils import timezone
+
+from api.benchmarking import call_view, ensure_rows, measure, summarize
+from api.models import Contact, StatCounter, Task
+from api.stats import DUE_SOON_DAYS, computed_counters, dashboard_stats, stored_counters
+from api.views import StatsView
+
+
+def scan_stats(today):
+    """The dashboard numbers computed from the contact and task tables on every call."""
+    week_end = today + timedelta(days=DUE_SOON_DAYS)
+    return (
+        list(Contact.objects.order_by().values_list('status').annotate(rows=Count('pk'))),
+        list(Task.objects.order_by().values_list('priority', 'is_done').annotate(rows=Count('pk'))),
+        Task.objects.filter(is_done=False, due_date__lt=week_end).aggregate(
+            overdue=Count('pk', filter=Q(due_date__lt=today)),
+            due_this_week=Count('pk', filter=Q(due_date__gte=today)),
+        ),
+    )
+
+
+class Command(BaseCommand):
+    help = 'Compare /api/stats/ (incremental counters) with computing the same numbers by scanning the tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--contacts', type=int, help='Top the tables up to N contacts first (see --tasks-per-contact)')
+        parser.add_argument('--tasks-per-contact', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        if options['contacts']:
+            ensure_rows(options['contacts'], tasks_per_contact=options['tasks_per_contact'])
+        today = timezone.localdate()
+        repeat = options['repeat']
+        view = StatsView.as_view()
+        with override_settings(CRM_STATS={'CACHE_TIMEOUT': 0}):
+            counters = summarize(measure(lambda: dashboard_stats(today), repeat=repeat))
+            endpoint = summarize(measure(lambda: call_view(view, '/api/stats/'), repeat=repeat))
+        # Scans get slow on big tables; a few runs are enough to see it.
+        scan = summarize(measure(lambda: scan_stats(today), repeat=max(1, min(repeat, 5))))
+        stored = {key: value for key, value in stored_counters().items() if value}
+        report = {
+            'contacts': Contact.objects.count(),
+            'tasks': Task.objects.count(),
+            'counter_rows': StatCounter.objects.count(),
+            'in_sync': stored == {key: value for key, value in computed_counters().items() if value},
+            'counters_p50_ms': counters['p50_ms'],
+            'endpoint_p50_ms': endpoint['p50_ms'],
+            'scan_p50_ms': scan['p50_ms'],
+            'speedup': round(scan['p50_ms'] / counters['p50_ms'], 1),
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(
+            f"{report['tasks']} tasks, {report['contacts']} contacts, {report['counter_rows']} counter rows "
+            f"(in sync: {'yes' if report['in_sync'] else 'NO'})"
+        )
+        self.stdout.write(
+            f"counters p50={report['counters_p50_ms']:.2f}ms  endpoint p50={report['endpoint_p50_ms']:.2f}ms  "
+            f"scan p50={report['scan_p50_ms']:.2f}ms  x{report['speedup']}"
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.changes import compact_changes
+
+
+class Command(BaseCommand):
+    help = (
+        'Compact the /api/changes/ log to the latest entry per object and drop deletions older than --days '
+        '(run periodically; clients with older cursors must reload)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Keep deletions for this many days')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Log entries checked per transaction')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--days must be >= 0 and --batch-size >= 1.')
+        superseded, expired = compact_changes(options['days'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Compacted change log: {superseded} superseded entries and {expired} expired deletions removed'
+        ))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.duplicates import refresh_duplicates
+
+
+class Command(BaseCommand):
+    help = (
+        'Find likely duplicate contacts for /api/contacts/duplicates/ (api.duplicates): rescan the contacts '
+        'changed since the last run, or all of them with --full'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rebuild the keys and pairs of every contact')
+        parser.add_argument('--chunk-size', type=int, help='Contacts per batch (default CRM_DUPLICATES CHUNK_SIZE)')
+        parser.add_argument('--interval', type=float, help='Keep running, refreshing every this many seconds')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] is not None and options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be >= 1.')
+        if options['interval'] is not None and options['interval'] <= 0:
+            raise CommandError('--interval must be positive.')
+        full = options['full']
+        while True:
+            start = time.perf_counter()
+            result = refresh_duplicates(full=full, chunk_size=options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f"{'Rebuilt' if result['full'] else 'Refreshed'} duplicates in {time.perf_counter() - start:.1f}s: "
+                f"{result['contacts']} contacts scanned, {result['compared']} pairs compared, {result['pairs']} pairs found"
+            ))
+            if options['interval'] is None:
+                return
+            full = False
+            time.sleep(options['interval'])
@@ -0,0 +1,46 @@
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importer import IMPORTERS, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Stream contacts or tasks from a CSV/NDJSON file into the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file, or NDJSON with a .ndjson/.jsonl suffix')
+        parser.add_argument('--model', choices=sorted(IMPORTERS), required=True)
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--rejects', help='Where to write rejected rows (default: <path>.rejects.ndjson)')
+        parser.add_argument('--no-copy', action='store_true', help='Use bulk_create even on PostgreSQL')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'{path} does not exist')
+        rejects_path = Path(options['rejects'] or f'{path}.rejects.ndjson')
+
+        importer = IMPORTERS[options['model']](
+            chunk_size=options['chunk_size'],
+            use_copy=False if options['no_copy'] else None,
+        )
+        start = time.perf_counter()
+        with rejects_path.open('w', encoding='utf-8') as rejects:
+            def write_reject(line, errors, row):
+                rejects.write(json.dumps({'line': line, 'errors': errors, 'row': row}, default=str) + '\n')
+
+            importer.run(read_rows(path), write_reject)
+        elapsed = time.perf_counter() - start
+
+        if not importer.rejected:
+            rejects_path.unlink()
+        rate = (importer.imported + importer.rejected) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {importer.imported} {options["model"]}, rejected {importer.rejected} '
+            f'in {elapsed:.1f}s ({rate:.0f} rows/s, {"COPY" if importer.use_copy else "bulk_create"})'
+        ))
+        if importer.rejected:
+            self.stdout.write(f'Rejected rows written to {rejects_path}')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.jobs import prune_jobs
+
+
+class Command(BaseCommand):
+    help = 'Delete background jobs that finished more than --days ago, with their export files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7)
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError('--days must be >= 0.')
+        deleted = prune_jobs(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} finished jobs'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from api.stats import recompute_counters
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the /api/stats/ counters from the contact and task tables (run periodically to correct drift)'
+
+    def handle(self, *args, **options):
+        corrected = recompute_counters()
+        for metric, bucket in corrected:
+            self.stdout.write(f'  corrected {metric}[{bucket}]')
+        self.stdout.write(self.style.SUCCESS(f'Recomputed stats: {len(corrected)} counters corrected'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Max
+
+from api.models import Contact, open_tasks_subquery
+
+
+class Command(BaseCommand):
+    help = 'Rebuild drifted Contact.open_tasks_count values from api_task in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Contacts per UPDATE')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = Contact.objects.aggregate(last=Max('pk'))['last'] or 0
+        fixed = 0
+
+        for start in range(0, last_id + 1, batch_size):
+            with transaction.atomic():
+                fixed += (
+                    Contact.objects
+                    .filter(pk__gte=start, pk__lt=start + batch_size)
+                    .annotate(actual=open_tasks_subquery())
+                    .exclude(open_tasks_count=F('actual'))
+                    .update(open_tasks_count=open_tasks_subquery())
+                )
+
+        self.stdout.write(self.style.SUCCESS(f'Reconciled open_tasks_count: {fixed} contacts corrected'))
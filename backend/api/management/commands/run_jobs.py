@@ -0,0 +1,39 @@
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        'Run queued background jobs (api.jobs) on a thread pool until stopped; start one per process '
+        'or host you want working the queue'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, help='Jobs run at a time (default CRM_JOBS THREADS)')
+        parser.add_argument('--poll-interval', type=float, help='Seconds between looks at an empty queue')
+        parser.add_argument('--lease', type=int, help='Seconds a claim lasts without renewal')
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due')
+        parser.add_argument(
+            '--exclusive', action='store_true',
+            help='Run only the jobs that must run alone (seed), one at a time; other workers skip them')
+
+    def handle(self, *args, **options):
+        for name in ('threads', 'poll_interval', 'lease'):
+            if options[name] is not None and options[name] <= 0:
+                raise CommandError(f"--{name.replace('_', '-')} must be positive.")
+        if options['exclusive'] and options['threads'] not in (None, 1):
+            raise CommandError('--exclusive runs one job at a time; drop --threads.')
+        worker = Worker(
+            threads=options['threads'], poll_interval=options['poll_interval'], lease=options['lease'],
+            exclusive=options['exclusive'],
+        )
+        if not options['once']:
+            # Finish the running jobs on Ctrl-C / `docker stop` instead of leaving them to lease expiry.
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *args: worker.stop())
+            self.stdout.write(f'Worker {worker.name} running {worker.threads} jobs at a time')
+        processed = worker.run(once=options['once'])
+        self.stdout.write(self.style.SUCCESS(f'Worker {worker.name} stopped after {processed} jobs'))
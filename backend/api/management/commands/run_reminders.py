@@ -0,0 +1,29 @@
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.reminders import Scheduler
+
+
+class Command(BaseCommand):
+    help = (
+        'Make due-date reminders (api.reminders) as they fire, sleeping until the next one, and queue '
+        'them for the run_jobs workers to send'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-sleep', type=float, help='Longest sleep between looks at the tasks (default CRM_REMINDERS MAX_SLEEP)')
+        parser.add_argument('--once', action='store_true', help='Make the reminders fired by now and exit')
+
+    def handle(self, *args, **options):
+        if options['max_sleep'] is not None and options['max_sleep'] <= 0:
+            raise CommandError('--max-sleep must be positive.')
+        scheduler = Scheduler(max_sleep=options['max_sleep'])
+        if options['once']:
+            made = scheduler.tick()
+        else:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *args: scheduler.stop())
+            self.stdout.write('Reminder scheduler running')
+            made = scheduler.run()
+        self.stdout.write(self.style.SUCCESS(f'Made {made} reminders'))
@@ -1,4 +1,8 @@
+import time
+
 from django.core.management.base import BaseCommand
+from api.benchmarking import generate_dataset, reset_data
+from api.jobs import enqueue
 from api.models import Contact, Task
 from datetime import date, timedelta
 import random
@@ -7,7 +11,24 @@ import random
 class Command(BaseCommand):
     help = 'Seed database with sample contacts and tasks'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--contacts', type=int, help='Generate N synthetic contacts instead of the sample set')
+        parser.add_argument('--tasks-per-contact', type=int, default=3)
+        parser.add_argument('--seed', type=int, help='Random seed, for reproducible data')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--background', action='store_true', help='Leave the work to a `run_jobs` worker')
+
     def handle(self, *args, **options):
+        if options['background']:
+            job = enqueue('seed', {
+                name: options[name] for name in ('contacts', 'tasks_per_contact', 'seed', 'batch_size')
+            })
+            self.stdout.write(self.style.SUCCESS(f'Queued job {job.pk}'))
+            return
+        if options['contacts'] is not None:
+            return self.generate(options)
+        random.seed(options['seed'])
+
         # Clear existing data
         Task.objects.all().delete()
         Contact.objects.all().delete()
@@ -60,4 +81,14 @@ class Command(BaseCommand):
         total_tasks = Task.objects.count()
         self.stdout.write(self.style.SUCCESS(
             f'\nSeeded {len(contacts)} contacts and {total_tasks} tasks'
-        ))
\ No newline at end of file
+        ))
+
+    def generate(self, options):
+        contacts, per_contact = options['contacts'], options['tasks_per_contact']
+        self.stdout.write(f'Generating {contacts} contacts with {per_contact} tasks each (seed {options["seed"] or 0})...')
+        start = time.perf_counter()
+        reset_data()
+        generate_dataset(contacts, per_contact, seed=options['seed'] or 0, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {contacts} contacts and {contacts * per_contact} tasks in {time.perf_counter() - start:.1f}s'
+        ))
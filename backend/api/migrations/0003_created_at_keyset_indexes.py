@@ -0,0 +1,21 @@
+# Generated by Django 5.2.11 on 2026-10-17 11:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_contact_unique_email_if_provided_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['-created_at', 'id'], name='contact_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['-created_at', 'id'], name='task_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.11 on 2026-10-17 11:14
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_open_tasks_count(apps, schema_editor):
+    Contact = apps.get_model('api', 'Contact')
+    Task = apps.get_model('api', 'Task')
+    open_tasks = (
+        Task.objects.filter(contact=OuterRef('pk'), is_done=False)
+        .order_by().values('contact').annotate(count=Count('pk')).values('count')
+    )
+    Contact.objects.update(open_tasks_count=Coalesce(Subquery(open_tasks), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_created_at_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contact',
+            name='open_tasks_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_open_tasks_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.11 on 2026-10-17 11:15
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+from api.operations import PortableAddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('api', '0004_contact_open_tasks_count'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        PortableAddIndexConcurrently(
+            model_name='contact',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('full_name'), name='gin_trgm_ops'), name='contact_name_trgm_idx'),
+        ),
+        PortableAddIndexConcurrently(
+            model_name='contact',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('email'), name='gin_trgm_ops'), name='contact_email_trgm_idx'),
+        ),
+        PortableAddIndexConcurrently(
+            model_name='contact',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('email'), name='text_pattern_ops'), name='contact_email_prefix_idx'),
+        ),
+        PortableAddIndexConcurrently(
+            model_name='contact',
+            index=models.Index(fields=['phone'], name='contact_phone_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.11 on 2026-10-17 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from api.operations import PortableAddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('api', '0005_contact_search_indexes'),
+    ]
+
+    operations = [
+        PortableAddIndexConcurrently(
+            model_name='contact',
+            index=models.Index(fields=['status', '-created_at', 'id'], name='contact_status_created_idx'),
+        ),
+        PortableAddIndexConcurrently(
+            model_name='contact',
+            index=models.Index(fields=['full_name', 'id'], name='contact_name_idx'),
+        ),
+        PortableAddIndexConcurrently(
+            model_name='task',
+            index=models.Index(fields=['contact', '-created_at', 'id'], name='task_contact_created_idx'),
+        ),
+        # The FK index is only dropped once task_contact_created_idx exists.
+        migrations.AlterField(
+            model_name='task',
+            name='contact',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='api.contact'),
+        ),
+        PortableAddIndexConcurrently(
+            model_name='task',
+            index=models.Index(condition=models.Q(('is_done', False)), fields=['-created_at', 'id'], name='task_open_created_idx'),
+        ),
+        PortableAddIndexConcurrently(
+            model_name='task',
+            index=models.Index(fields=['due_date'], name='task_due_date_idx'),
+        ),
+        PortableAddIndexConcurrently(
+            model_name='task',
+            index=models.Index(condition=models.Q(('is_done', False)), fields=['due_date'], name='task_open_due_idx'),
+        ),
+    ]
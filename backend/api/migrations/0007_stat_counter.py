@@ -0,0 +1,50 @@
+# Generated by Django 5.2.11 on 2026-10-17 13:21
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_stat_counters(apps, schema_editor):
+    Contact = apps.get_model('api', 'Contact')
+    Task = apps.get_model('api', 'Task')
+    StatCounter = apps.get_model('api', 'StatCounter')
+    counts = Counter()
+    for status, rows in Contact.objects.order_by().values_list('status').annotate(rows=Count('pk')):
+        counts['contacts', status] += rows
+    for priority, is_done, due_date, rows in (
+        Task.objects.order_by().values_list('priority', 'is_done', 'due_date').annotate(rows=Count('pk'))
+    ):
+        counts['tasks', priority] += rows
+        if is_done:
+            counts['done_tasks', priority] += rows
+        elif due_date is not None:
+            counts['open_due', due_date.isoformat()] += rows
+    StatCounter.objects.bulk_create(
+        [StatCounter(metric=metric, bucket=bucket, value=value) for (metric, bucket), value in counts.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_task_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=20)),
+                ('bucket', models.CharField(max_length=20)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('metric', 'bucket'), name='unique_stat_counter')],
+            },
+        ),
+        migrations.RunPython(backfill_stat_counters, migrations.RunPython.noop),
+    ]
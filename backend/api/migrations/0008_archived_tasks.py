@@ -0,0 +1,57 @@
+# Generated by Django 5.2.11 on 2026-10-17 13:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+TASK_COLUMNS = 'id, contact_id, title, due_date, priority, is_done, created_at'
+
+CREATE_TASK_RECORD_VIEW = f"""
+    CREATE VIEW api_taskrecord AS
+    SELECT {TASK_COLUMNS}, FALSE AS archived FROM api_task
+    UNION ALL
+    SELECT {TASK_COLUMNS}, TRUE AS archived FROM api_archivedtask
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_stat_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('due_date', models.DateField(blank=True, null=True)),
+                ('priority', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High')], max_length=20)),
+                ('is_done', models.BooleanField()),
+                ('created_at', models.DateTimeField()),
+                ('archived', models.BooleanField()),
+                ('contact', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='api.contact')),
+            ],
+            options={
+                'db_table': 'api_taskrecord',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedTask',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=255)),
+                ('due_date', models.DateField(blank=True, null=True)),
+                ('priority', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High')], default='medium', max_length=20)),
+                ('is_done', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField()),
+                ('contact', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_tasks', to='api.contact')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-created_at', 'id'], name='archived_created_id_idx'), models.Index(fields=['contact', '-created_at', 'id'], name='archived_contact_created_idx'), models.Index(condition=models.Q(('is_done', False)), fields=['-created_at', 'id'], name='archived_open_created_idx')],
+            },
+        ),
+        migrations.RunSQL(CREATE_TASK_RECORD_VIEW, 'DROP VIEW api_taskrecord'),
+    ]
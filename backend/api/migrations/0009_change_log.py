@@ -0,0 +1,57 @@
+# Generated by Django 5.2.11 on 2026-10-17 14:35
+
+from django.db import migrations, models
+from django.db.models import Max
+from django.utils import timezone
+
+
+def backfill_changes(apps, schema_editor):
+    """Log every existing contact and task as created, so `?since=0` returns the whole current state."""
+    Contact = apps.get_model('api', 'Contact')
+    Task = apps.get_model('api', 'Task')
+    Change = apps.get_model('api', 'Change')
+    ChangeSequence = apps.get_model('api', 'ChangeSequence')
+    offset = Contact.objects.aggregate(last=Max('pk'))['last'] or 0
+    last = offset + (Task.objects.aggregate(last=Max('pk'))['last'] or 0)
+    quote = schema_editor.quote_name
+    now = schema_editor.connection.ops.adapt_datetimefield_value(timezone.now())
+    with schema_editor.connection.cursor() as cursor:
+        for model, first_seq in ((Contact, 0), (Task, offset)):
+            cursor.execute(
+                f'INSERT INTO {quote(Change._meta.db_table)} (seq, model, object_id, action, changed_at) '
+                f"SELECT %s + id, %s, id, 'c', %s FROM {quote(model._meta.db_table)}",
+                [first_seq, model._meta.model_name, now],
+            )
+    ChangeSequence.objects.create(pk=1, value=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_archived_tasks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+                ('pruned_through', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('seq', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('c', 'Created'), ('u', 'Updated'), ('d', 'Deleted')], max_length=1)),
+                ('changed_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model', 'object_id', 'seq'], name='change_object_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_changes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.11 on 2026-10-17 17:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderCursor',
+            fields=[
+                ('kind', models.CharField(choices=[('upcoming', 'Upcoming'), ('overdue', 'Overdue')], max_length=10, primary_key=True, serialize=False)),
+                ('through', models.DateField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Reminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('upcoming', 'Upcoming'), ('overdue', 'Overdue')], max_length=10)),
+                ('due_through', models.DateField()),
+                ('task_ids', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('contact', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='api.contact')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('contact', 'kind', 'due_through'), name='unique_reminder_per_scan')],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.11 on 2026-10-17 17:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_reminders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DuplicateIndexState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.BigIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ContactKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField()),
+                ('contact', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.contact')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['contact'], name='contact_key_contact_idx')],
+                'constraints': [models.UniqueConstraint(fields=('key', 'contact'), name='unique_contact_key')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DuplicatePair',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('reasons', models.JSONField(default=list)),
+                ('found_at', models.DateTimeField(auto_now_add=True)),
+                ('contact', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.contact')),
+                ('other', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.contact')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-score', 'id'], name='duplicate_score_idx'), models.Index(fields=['other'], name='duplicate_other_idx')],
+                'constraints': [models.UniqueConstraint(fields=('contact', 'other'), name='unique_duplicate_pair'), models.CheckConstraint(condition=models.Q(('contact__lt', models.F('other'))), name='duplicate_pair_ordered')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations
+
+from api.operations import PortableAddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('api', '0012_duplicates'),
+    ]
+
+    operations = [
+        PortableAddIndexConcurrently(
+            model_name='contact',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('phone'), name='gin_trgm_ops'), name='contact_phone_trgm_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.11 on 2026-10-17 18:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_contact_phone_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('c', 'Created'), ('u', 'Updated'), ('d', 'Deleted')], max_length=1)),
+                ('changed_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.11 on 2026-10-17 18:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_pending_changes'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='statcounter',
+            name='unique_stat_counter',
+        ),
+        migrations.AddField(
+            model_name='statcounter',
+            name='shard',
+            field=models.SmallIntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='statcounter',
+            constraint=models.UniqueConstraint(fields=('metric', 'bucket', 'shard'), name='unique_stat_counter_shard'),
+        ),
+    ]
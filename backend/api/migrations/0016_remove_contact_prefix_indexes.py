@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from api.operations import PortableRemoveIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('api', '0015_stat_counter_shards'),
+    ]
+
+    operations = [
+        PortableRemoveIndexConcurrently(
+            model_name='contact',
+            name='contact_email_prefix_idx',
+        ),
+        PortableRemoveIndexConcurrently(
+            model_name='contact',
+            name='contact_phone_prefix_idx',
+        ),
+    ]
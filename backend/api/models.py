@@ -1,4 +1,17 @@
-from django.db import models
+import itertools
+import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db import DEFAULT_DB_ALIAS, connection, connections, models, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Upper
+from django.utils import timezone
+
+from api.signals import notify_changes_committed, notify_data_changed
 
 
 class StatusChoice(models.TextChoices):
@@ -10,12 +23,382 @@ class PriorityChoice(models.TextChoices):
     MEDIUM = 'medium', 'Medium'
     HIGH = 'high', 'High'
 
-class Contact(models.Model):
+class StatCounter(models.Model):
+    """
+    Counts behind `/api/stats/`, one row per `(metric, bucket)`: contacts per
+    status, tasks and done tasks per priority, open tasks per due date (ISO
+    date bucket). A counter is the sum of its rows over `STAT_SHARDS`
+    shards. Contact and Task writes add their deltas to their thread's shard
+    in the same transaction, so concurrent writers rarely wait on each
+    other's row locks; `recompute_stats` rebuilds the table from scratch with
+    one row per counter.
+    """
+    metric = models.CharField(max_length=20)
+    bucket = models.CharField(max_length=20)
+    shard = models.SmallIntegerField(default=0)
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'bucket', 'shard'], name='unique_stat_counter_shard'),
+        ]
+
+    def __str__(self):
+        return f'{self.metric}[{self.bucket}] = {self.value}'
+
+
+STAT_SHARDS = 16
+_stat_shard = threading.local()
+# Threads of one process take consecutive shards; the pid spreads the first threads of different processes.
+_next_stat_shard = itertools.count(os.getpid())
+
+
+def stat_shard():
+    """The StatCounter shard this thread writes to."""
+    shard = getattr(_stat_shard, 'value', None)
+    if shard is None:
+        shard = _stat_shard.value = next(_next_stat_shard) % STAT_SHARDS
+    return shard
+
+
+def apply_stat_deltas(deltas, batch_size=300):
+    """Add `{(metric, bucket): delta}` to this thread's shard of the StatCounter rows, creating missing rows."""
+    rows = sorted((key, delta) for key, delta in deltas.items() if delta)
+    if not rows:
+        return
+    shard = stat_shard()
+    table = connection.ops.quote_name(StatCounter._meta.db_table)
+    with connection.cursor() as cursor:
+        # Sorted keys take the row locks in the same order in every transaction.
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            cursor.execute(
+                f'INSERT INTO {table} (metric, bucket, shard, value) '
+                f'VALUES {", ".join(["(%s, %s, %s, %s)"] * len(batch))} '
+                f'ON CONFLICT (metric, bucket, shard) DO UPDATE SET value = {table}.value + EXCLUDED.value',
+                [param for (metric, bucket), delta in batch for param in (metric, bucket, shard, delta)],
+            )
+
+
+def stat_groups(queryset):
+    """`(STAT_FIELDS values, row count)` pairs for `queryset`, from one GROUP BY query."""
+    fields = queryset.model.STAT_FIELDS
+    for *values, rows in queryset.order_by().values(*fields).annotate(rows=Count('pk')).values_list(*fields, 'rows'):
+        yield values, rows
+
+
+def stat_counts(queryset, sign=1):
+    """StatCounter deltas for adding (or with `sign=-1`, removing) the rows of `queryset`."""
+    deltas = Counter()
+    for values, rows in stat_groups(queryset):
+        for key in queryset.model.stat_keys(*values):
+            deltas[key] += sign * rows
+    return deltas
+
+
+def object_stat_counts(objs):
+    """StatCounter deltas for adding the (unsaved or just inserted) model instances `objs`."""
+    deltas = Counter()
+    for obj in objs:
+        deltas.update(obj.stat_keys(*obj.stat_values()))
+    return deltas
+
+
+def update_with_stats(queryset, update, values):
+    """
+    Run `update(**values)` for `queryset` and return `(rows, StatCounter deltas)`.
+    Plain values are applied to the grouped counts read before the update;
+    expressions need the affected primary keys to read the counts again after.
+    """
+    model = queryset.model
+    changed = [name for name in model.STAT_FIELDS if name in values]
+    if not changed:
+        return update(**values), Counter()
+    if any(hasattr(values[name], 'resolve_expression') for name in changed):
+        rows = model.objects.filter(pk__in=list(queryset.values_list('pk', flat=True)))
+        deltas = stat_counts(rows, -1)
+        updated = update(**values)
+        deltas.update(stat_counts(rows))
+        return updated, deltas
+    new = {name: model._meta.get_field(name).to_python(values[name]) for name in changed}
+    deltas = Counter()
+    for old, rows in stat_groups(queryset):
+        for key in model.stat_keys(*old):
+            deltas[key] -= rows
+        for key in model.stat_keys(*(new.get(name, value) for name, value in zip(model.STAT_FIELDS, old))):
+            deltas[key] += rows
+    return update(**values), deltas
+
+
+class StatCountedMixin:
+    """Model side of StatCounter: `stat_keys(*values of STAT_FIELDS)` names the counters a row adds one to."""
+    STAT_FIELDS = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if all(name in field_names for name in cls.STAT_FIELDS):
+            instance._loaded_stats = instance.stat_values()
+        return instance
+
+    def stat_values(self):
+        return tuple(self._meta.get_field(name).to_python(getattr(self, name)) for name in self.STAT_FIELDS)
+
+    def _stored_stat_values(self):
+        if self._state.adding:
+            return None
+        if hasattr(self, '_loaded_stats'):
+            return self._loaded_stats
+        return type(self)._base_manager.filter(pk=self.pk).values_list(*self.STAT_FIELDS).first()
+
+    def _save_stats(self, previous, update_fields):
+        """Apply the deltas of a save that replaced `previous` (None for an insert)."""
+        current = self.stat_values()
+        if previous is not None and update_fields is not None:
+            current = tuple(
+                new if name in update_fields else old
+                for name, new, old in zip(self.STAT_FIELDS, current, previous)
+            )
+        if current != previous:
+            deltas = Counter(self.stat_keys(*current))
+            deltas.subtract(self.stat_keys(*previous) if previous is not None else ())
+            apply_stat_deltas(deltas)
+        self._loaded_stats = current
+
+    def _delete_stats(self, previous):
+        if previous is not None:
+            apply_stat_deltas(Counter({key: -1 for key in self.stat_keys(*previous)}))
+        self.__dict__.pop('_loaded_stats', None)
+
+
+class ChangeAction(models.TextChoices):
+    CREATED = 'c', 'Created'
+    UPDATED = 'u', 'Updated'
+    DELETED = 'd', 'Deleted'
+
+
+class Change(models.Model):
+    """
+    Change log behind `/api/changes/` (see `api.changes`): one row per
+    created, updated or deleted Contact or Task. Write transactions log into
+    PendingChange; `publish_changes` moves committed entries here under the
+    next `seq` values, so seqs become visible in commit order and a reader
+    never skips a late commit.
+    """
+    seq = models.BigIntegerField(primary_key=True)
+    model = models.CharField(max_length=10)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=1, choices=ChangeAction.choices)
+    changed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # compact_changes: later changes of the same object
+            models.Index(fields=['model', 'object_id', 'seq'], name='change_object_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.seq} {self.model}:{self.object_id} {self.get_action_display()}'
+
+
+class ChangeSequence(models.Model):
+    """
+    The single row (`id=1`) whose `value` is the last Change.seq handed out.
+    Only `publish_changes` updates it, in a transaction of its own, so the
+    lock orders publishers and never waits on a write transaction.
+    `pruned_through` is the last seq of a deletion that `compact_changes`
+    dropped.
+    """
+    value = models.BigIntegerField(default=0)
+    pruned_through = models.BigIntegerField(default=0)
+
+
+class PendingChange(models.Model):
+    """
+    A Change logged by a write transaction and not yet published. Writers
+    insert these without taking any lock and leave them to the next reader
+    of the log; the table's own id only orders entries within one publish.
+    """
+    model = models.CharField(max_length=10)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=1, choices=ChangeAction.choices)
+    changed_at = models.DateTimeField()
+
+
+_pending_changes = threading.local()
+
+
+def pending_changes(using):
+    state = getattr(_pending_changes, 'by_alias', None)
+    if state is None:
+        state = _pending_changes.by_alias = {}
+    return state.setdefault(using, {'depth': 0, 'changes': []})
+
+
+@contextmanager
+def recording_changes(using=None):
+    """
+    `transaction.atomic()` for model writes that log changes. Changes logged
+    with `log_change` inside are written when the outermost block ends, in
+    one multi-row INSERT per 1,000 changes.
+    """
+    state = pending_changes(using or DEFAULT_DB_ALIAS)
+    mark = len(state['changes'])
+    with transaction.atomic(using=using):
+        state['depth'] += 1
+        try:
+            yield
+        except BaseException:
+            del state['changes'][mark:]
+            raise
+        finally:
+            state['depth'] -= 1
+        if not state['depth']:
+            changes, state['changes'] = state['changes'], []
+            write_changes(changes, using)
+
+
+def log_change(model, action, pks, using=None):
+    """Log `action` for the `model` rows `pks`; written at the end of the enclosing `recording_changes`."""
+    pks = [pk for pk in pks if pk is not None]
+    if not pks:
+        return
+    state = pending_changes(using or DEFAULT_DB_ALIAS)
+    if state['depth']:
+        state['changes'].extend((model._meta.model_name, pk, action) for pk in pks)
+    else:
+        with transaction.atomic(using=using):
+            write_changes([(model._meta.model_name, pk, action) for pk in pks], using)
+
+
+def write_changes(changes, using=None, batch_size=1000):
+    """Stage `(model name, pk, action)` changes, to be published once the transaction commits."""
+    if not changes:
+        return
+    db = connections[using or DEFAULT_DB_ALIAS]
+    changed_at = db.ops.adapt_datetimefield_value(timezone.now())
+    # A plain multi-row INSERT: bulk_create's per-value preparation costs more than the insert itself
+    # for the tens of thousands of rows a large delete or import logs.
+    table = db.ops.quote_name(PendingChange._meta.db_table)
+    with db.cursor() as cursor:
+        for start in range(0, len(changes), batch_size):
+            batch = changes[start:start + batch_size]
+            cursor.execute(
+                f'INSERT INTO {table} (model, object_id, action, changed_at) '
+                f'VALUES {", ".join(["(%s, %s, %s, %s)"] * len(batch))}',
+                [param for change in batch for param in (*change, changed_at)],
+            )
+    # Only announced: publishing is left to the log's readers, so writers never queue on ChangeSequence.
+    transaction.on_commit(notify_changes_committed, using=using)
+
+
+def publish_changes(using=None, batch_size=1000):
+    """
+    Move the committed PendingChange entries to Change under the next seqs and
+    return them as `(seq, model name, pk, action)` rows. The ChangeSequence
+    lock is held only by this short transaction: an entry that commits after
+    it is published by a later call under higher seqs. Write transactions
+    never call it; every read of the log does (`/api/changes/`, the event
+    stream backends, `compact_changes`), publishing all the entries committed
+    since the last read in one batch.
+    """
+    using = using or DEFAULT_DB_ALIAS
+    pending = PendingChange.objects.using(using)
+    if not pending.exists():
+        return []
+    db = connections[using]
+    table = db.ops.quote_name(ChangeSequence._meta.db_table)
+    with transaction.atomic(using=using):
+        with db.cursor() as cursor:
+            # Waits for a concurrent publisher; the SELECT below then no longer sees what it moved.
+            cursor.execute(
+                f'INSERT INTO {table} (id, value, pruned_through) VALUES (1, 0, 0) '
+                f'ON CONFLICT (id) DO UPDATE SET value = {table}.value RETURNING value',
+            )
+            last = cursor.fetchone()[0]
+        staged = list(pending.order_by('pk').values_list('pk', 'model', 'object_id', 'action', 'changed_at'))
+        if not staged:
+            return []
+        rows = [(last + n, model, pk, action) for n, (_, model, pk, action, _) in enumerate(staged, 1)]
+        change_table = db.ops.quote_name(Change._meta.db_table)
+        with db.cursor() as cursor:
+            for start in range(0, len(staged), batch_size):
+                batch = staged[start:start + batch_size]
+                cursor.execute(
+                    f'INSERT INTO {change_table} (seq, model, object_id, action, changed_at) '
+                    f'VALUES {", ".join(["(%s, %s, %s, %s, %s)"] * len(batch))}',
+                    [
+                        param for seq, (_, model, pk, action, changed_at) in enumerate(batch, last + start + 1)
+                        for param in (seq, model, pk, action, db.ops.adapt_datetimefield_value(changed_at))
+                    ],
+                )
+                pending.filter(pk__in=[entry[0] for entry in batch]).delete()
+            cursor.execute(f'UPDATE {table} SET value = %s WHERE id = 1', [last + len(rows)])
+    return rows
+
+
+class ContactQuerySet(models.QuerySet):
+    """Bulk write paths that keep StatCounter in step and announce the change through `data_changed`."""
+
+    def update(self, **kwargs):
+        with recording_changes(using=self.db):
+            pks = list(self.values_list('pk', flat=True))
+            rows, deltas = update_with_stats(self, super().update, kwargs)
+            apply_stat_deltas(deltas)
+            log_change(self.model, ChangeAction.UPDATED, pks, self.db)
+        notify_data_changed(self.model)
+        return rows
+
+    update.alters_data = True
+
+    def delete(self):
+        with recording_changes(using=self.db):
+            # Cascaded task deletes bypass TaskQuerySet, so they are counted and logged here.
+            deltas = stat_counts(self, -1)
+            deltas.update(stat_counts(Task.objects.filter(contact__in=self), -1))
+            deltas.update(stat_counts(ArchivedTask.objects.filter(contact__in=self), -1))
+            pks = list(self.values_list('pk', flat=True))
+            task_pks = list(Task.objects.filter(contact__in=pks).values_list('pk', flat=True))
+            deleted = super().delete()
+            apply_stat_deltas(deltas)
+            log_change(Task, ChangeAction.DELETED, task_pks, self.db)
+            log_change(self.model, ChangeAction.DELETED, pks, self.db)
+        notify_data_changed(self.model)
+        return deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with recording_changes(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            apply_stat_deltas(object_stat_counts(objs))
+            log_change(self.model, ChangeAction.CREATED, [obj.pk for obj in objs], self.db)
+        for obj in objs:
+            obj._loaded_stats = obj.stat_values()
+        notify_data_changed(self.model)
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        # Django runs bulk_update as `update()` calls, which adjust StatCounter and log the changes.
+        objs = list(objs)
+        with recording_changes(using=self.db):
+            rows = super().bulk_update(objs, fields, *args, **kwargs)
+        for obj in objs:
+            obj.__dict__.pop('_loaded_stats', None)
+        notify_data_changed(self.model)
+        return rows
+
+
+class Contact(StatCountedMixin, models.Model):
     full_name = models.CharField(max_length=255)
     phone = models.CharField(max_length=20, null=True, blank=True)
     email = models.EmailField(max_length=255, null=True, blank=True)
     status = models.CharField(max_length=20, choices=StatusChoice.choices, default=StatusChoice.ACTIVE)
     created_at = models.DateTimeField(auto_now_add=True)
+    open_tasks_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = ContactQuerySet.as_manager()
 
     class Meta:
         constraints = [
@@ -30,18 +413,177 @@ class Contact(models.Model):
                 name='unique_phone_if_provided'
             ),
         ]
+        indexes = [
+            models.Index(fields=['-created_at', 'id'], name='contact_created_id_idx'),
+            # ContactSearchFilter access paths (PostgreSQL only)
+            GinIndex(OpClass(Upper('full_name'), name='gin_trgm_ops'), name='contact_name_trgm_idx'),
+            GinIndex(OpClass(Upper('email'), name='gin_trgm_ops'), name='contact_email_trgm_idx'),
+            GinIndex(OpClass(Upper('phone'), name='gin_trgm_ops'), name='contact_phone_trgm_idx'),
+            # ?status= and ?ordering=full_name on the list endpoint
+            models.Index(fields=['status', '-created_at', 'id'], name='contact_status_created_idx'),
+            models.Index(fields=['full_name', 'id'], name='contact_name_idx'),
+        ]
         
+    STAT_FIELDS = ('status',)
+
     def __str__(self):
         return self.full_name
-    
-class Task(models.Model):
-    contact = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name='tasks')
+
+    @staticmethod
+    def stat_keys(status):
+        return [('contacts', status)]
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using')
+        with recording_changes(using=using):
+            action = ChangeAction.CREATED if self._state.adding else ChangeAction.UPDATED
+            previous = self._stored_stat_values()
+            super().save(*args, **kwargs)
+            self._save_stats(previous, kwargs.get('update_fields'))
+            log_change(Contact, action, [self.pk], using)
+        notify_data_changed(Contact)
+
+    def delete(self, *args, **kwargs):
+        using = kwargs.get('using')
+        with recording_changes(using=using):
+            # Cascaded task deletes bypass Task.delete, so their counts and changes are read here too.
+            pk = self.pk
+            deltas = stat_counts(Contact.objects.filter(pk=pk), -1)
+            deltas.update(stat_counts(self.tasks.all(), -1))
+            deltas.update(stat_counts(self.archived_tasks.all(), -1))
+            task_pks = list(self.tasks.values_list('pk', flat=True))
+            deleted = super().delete(*args, **kwargs)
+            apply_stat_deltas(deltas)
+            log_change(Task, ChangeAction.DELETED, task_pks, using)
+            log_change(Contact, ChangeAction.DELETED, [pk], using)
+        self.__dict__.pop('_loaded_stats', None)
+        notify_data_changed(Contact)
+        return deleted
+
+
+def bump_open_tasks_count(pks, value):
+    """
+    Set `Contact.open_tasks_count` to `value` (a number or an F() expression)
+    for the contacts `pks`. The plain base manager skips ContactQuerySet: the
+    counter follows task writes, which log their own changes, and touches no
+    StatCounter, so it is neither logged as a contact change nor counted.
+    """
+    return Contact._base_manager.filter(pk__in=pks).update(open_tasks_count=value)
+
+
+def refresh_open_tasks_count(contact_ids):
+    """Recompute `Contact.open_tasks_count` for the given contacts from `api_task`."""
+    contact_ids = {pk for pk in contact_ids if pk is not None}
+    if not contact_ids:
+        return 0
+    # Lock the contacts before counting so that a concurrent task write waits for this refresh.
+    stored = dict(
+        Contact.objects.filter(pk__in=contact_ids).order_by('pk').select_for_update()
+        .values_list('pk', 'open_tasks_count')
+    )
+    actual = dict(
+        Task.objects.filter(contact__in=stored, is_done=False).order_by()
+        .values('contact').annotate(count=Count('pk')).values_list('contact', 'count')
+    )
+    # Only contacts whose count changes are written, one UPDATE per new count.
+    changed = {}
+    for pk, count in stored.items():
+        if actual.get(pk, 0) != count:
+            changed.setdefault(actual.get(pk, 0), []).append(pk)
+    for count, pks in changed.items():
+        bump_open_tasks_count(pks, count)
+    return sum(len(pks) for pks in changed.values())
+
+
+def open_tasks_subquery():
+    return Coalesce(Subquery(
+        Task.objects.filter(contact=OuterRef('pk'), is_done=False)
+        .order_by()
+        .values('contact')
+        .annotate(count=Count('pk'))
+        .values('count')
+    ), 0)
+
+
+class TaskQuerySet(models.QuerySet):
+    """
+    Bulk write paths that keep `Contact.open_tasks_count` and StatCounter in
+    step and send `data_changed`. Single-row saves and deletes are handled by
+    `Task.save`/`Task.delete`.
+    """
+
+    def _affected_rows(self):
+        """The primary keys of the matched tasks and the set of their contacts."""
+        rows = list(self.order_by().values_list('pk', 'contact_id'))
+        return [pk for pk, _ in rows], {contact_id for _, contact_id in rows}
+
+    def update(self, **kwargs):
+        with recording_changes(using=self.db):
+            pks, contact_ids = self._affected_rows()
+            rows, deltas = update_with_stats(self, super().update, kwargs)
+            contact = kwargs.get('contact', kwargs.get('contact_id'))
+            if hasattr(contact, 'resolve_expression'):
+                # e.g. bulk_update's CASE: read where the tasks went
+                contact_ids.update(self.model.objects.filter(pk__in=pks).values_list('contact_id', flat=True))
+            elif contact is not None:
+                contact_ids.add(getattr(contact, 'pk', contact))
+            refresh_open_tasks_count(contact_ids)
+            apply_stat_deltas(deltas)
+            log_change(self.model, ChangeAction.UPDATED, pks, self.db)
+        notify_data_changed(self.model)
+        return rows
+
+    update.alters_data = True
+
+    def delete(self):
+        with recording_changes(using=self.db):
+            pks, contact_ids = self._affected_rows()
+            deltas = stat_counts(self, -1)
+            deleted = super().delete()
+            refresh_open_tasks_count(contact_ids)
+            apply_stat_deltas(deltas)
+            log_change(self.model, ChangeAction.DELETED, pks, self.db)
+        notify_data_changed(self.model)
+        return deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with recording_changes(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            refresh_open_tasks_count(obj.contact_id for obj in objs)
+            apply_stat_deltas(object_stat_counts(objs))
+            log_change(self.model, ChangeAction.CREATED, [obj.pk for obj in objs], self.db)
+        for obj in objs:
+            obj._loaded_stats = obj.stat_values()
+        notify_data_changed(self.model)
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        with recording_changes(using=self.db):
+            contact_ids = set(self.model.objects.filter(pk__in=[obj.pk for obj in objs]).values_list('contact_id', flat=True))
+            rows = super().bulk_update(objs, fields, *args, **kwargs)  # StatCounter: see ContactQuerySet
+            refresh_open_tasks_count(contact_ids | {obj.contact_id for obj in objs})
+        for obj in objs:
+            obj.__dict__.pop('_loaded_stats', None)
+        notify_data_changed(self.model)
+        return rows
+
+
+class Task(StatCountedMixin, models.Model):
+    # Lookups by contact are served by task_contact_created_idx and the
+    # (contact, title) constraint, so the FK needs no index of its own.
+    contact = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name='tasks', db_index=False)
     title = models.CharField(max_length=255)
     due_date = models.DateField(null=True, blank=True)
     priority = models.CharField(max_length=20, choices=PriorityChoice.choices, default=PriorityChoice.MEDIUM)
     is_done = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = TaskQuerySet.as_manager()
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -49,6 +591,256 @@ class Task(models.Model):
                 name='unique_task_title_per_contact'
             ),
         ]
+        indexes = [
+            models.Index(fields=['-created_at', 'id'], name='task_created_id_idx'),
+            # TaskFilter access paths; contact_id also serves the FK (see `contact`)
+            models.Index(fields=['contact', '-created_at', 'id'], name='task_contact_created_idx'),
+            models.Index(fields=['-created_at', 'id'], condition=models.Q(is_done=False), name='task_open_created_idx'),
+            models.Index(fields=['due_date'], name='task_due_date_idx'),
+            models.Index(fields=['due_date'], condition=models.Q(is_done=False), name='task_open_due_idx'),
+        ]
+
+    STAT_FIELDS = ('priority', 'is_done', 'due_date')
+
+    def __str__(self):
+        return self.title
+
+    @staticmethod
+    def stat_keys(priority, is_done, due_date):
+        if is_done:
+            return [('tasks', priority), ('done_tasks', priority)]
+        if due_date is None:
+            return [('tasks', priority)]
+        return [('tasks', priority), ('open_due', due_date.isoformat())]
+
+    def _open_state(self):
+        """The contact this task counts towards as an open task, or None when done."""
+        return None if self.is_done else self.contact_id
+
+    def _lock_stored_state(self, using=None):
+        """
+        Lock this task's row and return what it is counted as: `(open state,
+        stat values)`, or `(None, None)` once it is gone. A concurrent save or
+        delete of the same task waits here and then reads the committed row,
+        so two writers never both apply the same delta from stale instances.
+        """
+        if self._state.adding:
+            return None, None
+        row = (
+            Task._base_manager.db_manager(using).select_for_update().filter(pk=self.pk)
+            .values_list('is_done', 'contact_id', *self.STAT_FIELDS).first()
+        )
+        if row is None:
+            return None, None
+        is_done, contact_id, *stats = row
+        return None if is_done else contact_id, tuple(stats)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        using = kwargs.get('using')
+        with recording_changes(using=using):
+            action = ChangeAction.CREATED if self._state.adding else ChangeAction.UPDATED
+            previous, previous_stats = self._lock_stored_state(using)
+            super().save(*args, **kwargs)
+            if update_fields is not None and not {'is_done', 'contact', 'contact_id'} & set(update_fields):
+                current = previous
+            else:
+                current = self._open_state()
+            if previous != current:
+                if previous is not None:
+                    bump_open_tasks_count([previous], models.F('open_tasks_count') - 1)
+                if current is not None:
+                    bump_open_tasks_count([current], models.F('open_tasks_count') + 1)
+            self._save_stats(previous_stats, update_fields)
+            log_change(Task, action, [self.pk], using)
+        notify_data_changed(Task)
+
+    def delete(self, *args, **kwargs):
+        using = kwargs.get('using')
+        with recording_changes(using=using):
+            pk = self.pk
+            previous, previous_stats = self._lock_stored_state(using)
+            deleted = super().delete(*args, **kwargs)
+            if previous is not None:
+                bump_open_tasks_count([previous], models.F('open_tasks_count') - 1)
+            self._delete_stats(previous_stats)
+            log_change(Task, ChangeAction.DELETED, [pk], using)
+        notify_data_changed(Task)
+        return deleted
+
+
+class ArchivedTask(models.Model):
+    """
+    Done tasks moved out of `api_task` by `archive_tasks` (see `api.archive`),
+    with their original ids. They still count in StatCounter.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    contact = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name='archived_tasks', db_index=False)
+    title = models.CharField(max_length=255)
+    due_date = models.DateField(null=True, blank=True)
+    priority = models.CharField(max_length=20, choices=PriorityChoice.choices, default=PriorityChoice.MEDIUM)
+    is_done = models.BooleanField(default=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    STAT_FIELDS = Task.STAT_FIELDS
+    stat_keys = staticmethod(Task.stat_keys)
+
+    class Meta:
+        indexes = [
+            # ?include_archived=true pages, merged with the live table's indexes
+            models.Index(fields=['-created_at', 'id'], name='archived_created_id_idx'),
+            models.Index(fields=['contact', '-created_at', 'id'], name='archived_contact_created_idx'),
+            # Archived tasks are done, so this stays empty and `is_done=false` skips the table.
+            models.Index(fields=['-created_at', 'id'], condition=models.Q(is_done=False), name='archived_open_created_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class TaskRecord(models.Model):
+    """Live and archived tasks together: the read-only `api_taskrecord` view (UNION ALL of both tables)."""
+    contact = models.ForeignKey(Contact, on_delete=models.DO_NOTHING, related_name='+', db_constraint=False)
+    title = models.CharField(max_length=255)
+    due_date = models.DateField(null=True, blank=True)
+    priority = models.CharField(max_length=20, choices=PriorityChoice.choices)
+    is_done = models.BooleanField()
+    created_at = models.DateTimeField()
+    archived = models.BooleanField()
+
+    class Meta:
+        managed = False
+        db_table = 'api_taskrecord'
+
+    def __str__(self):
+        return self.title
+
+
+class JobStatus(models.TextChoices):
+    QUEUED = 'queued', 'Queued'
+    RUNNING = 'running', 'Running'
+    SUCCEEDED = 'succeeded', 'Succeeded'
+    FAILED = 'failed', 'Failed'
+
+
+class Job(models.Model):
+    """
+    A background operation for the `run_jobs` worker (see `api.jobs`). Workers
+    claim queued jobs with `SELECT ... FOR UPDATE SKIP LOCKED` and hold them
+    for a lease (`locked_until`) they keep renewing; a job whose lease ran
+    out (its worker died) is queued again.
+    """
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=JobStatus.choices, default=JobStatus.QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # claim(): the next queued jobs that are due
+            models.Index(fields=['run_after', 'id'], condition=models.Q(status='queued'), name='job_queued_idx'),
+            # requeue_expired(): running jobs whose worker stopped renewing the lease
+            models.Index(fields=['locked_until'], condition=models.Q(status='running'), name='job_running_lease_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} #{self.pk} ({self.status})'
+
+
+class ReminderKind(models.TextChoices):
+    UPCOMING = 'upcoming', 'Upcoming'
+    OVERDUE = 'overdue', 'Overdue'
+
+
+class Reminder(models.Model):
+    """
+    The open tasks of one contact that fell due for a reminder of `kind` in
+    one scan of the `run_reminders` scheduler (see `api.reminders`), whose
+    due dates are at most `due_through`. A `reminders` job delivers it.
+    """
+    contact = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name='reminders', db_index=False)
+    kind = models.CharField(max_length=10, choices=ReminderKind.choices)
+    due_through = models.DateField()
+    task_ids = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # One reminder per contact and scan, also when two schedulers race; leads with contact for the FK.
+            models.UniqueConstraint(fields=['contact', 'kind', 'due_through'], name='unique_reminder_per_scan'),
+        ]
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return f'{self.kind} reminder for {self.contact_id} through {self.due_through}'
+
+
+class ReminderCursor(models.Model):
+    """Per reminder kind, the due date through which the scheduler has made reminders."""
+    kind = models.CharField(max_length=10, choices=ReminderKind.choices, primary_key=True)
+    through = models.DateField()
+
+    def __str__(self):
+        return f'{self.kind} through {self.through}'
+
+
+class ContactKey(models.Model):
+    """
+    A blocking key of a contact for duplicate detection (see `api.duplicates`):
+    a 64-bit hash of its normalized phone, email or name. Only contacts that
+    share a key are compared.
+    """
+    contact = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name='+', db_index=False)
+    key = models.BigIntegerField()
+
+    class Meta:
+        constraints = [
+            # find_pairs(): the contacts of a block, read from the index alone
+            models.UniqueConstraint(fields=['key', 'contact'], name='unique_contact_key'),
+        ]
+        indexes = [
+            models.Index(fields=['contact'], name='contact_key_contact_idx'),
+        ]
+
+
+class DuplicatePair(models.Model):
+    """Two contacts that are likely the same person, `contact` being the older one, as scored by `api.duplicates`."""
+    contact = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name='+', db_index=False)
+    other = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name='+', db_index=False)
+    score = models.FloatField()
+    reasons = models.JSONField(default=list)
+    found_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['contact', 'other'], name='unique_duplicate_pair'),
+            models.CheckConstraint(condition=models.Q(contact__lt=models.F('other')), name='duplicate_pair_ordered'),
+        ]
+        indexes = [
+            # /api/contacts/duplicates/: best matches first
+            models.Index(fields=['-score', 'id'], name='duplicate_score_idx'),
+            models.Index(fields=['other'], name='duplicate_other_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.contact_id} ~ {self.other_id} ({self.score})'
+
+
+class DuplicateIndexState(models.Model):
+    """
+    The single row (`id=1`) holding the change log seq through which
+    ContactKey and DuplicatePair are up to date.
+    """
+    seq = models.BigIntegerField(default=0)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
@@ -0,0 +1,53 @@
+from django.contrib.postgres.indexes import OpClass, PostgresIndex
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db.migrations.operations import AddIndex, RemoveIndex
+
+
+def is_postgres_only(index):
+    """Indexes using GIN/GiST or operator classes only exist on PostgreSQL."""
+    return (
+        isinstance(index, PostgresIndex)
+        or bool(index.opclasses)
+        or any(isinstance(expression, OpClass) for expression in index.expressions)
+    )
+
+
+class PortableAddIndexConcurrently(AddIndexConcurrently):
+    """
+    `CREATE INDEX CONCURRENTLY` on PostgreSQL so large tables stay writable
+    while the index builds. Other backends (SQLite in tests) get a plain
+    `CREATE INDEX`, and PostgreSQL-specific indexes are skipped there.
+    The migration using it must set `atomic = False`.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        if not is_postgres_only(self.index):
+            AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        if not is_postgres_only(self.index):
+            AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class PortableRemoveIndexConcurrently(RemoveIndexConcurrently):
+    """
+    `DROP INDEX CONCURRENTLY` on PostgreSQL, a plain `DROP INDEX` elsewhere;
+    like `PortableAddIndexConcurrently`, it leaves PostgreSQL-specific
+    indexes alone on other backends. The migration must set `atomic = False`.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        if not is_postgres_only(from_state.models[app_label, self.model_name_lower].get_index_by_name(self.name)):
+            RemoveIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        if not is_postgres_only(to_state.models[app_label, self.model_name_lower].get_index_by_name(self.name)):
+            RemoveIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
@@ -0,0 +1,217 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination:
+    """
+    Keyset ("seek") pagination over the queryset's ordering plus `id`.
+
+    Each page is fetched with a `WHERE (ordering) < (last row)` predicate instead
+    of an OFFSET, and no COUNT(*) is issued, so every page costs the same no
+    matter how deep the client has scrolled.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    default_ordering = ('-created_at',)
+
+    def __init__(self, page_size):
+        self.page_size = page_size
+
+    def paginate_queryset(self, queryset, request):
+        queryset, cursor = self.page_queryset(queryset, request)
+        return self.set_page(list(queryset), cursor)
+
+    async def apaginate_queryset(self, queryset, request):
+        queryset, cursor = self.page_queryset(queryset, request)
+        return self.set_page([row async for row in queryset], cursor)
+
+    def page_queryset(self, queryset, request):
+        """Return the (unevaluated) queryset for the requested page and the decoded cursor."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.prepare(queryset)
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor['r']
+
+        if reverse:
+            queryset = queryset.order_by(*[self.flip(name) for name in self.ordering])
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if cursor is not None:
+            queryset = queryset.filter(self.seek_filter(cursor['v'], reverse))
+        return queryset[:self.page_size + 1], cursor
+
+    def set_page(self, results, cursor):
+        reverse = cursor is not None and cursor['r']
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.page = results
+        if reverse:
+            self.has_next = bool(results)
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None and bool(results)
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.position(self.page[0]), reverse=True)
+
+    def get_ordering(self, queryset):
+        ordering = [
+            name.replace('pk', 'id') if name.lstrip('-') == 'pk' else name
+            for name in (queryset.query.order_by or self.default_ordering)
+        ]
+        if 'id' not in ordering and '-id' not in ordering:
+            ordering.append('id')
+        return ordering
+
+    def get_field(self, model, name):
+        try:
+            field = model._meta.get_field(name.lstrip('-'))
+        except FieldDoesNotExist:
+            raise ValidationError({'ordering': f"Cursor pagination cannot order by '{name}'."})
+        if not field.concrete or field.null:
+            raise ValidationError({'ordering': f"Cursor pagination cannot order by nullable field '{name}'."})
+        return field
+
+    def seek_filter(self, values, reverse):
+        """
+        Build `(a, b) > (x, y)` as `a > x OR (a = x AND b > y)` so mixed
+        ascending/descending orderings work on every database backend.
+        """
+        condition = Q()
+        for index, (name, field) in enumerate(zip(self.ordering, self.fields)):
+            descending = name.startswith('-') != reverse
+            lookup = 'lt' if descending else 'gt'
+            term = Q(**{f'{field.attname}__{lookup}': values[index]})
+            for previous_field, value in zip(self.fields[:index], values[:index]):
+                term &= Q(**{previous_field.attname: value})
+            condition |= term
+        return condition
+
+    def position(self, instance):
+        if isinstance(instance, dict):
+            return [instance[field.attname] for field in self.fields]
+        return [getattr(instance, field.attname) for field in self.fields]
+
+    @staticmethod
+    def flip(name):
+        return name[1:] if name.startswith('-') else f'-{name}'
+
+    def prepare(self, queryset):
+        self.ordering = self.get_ordering(queryset)
+        self.fields = [self.get_field(queryset.model, name) for name in self.ordering]
+
+    def make_cursor(self, values, reverse=False):
+        payload = {
+            'o': self.ordering,
+            'v': [value.isoformat() if hasattr(value, 'isoformat') else value for value in values],
+            'r': reverse,
+        }
+        return urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+    def encode_cursor(self, values, reverse):
+        url = remove_query_param(self.base_url, 'page')
+        return replace_query_param(url, self.cursor_query_param, self.make_cursor(values, reverse))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode()).decode())
+            if payload['o'] != self.ordering or len(payload['v']) != len(self.fields):
+                raise ValueError
+            payload['v'] = [field.to_python(value) for field, value in zip(self.fields, payload['v'])]
+            payload['r'] = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return payload
+
+
+class CursorOptInPagination(PageNumberPagination):
+    """
+    Page-number pagination by default; switches to keyset pagination when the
+    request carries a `cursor` query parameter (`?cursor=` starts at page one).
+    """
+    cursor_query_param = KeysetPagination.cursor_query_param
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        self.keyset = KeysetPagination(page_size)
+        self.display_page_controls = False
+        return self.keyset.paginate_queryset(queryset, request)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """`paginate_queryset` for async views: the same pages, read with the async ORM."""
+        self.keyset = None
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        if self.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination(page_size)
+            self.display_page_controls = False
+            return await self.keyset.apaginate_queryset(queryset, request)
+
+        self.request = request
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()  # `count` is a cached_property
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [row async for row in self.page.object_list]
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class ContactPagination(CursorOptInPagination):
+    pass
+
+
+class TaskPagination(CursorOptInPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,169 @@
+"""
+Query-plan snapshots for the contact and task list endpoints.
+
+`capture_plans` runs the list views for every combination of their query
+params (`CASES`) and records, per combination, the SQL each query ran with
+its literals stripped and the shape of its EXPLAIN plan: node types, tables
+and indexes, without costs or row estimates. Snapshots are kept per database
+vendor in `api/plan_snapshots/<vendor>.json`; `compare_plans` reports every
+combination whose response status, query count or plan shape changed.
+"""
+import difflib
+import itertools
+import json
+import re
+from pathlib import Path
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.benchmarking import call_view
+from api.views import ContactViewSet, TaskViewSet
+
+SNAPSHOT_DIR = Path(__file__).resolve().parent / 'plan_snapshots'
+
+# Stands for the id of a fixture contact, which differs between databases.
+CONTACT = '<contact>'
+
+CASES = {
+    ('contacts', '/api/contacts/', ContactViewSet): {
+        'search': [None, 'ahmad', '+3000000001', 'bench1@'],
+        'status': [None, 'inactive'],
+        'ordering': [None, 'full_name', '-created_at'],
+        'cursor': [None, ''],
+    },
+    ('tasks', '/api/tasks/', TaskViewSet): {
+        'contact_id': [None, CONTACT],
+        'is_done': [None, 'false'],
+        'priority': [None, 'high'],
+        'due_from': [None, '2025-01-01'],
+        'due_to': [None, '2025-01-10'],
+        'ordering': [None, 'due_date'],
+        'page_size': [None, '100'],
+        'cursor': [None, ''],
+    },
+}
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+IN_LIST = re.compile(r'IN \((?:\?, )*\?\)')
+
+
+def cases():
+    """Yield `(endpoint, path, viewset, params)` for every combination of `CASES`."""
+    for (endpoint, path, viewset), values in CASES.items():
+        names = list(values)
+        for combination in itertools.product(*values.values()):
+            params = {name: value for name, value in zip(names, combination) if value is not None}
+            yield endpoint, path, viewset, params
+
+
+def case_key(endpoint, params):
+    query = '&'.join(f'{name}={value}' for name, value in params.items())
+    return f'{endpoint}?{query}' if query else endpoint
+
+
+def normalize_sql(sql):
+    """`sql` with its literals replaced by `?` and IN lists collapsed."""
+    return IN_LIST.sub('IN (...)', LITERALS.sub('?', ' '.join(sql.split())))
+
+
+def explain(sql):
+    """The shape of the plan for `sql`: one line per plan node, indented by depth."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return list(postgresql_nodes(plan[0]['Plan']))
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return sqlite_nodes(cursor.fetchall())
+    raise NotImplementedError(f'No plan parser for {connection.vendor}')
+
+
+def postgresql_nodes(node, depth=0):
+    line = node['Node Type']
+    if 'Relation Name' in node:
+        line += f" on {node['Relation Name']}"
+    if 'Index Name' in node:
+        line += f" using {node['Index Name']}"
+    yield '  ' * depth + line
+    for child in node.get('Plans', ()):
+        yield from postgresql_nodes(child, depth + 1)
+
+
+def sqlite_nodes(rows):
+    depths = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depths[node_id] = depths.get(parent, -1) + 1
+        lines.append('  ' * depths[node_id] + detail)
+    return lines
+
+
+def capture_plans(contact_id):
+    """`{case key: {'status': code, 'queries': n, 'sql': [...], 'plans': [...]}}` for every case."""
+    snapshot = {}
+    for endpoint, path, viewset, params in cases():
+        request_params = {name: contact_id if value == CONTACT else value for name, value in params.items()}
+        with CaptureQueriesContext(connection) as queries:
+            response = call_view(viewset.as_view({'get': 'list'}), path, request_params)
+        statements = [query['sql'] for query in queries.captured_queries]
+        snapshot[case_key(endpoint, params)] = {
+            'status': response.status_code,
+            'queries': len(statements),
+            'sql': [normalize_sql(sql) for sql in statements],
+            'plans': [explain(sql) for sql in statements],
+        }
+    return snapshot
+
+
+def snapshot_path(vendor=None):
+    return SNAPSHOT_DIR / f'{vendor or connection.vendor}.json'
+
+
+def load_snapshot(path):
+    with open(path) as snapshot:
+        return json.load(snapshot)
+
+
+def save_snapshot(path, fixture, plans):
+    path.parent.mkdir(exist_ok=True)
+    with open(path, 'w') as snapshot:
+        json.dump({'fixture': fixture, 'cases': plans}, snapshot, indent=1, sort_keys=True)
+        snapshot.write('\n')
+
+
+def compare_plans(expected, actual):
+    """
+    A report of the cases whose query count or plan shape differ between
+    `expected` and `actual`, with diffs of their plans and SQL; '' if none.
+    """
+    report = []
+    for key in sorted(expected.keys() - actual.keys()):
+        report.append(f'{key}: in the snapshot but no longer captured')
+    for key in sorted(actual.keys() - expected.keys()):
+        report.append(f'{key}: not in the snapshot')
+    for key in sorted(expected.keys() & actual.keys()):
+        before, after = expected[key], actual[key]
+        if all(before[name] == after[name] for name in ('status', 'queries', 'plans')):
+            continue
+        lines = [f"{key}: {before['queries']} -> {after['queries']} queries"]
+        if before['status'] != after['status']:
+            lines[0] += f", status {before['status']} -> {after['status']}"
+        for kind in ('plans', 'sql'):
+            lines.extend(difflib.unified_diff(
+                render(before[kind]), render(after[kind]), f'snapshot {kind}', f'current {kind}', lineterm='', n=1,
+            ))
+        report.append('\n'.join(lines))
+    return '\n\n'.join(report)
+
+
+def render(items):
+    """Plans or SQL statements as diffable lines, numbered by query."""
+    lines = []
+    for number, item in enumerate(items, 1):
+        lines.append(f'-- query {number}')
+        lines.extend(item if isinstance(item, list) else [item])
+    return lines
@@ -0,0 +1,31 @@
+"""
+Signal receivers connected when the app is ready.
+
+The modules whose state they update pull in Django REST framework and
+simplejwt, which processes that never serve a request (management commands,
+job workers) should not pay for at startup, so the receivers live here and
+reach those modules only when they have work to do there.
+"""
+import sys
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.signals import changes_committed
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL, dispatch_uid='crm.auth.user_saved')
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL, dispatch_uid='crm.auth.user_deleted')
+def invalidate_user(sender, instance, **kwargs):
+    from api.authentication import invalidate_user
+
+    invalidate_user(instance)
+
+
+@receiver(changes_committed, dispatch_uid='crm.events.changes_committed')
+def forward_changes(sender, **kwargs):
+    # Without api.events loaded this process has no event streams to forward to.
+    events = sys.modules.get('api.events')
+    if events is not None:
+        events.forward_changes()
@@ -0,0 +1,206 @@
+"""
+Due-date reminders, made by `manage.py run_reminders` and delivered by the
+`run_jobs` workers (`api.jobs`).
+
+An open task due on D fires an `upcoming` reminder at REMIND_AT (local
+time) LEAD_DAYS before D, and an `overdue` one at REMIND_AT the day after D.
+The scheduler keeps a heap of the next fire time of each kind, found with
+one probe of `task_open_due_idx` (the index on `due_date` of open tasks),
+and sleeps until the earliest, or at most MAX_SLEEP so that tasks given an
+earlier due date meanwhile are seen. When a kind fires it reads the open
+tasks due after its `ReminderCursor` and up to the last due date that has
+fired, a range of the same index, so a scan costs O(due tasks) whatever
+the size of the table. It stores one `Reminder` per contact with the ids of
+its tasks, moves the cursor and queues `reminders` jobs of BATCH_SIZE
+reminders, all in one transaction; the cursor row lock keeps a second
+scheduler from scanning the same dates.
+
+A new scheduler starts CATCH_UP_DAYS back. A task created or moved to a due
+date whose fire time has passed gets no reminder of that kind; a task done
+before delivery is left out of it. `CRM_REMINDERS['BACKEND']` sends each
+reminder: `LogBackend` (the default) logs it.
+"""
+import heapq
+import logging
+import threading
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from api.jobs import enqueue
+from api.models import Reminder, ReminderCursor, ReminderKind, Task
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'LEAD_DAYS': 1,
+    'REMIND_AT': '08:00',
+    'CATCH_UP_DAYS': 1,
+    'MAX_SLEEP': 60,
+    'BATCH_SIZE': 100,
+    'BACKEND': 'api.reminders.LogBackend',
+}
+
+
+def reminders_settings():
+    return {**DEFAULTS, **getattr(settings, 'CRM_REMINDERS', {})}
+
+
+def fire_offset(kind, options):
+    """Days from a due date to the day its reminder of `kind` fires."""
+    return -options['LEAD_DAYS'] if kind == ReminderKind.UPCOMING else 1
+
+
+def fire_time(kind, due_date, options):
+    day = due_date + timedelta(days=fire_offset(kind, options))
+    return timezone.make_aware(datetime.combine(day, time.fromisoformat(options['REMIND_AT'])))
+
+
+def fired_through(kind, now, options):
+    """The last due date whose reminder of `kind` fires at or before `now`."""
+    local = timezone.localtime(now)
+    day = local.date() if local.time() >= time.fromisoformat(options['REMIND_AT']) else local.date() - timedelta(days=1)
+    return day - timedelta(days=fire_offset(kind, options))
+
+
+def scan_start(kind, through, now):
+    """Due dates after this one are left to scan for `kind`, given the cursor `through`."""
+    if kind == ReminderKind.UPCOMING:
+        # After downtime, tasks already past due get their overdue reminder instead.
+        return max(through, timezone.localdate(now) - timedelta(days=1))
+    return through
+
+
+def next_due_date(after):
+    """The first due date of an open task after `after`: one probe of task_open_due_idx."""
+    return (
+        Task.objects.filter(is_done=False, due_date__gt=after)
+        .order_by('due_date').values_list('due_date', flat=True).first()
+    )
+
+
+def make_reminders(kind, now, options=None):
+    """Store the reminders of `kind` fired by `now`, queue their delivery and return how many there are."""
+    options = options or reminders_settings()
+    limit = fired_through(kind, now, options)
+    with transaction.atomic():
+        cursor, _ = ReminderCursor.objects.select_for_update().get_or_create(
+            kind=kind, defaults={'through': fired_through(kind, now - timedelta(days=options['CATCH_UP_DAYS']), options)},
+        )
+        if limit <= cursor.through:
+            return 0
+        tasks = {}
+        due = Task.objects.filter(is_done=False, due_date__gt=scan_start(kind, cursor.through, now), due_date__lte=limit)
+        for contact_id, pk in due.order_by('due_date', 'id').values_list('contact_id', 'id'):
+            tasks.setdefault(contact_id, []).append(pk)
+        reminders = Reminder.objects.bulk_create([
+            Reminder(contact_id=contact_id, kind=kind, due_through=limit, task_ids=pks)
+            for contact_id, pks in tasks.items()
+        ])
+        cursor.through = limit
+        cursor.save(update_fields=['through'])
+        pks = [reminder.pk for reminder in reminders]
+        for start in range(0, len(pks), options['BATCH_SIZE']):
+            enqueue('reminders', {'ids': pks[start:start + options['BATCH_SIZE']]})
+    return len(pks)
+
+
+class SystemClock:
+    def now(self):
+        return timezone.now()
+
+    def sleep(self, seconds, stopping):
+        stopping.wait(seconds)
+
+
+class Scheduler:
+    """
+    Makes reminders as they fire, sleeping in between on `clock` (`now()`
+    and `sleep(seconds, stopping event)`), which tests replace.
+    """
+
+    def __init__(self, clock=None, max_sleep=None):
+        self.options = reminders_settings()
+        self.clock = clock or SystemClock()
+        self.max_sleep = max_sleep or self.options['MAX_SLEEP']
+        self.stopping = threading.Event()
+        self.queue = []  # heap of (fire time, kind)
+
+    def stop(self):
+        self.stopping.set()
+
+    def next_fire(self, kind, now):
+        """When the next reminder of `kind` fires, or None while no open task is due after the cursor."""
+        through = ReminderCursor.objects.filter(kind=kind).values_list('through', flat=True).first()
+        if through is None:
+            return now  # first run: catch up
+        due_date = next_due_date(scan_start(kind, through, now))
+        return None if due_date is None else fire_time(kind, due_date, self.options)
+
+    def tick(self):
+        """Make the reminders fired by now and plan the next wake-up; return how many were made."""
+        now = self.clock.now()
+        # Rebuilt on every wake-up: tasks change between them, in this process or another.
+        self.queue = [(fire, kind) for kind in ReminderKind.values if (fire := self.next_fire(kind, now))]
+        heapq.heapify(self.queue)
+        made = 0
+        while self.queue and self.queue[0][0] <= now:
+            _, kind = heapq.heappop(self.queue)
+            made += make_reminders(kind, now, self.options)
+            if fire := self.next_fire(kind, now):
+                heapq.heappush(self.queue, (fire, kind))
+        return made
+
+    def run(self, until=None):
+        """Tick until `stop()`, or until the clock passes `until`; return how many reminders were made."""
+        made = 0
+        while not self.stopping.is_set():
+            made += self.tick()
+            now = self.clock.now()
+            if until is not None and now >= until:
+                break
+            wake = now + timedelta(seconds=self.max_sleep)
+            if self.queue:
+                wake = min(wake, self.queue[0][0])
+            if until is not None:
+                wake = min(wake, until)
+            self.clock.sleep(max((wake - now).total_seconds(), 0), self.stopping)
+        return made
+
+
+class LogBackend:
+    """Logs each reminder; point CRM_REMINDERS['BACKEND'] at a class with the same `send` to e-mail or push them."""
+
+    def __init__(self, options):
+        self.options = options
+
+    def send(self, reminder, tasks):
+        logger.info(
+            '%s reminder for %s: %s', reminder.kind, reminder.contact,
+            ', '.join(f'{task.title} (due {task.due_date})' for task in tasks),
+        )
+
+
+def deliver_reminders(pks):
+    """
+    Send the reminders `pks` not sent yet, each with its tasks that are
+    still open, and mark each one sent as it goes so that a retried job skips
+    it. Reminders whose tasks are all done are marked without sending.
+    """
+    options = reminders_settings()
+    backend = import_string(options['BACKEND'])(options)
+    reminders = list(Reminder.objects.filter(pk__in=pks, sent_at__isnull=True).select_related('contact').order_by('pk'))
+    open_tasks = Task.objects.filter(is_done=False).in_bulk([pk for reminder in reminders for pk in reminder.task_ids])
+    sent = skipped = 0
+    for reminder in reminders:
+        tasks = [open_tasks[pk] for pk in reminder.task_ids if pk in open_tasks]
+        if tasks:
+            backend.send(reminder, tasks)
+            sent += 1
+        else:
+            skipped += 1
+        Reminder.objects.filter(pk=reminder.pk).update(sent_at=timezone.now())
+    return {'sent': sent, 'skipped': skipped}
@@ -1,54 +1,125 @@
+from django.db import IntegrityError, models, transaction
 from rest_framework import serializers
-from api.models import Contact, Task
+from api.models import Contact, DuplicatePair, Job, Task
 import re
 from datetime import date
-from rest_framework.validators import UniqueTogetherValidator
+from rest_framework.validators import UniqueTogetherValidator, UniqueValidator
 
+DUPLICATE_EMAIL_MESSAGE = "A contact with this email already exists."
+DUPLICATE_PHONE_MESSAGE = "A contact with this phone already exists."
+DUPLICATE_TASK_TITLE_MESSAGE = "This contact already has a task with this title."
 
-class ContactSerializer(serializers.ModelSerializer):
+# Unique constraints in api.models and the field error each one is reported as.
+CONSTRAINT_ERRORS = {
+    'unique_email_if_provided': ('email', DUPLICATE_EMAIL_MESSAGE),
+    'unique_phone_if_provided': ('phone', DUPLICATE_PHONE_MESSAGE),
+    'unique_task_title_per_contact': ('title', DUPLICATE_TASK_TITLE_MESSAGE),
+}
+
+
+def violated_constraint(exc, model):
+    """Name of the unique constraint of `model` that raised `exc`, or None."""
+    name = getattr(getattr(exc.__cause__, 'diag', None), 'constraint_name', None)
+    if name:
+        return name
+    # SQLite reports columns instead: "UNIQUE constraint failed: api_task.contact_id, api_task.title"
+    prefix = 'UNIQUE constraint failed: '
+    message = str(exc)
+    if not message.startswith(prefix):
+        return None
+    columns = {column.rpartition('.')[2] for column in message[len(prefix):].split(', ')}
+    for constraint in model._meta.constraints:
+        if isinstance(constraint, models.UniqueConstraint) and columns == {
+            model._meta.get_field(field).column for field in constraint.fields
+        }:
+            return constraint.name
+    return None
+
+
+def constraint_error(exc, model):
+    """`{field: [message]}` for a known unique constraint violation, else None."""
+    field_error = CONSTRAINT_ERRORS.get(violated_constraint(exc, model))
+    if field_error is None:
+        return None
+    field, message = field_error
+    return {field: [message]}
+
+
+class ConstraintValidationMixin:
+    """
+    Leaves uniqueness to the database constraints instead of checking it
+    with a query per unique field before every write (DRF's derived unique
+    validators are dropped). A violation raised by `save()` is reported as
+    the same field error, and concurrent duplicates cannot slip through.
+    """
+
+    def get_validators(self):
+        return [v for v in super().get_validators() if not isinstance(v, UniqueTogetherValidator)]
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for field in fields.values():
+            field.validators = [v for v in field.validators if not isinstance(v, UniqueValidator)]
+        return fields
+
+    def save(self, **kwargs):
+        try:
+            # A savepoint, so the caller's transaction survives the failed write.
+            with transaction.atomic():
+                return super().save(**kwargs)
+        except IntegrityError as exc:
+            errors = constraint_error(exc, self.Meta.model)
+            if errors is None:
+                raise
+            raise serializers.ValidationError(errors)
+
+
+class SparseFieldsMixin:
+    """Drops fields not listed in `context[sparse_fields_key]`, when that is set."""
+    sparse_fields_key = 'fields'
+
+    def get_fields(self):
+        fields = super().get_fields()
+        only = self.context.get(self.sparse_fields_key)
+        if only:
+            fields = {name: field for name, field in fields.items() if name in only}
+        return fields
+
+
+class ContactTaskSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Read-only task embedded in a contact by `?expand=tasks`."""
+    sparse_fields_key = 'task_fields'
+
+    class Meta:
+        model = Task
+        fields = ['id', 'contact', 'title', 'due_date', 'priority', 'is_done', 'created_at']
+        read_only_fields = fields
+
+
+class ContactSerializer(ConstraintValidationMixin, SparseFieldsMixin, serializers.ModelSerializer):
     full_name = serializers.CharField(min_length=3)
-    open_tasks_count = serializers.IntegerField(read_only=True)
-
-    def validate_email(self, value):
-        if value:
-            qs = Contact.objects.filter(email=value)
-            if self.instance:
-                qs = qs.exclude(pk=self.instance.pk)
-            if qs.exists():
-                raise serializers.ValidationError("A contact with this email already exists.")
-        return value
+    open_tasks_count = serializers.IntegerField(read_only=True)  # maintained by Task writes
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if 'tasks' in self.context.get('expand', ()):
+            # Filled by the `expanded_tasks` Prefetch in ExpandTasksMixin.
+            fields['tasks'] = ContactTaskSerializer(many=True, read_only=True, source='expanded_tasks')
+        return fields
 
     def validate_phone(self, value):
-        if value:
-            import re
-            if not re.match(r'^\+?\d+$', value):
-                raise serializers.ValidationError("Phone must contain only digits with optional leading +")
-            qs = Contact.objects.filter(phone=value)
-            if self.instance:
-                qs = qs.exclude(pk=self.instance.pk)
-            if qs.exists():
-                raise serializers.ValidationError("A contact with this phone already exists.")
+        if value and not re.match(r'^\+?\d+$', value):
+            raise serializers.ValidationError("Phone must contain only digits with optional leading +")
         return value
 
     class Meta:
         model = Contact
         fields = ['id', 'full_name', 'phone', 'email', 'status', 'created_at', 'open_tasks_count']
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(ConstraintValidationMixin, serializers.ModelSerializer):
 
     title = serializers.CharField(min_length=3)
 
-    def validate(self, data):
-        title = data.get('title', getattr(self.instance, 'title', None))
-        contact = data.get('contact', getattr(self.instance, 'contact', None))
-        if title and contact:
-            qs = Task.objects.filter(contact=contact, title=title)
-            if self.instance:
-                qs = qs.exclude(pk=self.instance.pk)
-            if qs.exists():
-                raise serializers.ValidationError({"title": "This contact already has a task with this title."})
-        return data
-
     def validate_due_date(self, value):
         if value and value < date.today():
             raise serializers.ValidationError("Due date cannot be in the past")
@@ -56,4 +127,60 @@ class TaskSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Task
-        fields = ['id', 'contact', 'title', 'due_date', 'priority', 'is_done', 'created_at']
\ No newline at end of file
+        fields = ['id', 'contact', 'title', 'due_date', 'priority', 'is_done', 'created_at']
+
+
+class PreloadedContactField(serializers.PrimaryKeyRelatedField):
+    """Resolves contact ids from `context['contacts']` (an `in_bulk` dict) instead of one query per row."""
+
+    def to_internal_value(self, data):
+        contacts = self.context.get('contacts')
+        if contacts is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return contacts[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class BulkContactSerializer(ContactSerializer):
+    pass
+
+
+class BulkTaskSerializer(TaskSerializer):
+    contact = PreloadedContactField(queryset=Contact.objects.all())
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'kind', 'status', 'attempts', 'max_attempts', 'run_after', 'result', 'error',
+            'created_at', 'started_at', 'finished_at',
+        ]
+
+
+class DuplicatePairSerializer(serializers.ModelSerializer):
+    contacts = serializers.SerializerMethodField()
+
+    def get_contacts(self, pair):
+        return ContactSerializer([pair.contact, pair.other], many=True).data
+
+    class Meta:
+        model = DuplicatePair
+        fields = ['id', 'score', 'reasons', 'contacts', 'found_at']
+
+
+class DuplicateQuerySerializer(serializers.Serializer):
+    """Query params of `/api/contacts/duplicates/`."""
+    contact = serializers.IntegerField(required=False, min_value=1)
+    min_score = serializers.FloatField(required=False, min_value=0, max_value=1)
+
+
+class ContactMergeSerializer(serializers.Serializer):
+    duplicates = serializers.ListField(child=serializers.IntegerField(min_value=1), min_length=1, max_length=100)
+    title_conflicts = serializers.ChoiceField(choices=['rename', 'drop'], default='rename')
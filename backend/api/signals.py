@@ -0,0 +1,25 @@
+"""
+`data_changed` is sent after every write to Contact or Task, with the model
+class as sender.
+
+Django's `post_save` / `post_delete` miss queryset updates, bulk writes and
+raw SQL, and a `post_delete` receiver on Task would turn cascade deletes into
+one query per row. The model and queryset overrides in `api.models` (and the
+raw SQL paths such as the importer) send this signal instead.
+
+`changes_committed` is sent once a transaction that logged changes to the
+change log commits. The changes are not published yet, so it carries no
+seqs: receivers read them from the log (`api.changes`).
+"""
+from django.dispatch import Signal
+
+data_changed = Signal()
+changes_committed = Signal()
+
+
+def notify_data_changed(model):
+    data_changed.send(sender=model)
+
+
+def notify_changes_committed():
+    changes_committed.send(sender=None)
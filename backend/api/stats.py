@@ -0,0 +1,112 @@
+"""
+Dashboard numbers behind `GET /api/stats/`.
+
+Everything is read from `StatCounter`, which Contact and Task writes keep in
+step (see `api.models`), so a request reads a handful of counter rows plus
+one per distinct due date of open tasks, each split over at most
+`STAT_SHARDS` rows, whatever the size of `api_task`. `recompute_counters`
+(the `recompute_stats` command) rebuilds the counters from the real tables
+to correct drift, e.g. after raw SQL writes, and folds each back into one
+row.
+
+`api.views.StatsView` caches responses for `CRM_STATS['CACHE_TIMEOUT']`
+seconds; the numbers can lag writes by that much.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from api.models import (
+    ArchivedTask, Contact, PriorityChoice, StatCounter, StatusChoice, Task, stat_counts,
+)
+
+DEFAULTS = {'ALIAS': 'default', 'CACHE_TIMEOUT': 10}
+DUE_SOON_DAYS = 7
+
+
+def stats_settings():
+    return {**DEFAULTS, **getattr(settings, 'CRM_STATS', {})}
+
+
+def ratio(part, whole):
+    return round(part / whole, 4) if whole else None
+
+
+def dashboard_stats(today=None):
+    """Build the `/api/stats/` payload from the counters (two small queries)."""
+    today = today or timezone.localdate()
+    counts = stored_counters(StatCounter.objects.exclude(metric='open_due'))
+    due = StatCounter.objects.filter(
+        metric='open_due', bucket__lt=(today + timedelta(days=DUE_SOON_DAYS)).isoformat()
+    ).aggregate(
+        overdue=Sum('value', filter=Q(bucket__lt=today.isoformat())),
+        due_this_week=Sum('value', filter=Q(bucket__gte=today.isoformat())),
+    )
+
+    def buckets(metric, choices):
+        # Known choices first (zeros included), then anything else that was stored.
+        names = list(choices.values) + sorted(b for m, b in counts if m == metric and b not in choices.values)
+        return {name: counts[metric, name] for name in names}
+
+    by_status = buckets('contacts', StatusChoice)
+    totals = buckets('tasks', PriorityChoice)
+    done = {priority: counts['done_tasks', priority] for priority in totals}
+    task_total, done_total = sum(totals.values()), sum(done.values())
+    return {
+        'contacts': {'total': sum(by_status.values()), 'by_status': by_status},
+        'tasks': {
+            'total': task_total,
+            'done': done_total,
+            'open': task_total - done_total,
+            'done_ratio': ratio(done_total, task_total),
+            'overdue': due['overdue'] or 0,
+            'due_this_week': due['due_this_week'] or 0,
+            'by_priority': {
+                priority: {'total': total, 'done': done[priority], 'done_ratio': ratio(done[priority], total)}
+                for priority, total in totals.items()
+            },
+        },
+        'as_of': today.isoformat(),
+    }
+
+
+def stored_counters(queryset=None):
+    """The StatCounter values of `queryset` (default: all rows), summed over their shards."""
+    queryset = StatCounter.objects.all() if queryset is None else queryset
+    return Counter({
+        (metric, bucket): value
+        for metric, bucket, value in queryset.order_by().values_list('metric', 'bucket').annotate(total=Sum('value'))
+    })
+
+
+def computed_counters():
+    """The StatCounter values recomputed from the contact and (live and archived) task tables."""
+    counts = stat_counts(Contact.objects.all())
+    counts.update(stat_counts(Task.objects.all()))
+    counts.update(stat_counts(ArchivedTask.objects.all()))
+    return counts
+
+
+def recompute_counters():
+    """Bring StatCounter in line with the real tables; return the `(metric, bucket)` keys that were off."""
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            # Writers wait at their counter update until the rebuild commits, so
+            # a write is either in the scan or applies its delta afterwards.
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {StatCounter._meta.db_table} IN EXCLUSIVE MODE')
+        actual = computed_counters()
+        stored = stored_counters()
+        corrected = sorted(key for key in actual.keys() | stored.keys() if actual[key] != stored[key])
+        # Fold the shards into one row per counter; past due dates with no open task left only take up room.
+        StatCounter.objects.all().delete()
+        StatCounter.objects.bulk_create(
+            StatCounter(metric=metric, bucket=bucket, value=value)
+            for (metric, bucket), value in sorted(actual.items()) if value
+        )
+    return corrected
+
@@ -1,7 +1,61 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.db.models import Q, Value
+from django.test import TestCase, TransactionTestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
-from api.models import Contact, Task
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from api.archive import archive_done_tasks
+from api.authentication import tokens, user_version_key
+from api.asyncviews import AsyncReadView, AsyncReadsASGIHandler
+from api.benchmarking import DATASET_EPOCH, call_view, ensure_rows, generate_dataset
+from api.cache import data_version, metrics
+from api.checks import auth_cache_check, database_pool_check
+from api.changes import compact_changes, sequence_state
+from api.deletion import delete_contacts, delete_task_chunk
+from api.duplicates import merge_contacts, normalize_email, normalize_name, normalize_phone, refresh_duplicates
+from api.events import CLOSED, ChangeLogBackend, EventStreamView, Subscriber, hub
+from api.fastread import FastJSONRenderer
+from api.instrumentation import registry
+from api.jobs import HANDLERS, Worker, claim, enqueue, requeue_expired, run_job
+from api.filters import ContactSearchFilter
+from api.reminders import Scheduler
+from api.queryplans import capture_plans, compare_plans, load_snapshot, normalize_sql, save_snapshot, snapshot_path
+from api.models import (
+    ArchivedTask, Change, ChangeAction, Contact, DuplicatePair, Job, JobStatus, Reminder, ReminderCursor, ReminderKind,
+    PendingChange, STAT_SHARDS, StatCounter, Task, publish_changes, stat_shard,
+)
+from api.stats import computed_counters, stored_counters
+from api.serializers import (
+    DUPLICATE_EMAIL_MESSAGE, DUPLICATE_PHONE_MESSAGE, DUPLICATE_TASK_TITLE_MESSAGE, ContactSerializer, TaskSerializer,
+)
+from api.views import ContactViewSet, TaskViewSet
 from django.contrib.auth.models import User
 
 
@@ -192,4 +246,2715 @@ class TaskAPITest(TestCase):
         """GET /api/tasks/?priority=medium should return only medium priority tasks."""
         response = self.client.get('/api/tasks/?priority=medium')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data['results']), 1)
\ No newline at end of file
+        self.assertEqual(len(response.data['results']), 1)
+
+class CursorPaginationTest(TestCase):
+    """Test suite for the opt-in keyset (cursor) pagination mode."""
+
+    def setUp(self):
+        """Create a test user and a handful of contacts with one task each."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        for n in range(25):
+            contact = Contact.objects.create(full_name=f"Contact {n:02d}", status="active" if n % 2 else "inactive")
+            Task.objects.create(contact=contact, title=f"Task {n:02d}", priority="high" if n % 3 else "low")
+
+    def collect(self, url):
+        """Follow `next` links from `url` and return every result plus the number of pages."""
+        results, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            results.extend(response.data['results'])
+            url = response.data['next']
+            pages += 1
+        return results, pages
+
+    def test_page_number_mode_is_default(self):
+        """Without ?cursor the response keeps the page-number shape with a count."""
+        response = self.client.get('/api/contacts/')
+        self.assertEqual(response.data['count'], 25)
+
+    def test_contacts_cursor_walks_every_row_once(self):
+        """Following next links should return every contact in -created_at, id order."""
+        results, pages = self.collect('/api/contacts/?cursor=')
+        self.assertEqual(pages, 3)
+        ids = [row['id'] for row in results]
+        expected = list(Contact.objects.order_by('-created_at', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_tasks_cursor_respects_filter_and_page_size(self):
+        """TaskFilter params and page_size should apply in cursor mode."""
+        results, pages = self.collect('/api/tasks/?cursor=&priority=high&page_size=5')
+        self.assertEqual(len(results), Task.objects.filter(priority='high').count())
+        self.assertEqual(pages, 4)
+        self.assertTrue(all(row['priority'] == 'high' for row in results))
+
+    def test_cursor_with_search_and_ordering(self):
+        """Search and ordering params should combine with the cursor."""
+        results, _ = self.collect('/api/contacts/?cursor=&search=1&ordering=full_name')
+        names = [row['full_name'] for row in results]
+        self.assertEqual(names, sorted(names))
+        self.assertEqual(len(names), 12)
+
+    def test_previous_link_returns_previous_page(self):
+        """The previous link of page two should yield page one again."""
+        first = self.client.get('/api/tasks/?cursor=')
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [row['id'] for row in back.data['results']],
+            [row['id'] for row in first.data['results']],
+        )
+
+    def test_invalid_cursor_returns_404(self):
+        """A tampered cursor should be rejected."""
+        response = self.client.get('/api/contacts/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_nullable_ordering_is_rejected(self):
+        """Ordering by a nullable column cannot be paginated by keyset."""
+        response = self.client.get('/api/tasks/?cursor=&ordering=due_date')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class OpenTasksCountTest(TestCase):
+    """Test suite for the materialized Contact.open_tasks_count column."""
+
+    def setUp(self):
+        """Create a test user and two contacts."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.contact = Contact.objects.create(full_name="Counter Owner")
+        self.other = Contact.objects.create(full_name="Other Owner")
+
+    def count(self, contact=None):
+        """Return the stored counter for `contact` (defaults to self.contact)."""
+        return Contact.objects.get(pk=(contact or self.contact).pk).open_tasks_count
+
+    def test_api_create_toggle_and_delete_keep_counter(self):
+        """Creating, completing, reopening and deleting a task via the API should adjust the counter."""
+        response = self.client.post('/api/tasks/', {"contact": self.contact.id, "title": "Call back"}, format='json')
+        task_id = response.data['id']
+        self.assertEqual(self.count(), 1)
+        self.client.patch(f'/api/tasks/{task_id}/', {"is_done": True}, format='json')
+        self.assertEqual(self.count(), 0)
+        self.client.patch(f'/api/tasks/{task_id}/', {"is_done": False}, format='json')
+        self.assertEqual(self.count(), 1)
+        self.client.delete(f'/api/tasks/{task_id}/')
+        self.assertEqual(self.count(), 0)
+
+    def test_moving_task_between_contacts(self):
+        """Reassigning an open task should move it between the two counters."""
+        task = Task.objects.create(contact=self.contact, title="Move me")
+        self.client.patch(f'/api/tasks/{task.id}/', {"contact": self.other.id}, format='json')
+        self.assertEqual(self.count(), 0)
+        self.assertEqual(self.count(self.other), 1)
+
+    def test_stale_instances(self):
+        """Saves and deletes through stale instances count from the stored row, not from what was loaded."""
+        task = Task.objects.create(contact=self.contact, title="Stale")
+        first, second, third = (Task.objects.get(pk=task.pk) for _ in range(3))
+        first.is_done = True
+        first.save()
+        second.is_done = True
+        second.save()
+        self.assertEqual(self.count(), 0)
+        third.delete()
+        self.assertEqual(self.count(), 0)
+        first.delete()
+        self.assertEqual(self.count(), 0)
+
+    def test_bulk_queryset_paths(self):
+        """bulk_create, update, bulk_update and queryset delete should all keep the counter correct."""
+        tasks = Task.objects.bulk_create([Task(contact=self.contact, title=f"Bulk {n}") for n in range(5)])
+        self.assertEqual(self.count(), 5)
+        Task.objects.filter(pk__in=[t.pk for t in tasks[:2]]).update(is_done=True)
+        self.assertEqual(self.count(), 3)
+        tasks[4].contact = self.other
+        Task.objects.bulk_update([tasks[4]], ['contact'])
+        self.assertEqual(self.count(), 2)
+        self.assertEqual(self.count(self.other), 1)
+        Task.objects.filter(contact=self.contact).delete()
+        self.assertEqual(self.count(), 0)
+
+    def test_contact_list_does_not_join_tasks(self):
+        """Listing contacts should read the column instead of aggregating api_task."""
+        Task.objects.create(contact=self.contact, title="Open Task")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/contacts/')
+        self.assertFalse(any('api_task' in query['sql'] for query in queries.captured_queries))
+        counts = {row['id']: row['open_tasks_count'] for row in response.data['results']}
+        self.assertEqual(counts[self.contact.id], 1)
+
+    def test_reconcile_command_fixes_drift(self):
+        """reconcile_open_tasks should rebuild counters that drifted from api_task."""
+        Task.objects.create(contact=self.contact, title="Open Task")
+        Contact.objects.filter(pk__in=[self.contact.pk, self.other.pk]).update(open_tasks_count=7)
+        out = StringIO()
+        call_command('reconcile_open_tasks', batch_size=1, stdout=out)
+        self.assertIn('2 contacts corrected', out.getvalue())
+        self.assertEqual(self.count(), 1)
+        self.assertEqual(self.count(self.other), 0)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs concurrent writers (PostgreSQL)')
+class OpenTasksCountConcurrencyTest(TransactionTestCase):
+    """Concurrent saves and deletes of one task, each from its own stale instance, apply its delta once."""
+
+    def setUp(self):
+        """A contact with two open tasks."""
+        self.contact = Contact.objects.create(full_name="Race Owner")
+        self.task = Task.objects.create(contact=self.contact, title="Contested", priority="high")
+        Task.objects.create(contact=self.contact, title="Untouched")
+
+    def race(self, action, writers=4):
+        """Load the task once per writer, then run `action(task)` for all of them at once; return the errors."""
+        tasks = [Task.objects.get(pk=self.task.pk) for _ in range(writers)]
+        barrier = threading.Barrier(writers)
+        errors = []
+
+        def run(task):
+            barrier.wait()
+            try:
+                action(task)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(task,)) for task in tasks]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def assertCounted(self, open_tasks):
+        self.contact.refresh_from_db()
+        self.assertEqual(self.contact.open_tasks_count, open_tasks)
+        stored = {key: value for key, value in stored_counters().items() if value}
+        self.assertEqual(stored, {key: value for key, value in computed_counters().items() if value})
+
+    def test_concurrent_toggles(self):
+        """Four writers closing the same open task leave one open task, not a negative count."""
+        def close(task):
+            task.is_done = True
+            task.save()
+
+        self.assertEqual(self.race(close), [])
+        self.assertCounted(1)
+
+    def test_concurrent_deletes(self):
+        """Four writers deleting the same task take one task off the count."""
+        self.assertEqual(self.race(lambda task: task.delete()), [])
+        self.assertFalse(Task.objects.filter(pk=self.task.pk).exists())
+        self.assertCounted(1)
+
+
+class ContactSearchFilterTest(TestCase):
+    """Test suite for the index-backed contact search filter."""
+
+    def test_term_query(self):
+        """Every term, digits and `@` included, is one name/phone/email substring match."""
+        for term in ('+96279', 'sara@', 'Sara'):
+            self.assertEqual(
+                ContactSearchFilter.term_query(term),
+                Q(full_name__icontains=term) | Q(phone__icontains=term) | Q(email__icontains=term),
+            )
+
+    def test_substring_matches_on_every_backend(self):
+        """Digit and `@` terms still match inside phones, names and emails."""
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create_user(username='testuser', password='testpass123'))
+        owner = Contact.objects.create(full_name="Agent 007", phone="+962799000000", email="owner@example.com")
+        for term in ('799', '007', '@example.com'):
+            response = client.get('/api/contacts/', {'search': term})
+            self.assertEqual([row['id'] for row in response.data['results']], [owner.pk], term)
+
+    def test_fallback_matches_search_fields(self):
+        """A phone substring matches on every backend, as with SearchFilter."""
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create_user(username='testuser', password='testpass123'))
+        Contact.objects.create(full_name="Phone Owner", phone="+962799000000")
+        response = client.get('/api/contacts/?search=799')
+        self.assertEqual(len(response.data['results']), 1)
+
+
+class BulkEndpointTest(TestCase):
+    """Test suite for the bulk create/update/delete actions."""
+
+    def setUp(self):
+        """Create a test user and an existing contact to collide with."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.contact = Contact.objects.create(full_name="Existing", phone="+962799000000", email="taken@example.com")
+
+    def test_bulk_create_contacts_reports_row_errors(self):
+        """Valid rows are created; invalid, clashing and in-batch duplicate rows are reported by index."""
+        rows = [
+            {"full_name": "Row Zero", "email": "zero@example.com"},
+            {"full_name": "AB"},
+            {"full_name": "Row Two", "email": "taken@example.com"},
+            {"full_name": "Row Three", "phone": "0791111111"},
+            {"full_name": "Row Four", "phone": "0791111111"},
+        ]
+        response = self.client.post('/api/contacts/bulk/', rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data['created'], 2)
+        errors = {error['index']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(sorted(errors), [1, 2, 4])
+        self.assertIn('full_name', errors[1])
+        self.assertEqual(errors[2]['email'], ["A contact with this email already exists."])
+        self.assertEqual(errors[4]['phone'], ["A contact with this phone already exists."])
+        self.assertEqual(Contact.objects.count(), 3)
+
+    def test_bulk_create_uses_constant_queries(self):
+        """Query count for a bulk create should not grow with the number of rows."""
+        def run(prefix, size):
+            rows = [{"full_name": f"{prefix} {n}", "email": f"{prefix}{n}@example.com"} for n in range(size)]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post('/api/contacts/bulk/', rows, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            return len(queries)
+        self.assertEqual(run('small', 5), run('large', 50))
+
+    def test_bulk_create_tasks_updates_counter(self):
+        """Bulk task creation should validate contacts and titles and keep open_tasks_count correct."""
+        Task.objects.create(contact=self.contact, title="Existing task")
+        rows = [
+            {"contact": self.contact.id, "title": "First"},
+            {"contact": self.contact.id, "title": "Existing task"},
+            {"contact": 9999, "title": "Orphan"},
+            {"contact": self.contact.id, "title": "Second", "is_done": True},
+        ]
+        response = self.client.post('/api/tasks/bulk/', rows, format='json')
+        self.assertEqual(response.data['created'], 2)
+        errors = {error['index']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(errors[1]['title'], ["This contact already has a task with this title."])
+        self.assertIn('contact', errors[2])
+        self.contact.refresh_from_db()
+        self.assertEqual(self.contact.open_tasks_count, 2)
+
+    def test_bulk_update_and_delete(self):
+        """PATCH updates rows by id and DELETE removes them, reporting unknown ids."""
+        tasks = Task.objects.bulk_create([Task(contact=self.contact, title=f"Task {n}") for n in range(3)])
+        response = self.client.patch('/api/tasks/bulk/', [
+            {"id": tasks[0].id, "is_done": True},
+            {"id": tasks[1].id, "title": "Task 2"},
+            {"id": 9999, "is_done": True},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data['ids'], [tasks[0].id])
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.assertTrue(Task.objects.get(pk=tasks[0].id).is_done)
+
+        response = self.client.delete('/api/tasks/bulk/', {"ids": [tasks[0].id, tasks[2].id, 9999]}, format='json')
+        self.assertEqual(response.data['deleted'], 2)
+        self.assertEqual(Task.objects.count(), 1)
+        self.contact.refresh_from_db()
+        self.assertEqual(self.contact.open_tasks_count, 1)
+
+    def test_bulk_rejects_non_list(self):
+        """The payload must be a list."""
+        response = self.client.post('/api/contacts/bulk/', {"full_name": "Single"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ExportTest(TestCase):
+    """Test suite for the streaming CSV/NDJSON export actions."""
+
+    def setUp(self):
+        """Create a test user, two contacts and some tasks."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.contact = Contact.objects.create(full_name="Export Owner", phone="+962799000000", status="active")
+        Contact.objects.create(full_name="Inactive Owner", status="inactive")
+        Task.objects.create(contact=self.contact, title="High one", priority="high")
+        Task.objects.create(contact=self.contact, title="Low one", priority="low", is_done=True)
+
+    def read(self, url):
+        """Fetch an export and return its decoded body."""
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_contacts_csv_honours_status_filter(self):
+        """CSV export should include a header and only the filtered contacts."""
+        body = self.read('/api/contacts/export/?status=active')
+        lines = body.strip().splitlines()
+        self.assertEqual(lines[0], 'id,full_name,phone,email,status,created_at,open_tasks_count')
+        self.assertEqual(len(lines), 2)
+        self.assertIn('Export Owner,+962799000000,,active,', lines[1])
+
+    def test_tasks_ndjson_matches_api_representation(self):
+        """NDJSON rows should match the list endpoint's representation and honour TaskFilter."""
+        body = self.read('/api/tasks/export/?export_format=ndjson&priority=high')
+        rows = [json.loads(line) for line in body.splitlines()]
+        listed = self.client.get('/api/tasks/?priority=high').data['results']
+        self.assertEqual(rows, [dict(row) for row in listed])
+
+    def test_unknown_format_is_rejected(self):
+        """Only csv and ndjson are supported."""
+        response = self.client.get('/api/contacts/export/?export_format=xml')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def peak_export_memory(self, rows):
+        """Top the table up to `rows` contacts and return the peak traced memory of a full export."""
+        ensure_rows(rows, tasks_per_contact=0)
+        response = self.client.get('/api/contacts/export/?export_format=ndjson')
+        tracemalloc.start()
+        try:
+            exported = sum(chunk.count(b'\n') for chunk in response.streaming_content)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(exported, rows)
+        return peak
+
+    def test_export_memory_does_not_grow_with_rows(self):
+        """Peak memory exporting 4x the rows should stay roughly the same."""
+        small = self.peak_export_memory(5000)
+        large = self.peak_export_memory(20000)
+        self.assertLess(large, 4 * 1024 * 1024)
+        self.assertLess(large, small * 1.5)
+
+    @skipUnless(os.environ.get('CRM_SCALE_TESTS'), 'set CRM_SCALE_TESTS=1 to run million-row tests')
+    def test_export_million_rows_memory(self):
+        """Exporting 1M contacts should peak below 8 MB of Python allocations."""
+        self.assertLess(self.peak_export_memory(1_000_000), 8 * 1024 * 1024)
+
+
+class AsyncExportTest(TransactionTestCase):
+    """Exports under ASGI reach the server as an async stream instead of a list built in memory."""
+
+    def setUp(self):
+        self.token = str(AccessToken.for_user(User.objects.create_user(username='testuser', password='testpass123')))
+
+    async def asgi_export(self, query):
+        """Run `GET /api/contacts/export/?<query>` through the ASGI handler; return (status, lines, body messages, peak)."""
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': '/api/contacts/export/', 'raw_path': b'/api/contacts/export/', 'root_path': '',
+            'query_string': query.encode(), 'client': ('127.0.0.1', 5000), 'server': ('testserver', 80),
+            'headers': [(b'host', b'testserver'), (b'authorization', f'Bearer {self.token}'.encode())],
+        }
+        requested, disconnected = False, asyncio.Event()
+        result = {'status': None, 'lines': 0, 'messages': 0}
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                result['status'] = message['status']
+            elif message.get('body'):
+                result['lines'] += message['body'].count(b'\n')
+                result['messages'] += 1
+
+        tracemalloc.start()
+        try:
+            await AsyncReadsASGIHandler()(scope, receive, send)
+            result['peak'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+            disconnected.set()
+        return result
+
+    async def peak_export_memory(self, rows):
+        await sync_to_async(ensure_rows)(rows, tasks_per_contact=0)
+        result = await self.asgi_export('export_format=ndjson')
+        self.assertEqual((result['status'], result['lines']), (200, rows))
+        self.assertGreater(result['messages'], rows // 1000)
+        return result['peak']
+
+    async def test_export_memory_does_not_grow_with_rows(self):
+        """Peak memory of an ASGI export of 4x the rows stays roughly the same."""
+        small = await self.peak_export_memory(5000)
+        large = await self.peak_export_memory(20000)
+        self.assertLess(large, 4 * 1024 * 1024)
+        self.assertLess(large, small * 1.5)
+
+
+class ImportCommandTest(TestCase):
+    """Test suite for the import_crm management command."""
+
+    def setUp(self):
+        """Create an existing contact to collide with and a scratch directory."""
+        self.contact = Contact.objects.create(full_name="Existing", phone="+962799000000", email="taken@example.com")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, text):
+        """Write `text` to a file in the scratch directory and return its path."""
+        path = Path(self.tmp.name) / name
+        path.write_text(text, encoding='utf-8')
+        return path
+
+    def run_import(self, path, model, **options):
+        """Run import_crm and return the parsed reject records."""
+        call_command('import_crm', str(path), model=model, stdout=StringIO(), **options)
+        rejects = Path(f'{path}.rejects.ndjson')
+        if not rejects.exists():
+            return []
+        return [json.loads(line) for line in rejects.read_text().splitlines()]
+
+    def test_import_contacts_csv(self):
+        """Valid rows are imported; rule violations and duplicates go to the rejects file."""
+        path = self.write('contacts.csv', "\n".join([
+            "full_name,phone,email,status",
+            "Good Row,0791111111,good@example.com,active",
+            "AB,,,active",
+            "Bad Phone,abc,,active",
+            "Taken Email,,taken@example.com,inactive",
+            "Dup Phone,0791111111,,active",
+            "No Contact Info,,,",
+        ]) + "\n")
+        rejects = self.run_import(path, 'contacts')
+        self.assertEqual([reject['line'] for reject in rejects], [3, 4, 5, 6])
+        self.assertIn('full_name', rejects[0]['errors'])
+        self.assertEqual(rejects[2]['errors']['email'], ["A contact with this email already exists."])
+        self.assertEqual(rejects[3]['errors']['phone'], ["A contact with this phone already exists."])
+        self.assertEqual(Contact.objects.count(), 3)
+        self.assertEqual(Contact.objects.get(full_name="No Contact Info").status, 'active')
+
+    def test_import_tasks_ndjson_updates_counters(self):
+        """Task imports validate titles, past due dates and duplicates, and keep open_tasks_count."""
+        path = self.write('tasks.ndjson', "\n".join([
+            json.dumps({"contact": self.contact.id, "title": "Call back"}),
+            json.dumps({"contact": self.contact.id, "title": "Call back"}),
+            json.dumps({"contact": self.contact.id, "title": "Old", "due_date": "2020-01-01"}),
+            json.dumps({"contact": 9999, "title": "Orphan"}),
+            "not json",
+            json.dumps({"contact": self.contact.id, "title": "Done already", "is_done": True}),
+        ]) + "\n")
+        rejects = self.run_import(path, 'tasks', chunk_size=2)
+        self.assertEqual([reject['line'] for reject in rejects], [2, 3, 4, 5])
+        self.assertEqual(Task.objects.count(), 2)
+        self.contact.refresh_from_db()
+        self.assertEqual(self.contact.open_tasks_count, 1)
+
+    def test_export_round_trips_through_import(self):
+        """A contacts export can be re-imported; every row is rejected as a duplicate."""
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create_user(username='testuser', password='testpass123'))
+        body = b''.join(client.get('/api/contacts/export/').streaming_content).decode()
+        rejects = self.run_import(self.write('export.csv', body), 'contacts')
+        self.assertEqual(len(rejects), 1)
+        self.assertEqual(Contact.objects.count(), 1)
+
+
+class SeedAndBenchmarkCommandTest(TestCase):
+    """Test suite for `seed --contacts` and the bench_api harness."""
+
+    def seed(self, **options):
+        """Run seed with a small synthetic dataset."""
+        call_command('seed', contacts=40, tasks_per_contact=3, stdout=StringIO(), **options)
+
+    def snapshot(self):
+        """All generated rows, without database ids."""
+        contacts = list(Contact.objects.order_by('pk').values_list(
+            'full_name', 'phone', 'email', 'status', 'created_at', 'open_tasks_count'))
+        tasks = list(Task.objects.order_by('pk').values_list(
+            'contact__email', 'title', 'due_date', 'priority', 'is_done', 'created_at'))
+        return contacts, tasks
+
+    def test_seed_is_deterministic(self):
+        """The same seed regenerates identical rows; a different seed does not."""
+        Contact.objects.create(full_name="Leftover")
+        self.seed(seed=3)
+        first = self.snapshot()
+        self.assertEqual(len(first[0]), 40)
+        self.assertEqual(len(first[1]), 120)
+        self.seed(seed=3)
+        self.assertEqual(self.snapshot(), first)
+        self.seed(seed=4)
+        self.assertNotEqual(self.snapshot(), first)
+
+    def test_seed_writes_generated_created_at(self):
+        """Generated creation times are stored without switching off auto_now_add."""
+        self.seed(seed=1)
+        first = Contact.objects.order_by('pk').first()
+        self.assertEqual(first.created_at, DATASET_EPOCH)
+        self.assertTrue(Contact.objects.filter(created_at__lt=timezone.now() - timedelta(days=1)).exists())
+        self.assertFalse(Task.objects.filter(created_at__gt=timezone.now() - timedelta(days=1)).exists())
+        self.assertTrue(Contact._meta.get_field('created_at').auto_now_add)
+        self.assertTrue(Task._meta.get_field('created_at').auto_now_add)
+
+    def test_seed_keeps_open_tasks_count(self):
+        """Generated contacts carry the right open task counters."""
+        self.seed(seed=1)
+        for contact in Contact.objects.all():
+            self.assertEqual(contact.open_tasks_count, contact.tasks.filter(is_done=False).count())
+
+    def test_bench_api_reports_json(self):
+        """bench_api reports latency percentiles and query counts per endpoint."""
+        self.seed()
+        out = StringIO()
+        call_command('bench_api', repeat=2, warmup=0, json=True, stdout=out)
+        report = json.loads(out.getvalue())
+        cases = {row['case']: row for row in report['results']}
+        self.assertIn('tasks:due-range', cases)
+        self.assertEqual(cases['contacts:create']['status'], 201)
+        self.assertEqual(cases['contacts:detail']['status'], 200)
+        self.assertTrue(all({'p50_ms', 'p95_ms', 'p99_ms', 'queries'} <= set(row) for row in report['results']))
+        self.assertEqual(report['contacts'], 40)
+
+
+class ResponseCacheTest(TestCase):
+    """Test suite for the list/detail response cache."""
+
+    def setUp(self):
+        """Start every test with an empty cache and fresh counters."""
+        caches['default'].clear()
+        metrics.reset()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.contact = Contact.objects.create(full_name="Cached Contact", phone="+962799000000", email="c@example.com")
+
+    def get(self, url, etag=None):
+        """GET `url`, optionally revalidating with `etag`."""
+        return self.client.get(url, headers={'If-None-Match': etag} if etag else None)
+
+    # --- Hits, ETags and keys ---
+
+    def test_second_request_is_served_from_cache(self):
+        """An identical GET is a cache hit with the same body and ETag."""
+        first = self.get('/api/contacts/')
+        second = self.get('/api/contacts/')
+        self.assertEqual((first['X-Cache'], second['X-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertEqual(metrics.snapshot()['hits'], 1)
+        self.assertEqual(metrics.snapshot()['misses'], 1)
+
+    def test_if_none_match_returns_304(self):
+        """A matching If-None-Match gets an empty 304; after a write it gets the new body."""
+        etag = self.get(f'/api/contacts/{self.contact.id}/')['ETag']
+        response = self.get(f'/api/contacts/{self.contact.id}/', etag=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+        self.client.patch(f'/api/contacts/{self.contact.id}/', {"full_name": "Renamed"}, format='json')
+        response = self.get(f'/api/contacts/{self.contact.id}/', etag=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['full_name'], "Renamed")
+
+    def test_query_param_order_does_not_matter(self):
+        """Query params are normalized before keying."""
+        self.get('/api/tasks/?priority=high&is_done=false')
+        self.assertEqual(self.get('/api/tasks/?is_done=false&priority=high')['X-Cache'], 'HIT')
+
+    def test_entries_are_per_user(self):
+        """Another user never receives an entry cached for someone else."""
+        self.get('/api/contacts/')
+        other = APIClient()
+        other.force_authenticate(user=User.objects.create_user(username='other', password='testpass123'))
+        self.assertEqual(other.get('/api/contacts/')['X-Cache'], 'MISS')
+
+    @override_settings(CRM_RESPONSE_CACHE={'ENABLED': False})
+    def test_cache_can_be_disabled(self):
+        """With the cache disabled responses carry no cache headers."""
+        self.get('/api/contacts/')
+        self.assertNotIn('X-Cache', self.get('/api/contacts/'))
+
+    # --- Invalidation ---
+
+    def assertFresh(self, url, write):
+        """Cache `url`, run `write`, and check the next GET is a miss with the new data."""
+        before = self.get(url)
+        self.assertEqual(self.get(url)['X-Cache'], 'HIT')
+        write()
+        after = self.get(url)
+        self.assertEqual(after['X-Cache'], 'MISS')
+        self.assertEqual(after.content, self.client.get(url).content)
+        return before.json(), after.json()
+
+    def test_api_writes_invalidate(self):
+        """Creates, updates and deletes through the API are never followed by stale reads."""
+        _, after = self.assertFresh('/api/contacts/', lambda: self.client.post(
+            '/api/contacts/', {"full_name": "Second Contact"}, format='json'))
+        self.assertEqual(after['count'], 2)
+        _, after = self.assertFresh('/api/tasks/', lambda: self.client.post(
+            '/api/tasks/', {"contact": self.contact.id, "title": "New task"}, format='json'))
+        self.assertEqual(after['count'], 1)
+        _, after = self.assertFresh('/api/contacts/', lambda: self.client.delete(f'/api/contacts/{self.contact.id}/'))
+        self.assertEqual(after['count'], 1)
+
+    def test_task_writes_refresh_contact_counters(self):
+        """A task write shows up in the cached contact's open_tasks_count."""
+        url = f'/api/contacts/{self.contact.id}/'
+        before, after = self.assertFresh(url, lambda: Task.objects.create(contact=self.contact, title="Open task"))
+        self.assertEqual((before['open_tasks_count'], after['open_tasks_count']), (0, 1))
+        _, after = self.assertFresh(url, lambda: Task.objects.filter(contact=self.contact).update(is_done=True))
+        self.assertEqual(after['open_tasks_count'], 0)
+
+    def test_bulk_and_queryset_writes_invalidate(self):
+        """Bulk endpoints and queryset updates bump the version too."""
+        self.assertFresh('/api/contacts/', lambda: self.client.post(
+            '/api/contacts/bulk/', [{"full_name": "Bulk One"}], format='json'))
+        _, after = self.assertFresh('/api/contacts/', lambda: Contact.objects.update(status='inactive'))
+        self.assertEqual({row['status'] for row in after['results']}, {'inactive'})
+
+    def test_admin_writes_invalidate(self):
+        """Edits made in the Django admin are picked up immediately."""
+        admin = User.objects.create_superuser(username='admin', password='adminpass123')
+        self.client.force_login(admin)
+        url = f'/api/contacts/{self.contact.id}/'
+
+        def edit():
+            response = self.client.post(f'/admin/api/contact/{self.contact.id}/change/', {
+                'full_name': 'Admin Edit', 'phone': self.contact.phone, 'email': self.contact.email, 'status': 'active',
+            })
+            self.assertEqual(response.status_code, 302)
+
+        _, after = self.assertFresh(url, edit)
+        self.assertEqual(after['full_name'], 'Admin Edit')
+
+    def test_version_is_bumped_again_on_commit(self):
+        """Writes inside a transaction bump the version again once committed."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            Contact.objects.create(full_name="In Transaction")
+            version = data_version()
+        self.assertTrue(callbacks)
+        for callback in callbacks:
+            callback()
+        self.assertGreater(data_version(), version)
+
+
+@override_settings(CRM_RESPONSE_CACHE={'ENABLED': False})
+class QueryPlanTest(TestCase):
+    """
+    EXPLAIN the SQL behind common list filters on a 60k-task fixture.
+
+    The page query (ORDER BY ... LIMIT) must always come from an index. The
+    COUNT query must too when the filter is selective; counting most of a
+    table is legitimately a sequential scan.
+    """
+    SEQ_SCAN = {
+        'postgresql': re.compile(r'Seq Scan on (api_\w+)'),
+        'sqlite': re.compile(r'^SCAN (api_\w+)$'),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        """Generate the fixture and refresh planner statistics."""
+        generate_dataset(20000, 3, seed=9)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.contact_id = Contact.objects.order_by('pk').values_list('pk', flat=True)[500]
+
+    def seq_scans(self, sql):
+        """Tables the plan for `sql` reads with a full scan."""
+        with connection.cursor() as cursor:
+            prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+            cursor.execute(prefix + sql)
+            lines = [row[-1] for row in cursor.fetchall()]
+        pattern = self.SEQ_SCAN.get(connection.vendor)
+        if pattern is None:
+            self.skipTest(f'No plan parser for {connection.vendor}')
+        return {match.group(1) for line in lines for match in [pattern.search(line.strip())] if match}
+
+    def assertIndexed(self, viewset, params, selective):
+        """Run the list view with `params` and check the plans of its queries."""
+        path = '/api/contacts/' if viewset is ContactViewSet else '/api/tasks/'
+        with CaptureQueriesContext(connection) as queries:
+            response = call_view(viewset.as_view({'get': 'list'}), path, params)
+        self.assertEqual(response.status_code, 200)
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not selective and 'LIMIT' not in sql:
+                continue
+            with self.subTest(params=params, sql=sql[:80]):
+                self.assertEqual(self.seq_scans(sql), set())
+
+    def test_contact_filters(self):
+        """Status filters and name ordering on contacts."""
+        self.assertIndexed(ContactViewSet, {'status': 'inactive'}, selective=False)
+        self.assertIndexed(ContactViewSet, {'ordering': 'full_name'}, selective=False)
+        self.assertIndexed(ContactViewSet, {'status': 'active', 'ordering': 'full_name'}, selective=False)
+        self.assertIndexed(ContactViewSet, {'status': 'active', 'cursor': ''}, selective=False)
+
+    def test_task_filters(self):
+        """TaskFilter combinations used by the frontend and reminders."""
+        due = {'due_from': '2025-01-01', 'due_to': '2025-01-10'}
+        self.assertIndexed(TaskViewSet, {'contact_id': self.contact_id}, selective=True)
+        self.assertIndexed(TaskViewSet, {'contact_id': self.contact_id, 'is_done': 'false'}, selective=True)
+        self.assertIndexed(TaskViewSet, due, selective=True)
+        self.assertIndexed(TaskViewSet, {**due, 'is_done': 'false'}, selective=True)
+        self.assertIndexed(TaskViewSet, {**due, 'is_done': 'false', 'priority': 'high'}, selective=True)
+        self.assertIndexed(TaskViewSet, {'is_done': 'false'}, selective=False)
+        self.assertIndexed(TaskViewSet, {'priority': 'high'}, selective=False)
+        self.assertIndexed(TaskViewSet, {'is_done': 'false', 'cursor': ''}, selective=False)
+
+    @skipUnless(connection.vendor == 'postgresql', 'pg_trgm indexes are PostgreSQL-only')
+    def test_contact_search(self):
+        """Name, phone and email terms of three or more characters are answered from the trigram indexes."""
+        for term in ('Qzx', '+1555', 'nobody@'):
+            self.assertIndexed(ContactViewSet, {'search': term}, selective=True)
+            with CaptureQueriesContext(connection) as queries:
+                call_view(ContactViewSet.as_view({'get': 'list'}), '/api/contacts/', {'search': term})
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN ' + queries.captured_queries[0]['sql'])
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+            for index in ('contact_name_trgm_idx', 'contact_phone_trgm_idx', 'contact_email_trgm_idx'):
+                self.assertIn(f'Bitmap Index Scan on {index}', plan, term)
+
+    @tag('plan_snapshot')
+    def test_plan_snapshot(self):
+        """
+        Query counts and plan shapes of every list filter combination match
+        api/plan_snapshots/<vendor>.json. Set CRM_UPDATE_PLAN_SNAPSHOTS=1 to
+        rewrite the snapshot after an intended change.
+        """
+        fixture = {'contacts': 20000, 'tasks_per_contact': 3, 'seed': 9}
+        path = snapshot_path()
+        try:
+            actual = capture_plans(self.contact_id)
+        except NotImplementedError as exc:
+            self.skipTest(str(exc))
+        if os.environ.get('CRM_UPDATE_PLAN_SNAPSHOTS'):
+            save_snapshot(path, fixture, actual)
+            return
+        if not path.exists():
+            message = f'No plan snapshot for {connection.vendor}; create it with CRM_UPDATE_PLAN_SNAPSHOTS=1'
+            if os.environ.get('CI'):
+                self.fail(message)  # CI runs this test only where a snapshot is committed (see ci.yml)
+            self.skipTest(message)
+        snapshot = load_snapshot(path)
+        self.assertEqual(snapshot['fixture'], fixture)
+        report = compare_plans(snapshot['cases'], actual)
+        if report:
+            self.fail(f'Query plans changed (CRM_UPDATE_PLAN_SNAPSHOTS=1 accepts them):\n\n{report}')
+
+    def test_plan_report(self):
+        """A changed query count or plan is reported with diffs; a changed literal is not."""
+        key = 'tasks?is_done=false'
+        before = {key: {'status': 200, 'queries': 2, 'sql': ['SELECT ?'], 'plans': [['SEARCH api_task USING INDEX task_open_idx']]}}
+        same = {key: {**before[key], 'sql': [normalize_sql("SELECT 'x'")]}}
+        self.assertEqual(compare_plans(before, same), '')
+        after = {key: {'status': 200, 'queries': 3, 'sql': ['SELECT ?', 'SELECT ?'], 'plans': [['SCAN api_task'], ['SCAN api_contact']]}}
+        report = compare_plans(before, after)
+        self.assertIn('tasks?is_done=false: 2 -> 3 queries', report)
+        self.assertIn('-SEARCH api_task USING INDEX task_open_idx', report)
+        self.assertIn('+SCAN api_contact', report)
+        self.assertIn('tasks: not in the snapshot', compare_plans(before, {**after, 'tasks': before[key]}))
+
+
+@override_settings(CRM_RESPONSE_CACHE={'ENABLED': False})
+class RequestMetricsTest(TestCase):
+    """Test suite for the request metrics middleware and /api/metrics/."""
+
+    def setUp(self):
+        """Reset the registry and create a user with one contact and task."""
+        registry.reset()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.contact = Contact.objects.create(full_name="Metered Contact")
+        Task.objects.create(contact=self.contact, title="Metered task")
+
+    def server_timing(self, response):
+        """Parse a Server-Timing header into `{name: (duration, description)}`."""
+        timings = {}
+        for part in response['Server-Timing'].split(', '):
+            name, *params = part.split(';')
+            params = dict(param.split('=', 1) for param in params)
+            timings[name] = (float(params['dur']), params.get('desc', '').strip('"'))
+        return timings
+
+    def test_server_timing_header(self):
+        """API responses report DB, serialization and total time with the query count."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/tasks/')
+        timings = self.server_timing(response)
+        self.assertEqual(set(timings), {'db', 'serialize', 'total'})
+        self.assertEqual(timings['db'][1], f'{len(queries)} queries')
+        self.assertLessEqual(timings['db'][0] + timings['serialize'][0], timings['total'][0] + 0.01)
+
+    def test_non_api_paths_are_not_instrumented(self):
+        """Only paths under /api/ get the header."""
+        self.assertNotIn('Server-Timing', self.client.get('/admin/login/'))
+
+    def test_metrics_endpoint_exposes_histograms(self):
+        """Histograms are labelled by viewset action, method and status class."""
+        self.client.get('/api/contacts/')
+        self.client.get('/api/contacts/')
+        self.client.get(f'/api/contacts/{self.contact.id}/')
+        admin = User.objects.create_superuser(username='admin', password='adminpass123')
+        self.client.force_authenticate(user=admin)
+        body = self.client.get('/api/metrics/').content.decode()
+        self.assertIn('# TYPE crm_request_duration_seconds histogram', body)
+        self.assertIn('crm_request_duration_seconds_count{view="contact.list",method="GET",status="2xx"} 2', body)
+        self.assertIn('crm_request_db_queries_count{view="contact.retrieve",method="GET",status="2xx"} 1', body)
+        self.assertIn('crm_request_serialize_duration_seconds_bucket{view="contact.list",method="GET",status="2xx",le="+Inf"} 2', body)
+
+    def test_metrics_endpoint_requires_admin(self):
+        """Regular users cannot read the metrics."""
+        self.assertEqual(self.client.get('/api/metrics/').status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(CRM_METRICS={'SLOW_QUERY_MS': 0})
+    def test_slow_queries_are_logged(self):
+        """Queries over the threshold are logged with the view label."""
+        with self.assertLogs('api.slow_queries', level='WARNING') as logs:
+            self.client.get('/api/contacts/')
+        self.assertIn('in contact.list', logs.output[0])
+        self.assertGreater(registry.slow_queries, 0)
+
+    @override_settings(CRM_METRICS={'ENABLED': False})
+    def test_can_be_disabled(self):
+        """With metrics disabled nothing is added or recorded."""
+        response = self.client.get('/api/contacts/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(registry.histograms['total'].series, {})
+
+
+@override_settings(CRM_RESPONSE_CACHE={'ENABLED': False})
+class ContactExpandTest(TestCase):
+    """Test suite for ?expand=tasks and ?fields= on the contact endpoints."""
+
+    def setUp(self):
+        """Create a test user and contacts with a few tasks each."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.contact = Contact.objects.create(full_name="Expanded Contact", email="expanded@example.com")
+        for i in range(3):
+            Task.objects.create(contact=self.contact, title=f"Task {i}", is_done=i == 0, priority='high' if i else 'low')
+
+    def add_contacts(self, count):
+        """Create `count` more contacts with two tasks each."""
+        for n in range(count):
+            contact = Contact.objects.create(full_name=f"Page Contact {n}")
+            Task.objects.create(contact=contact, title="First")
+            Task.objects.create(contact=contact, title="Second")
+
+    def test_detail_embeds_tasks_newest_first(self):
+        """GET /api/contacts/<id>/?expand=tasks embeds all tasks in two queries."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/contacts/{self.contact.id}/?expand=tasks')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([task['title'] for task in response.data['tasks']], ["Task 2", "Task 1", "Task 0"])
+        self.assertEqual(response.data['tasks'][0]['contact'], self.contact.id)
+        self.assertEqual(len(queries), 2)
+
+    def test_without_expand_no_tasks(self):
+        """Tasks are only embedded on request."""
+        response = self.client.get(f'/api/contacts/{self.contact.id}/')
+        self.assertNotIn('tasks', response.data)
+
+    def test_list_query_count_is_constant(self):
+        """A page of 10 contacts costs as many queries as a page of 1."""
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/api/contacts/?expand=tasks')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(queries), len(response.data['results'])
+
+        small = count_queries()
+        self.add_contacts(12)
+        large = count_queries()
+        self.assertEqual((small[1], large[1]), (1, 10))
+        self.assertEqual(small[0], large[0])
+        self.assertEqual(large[0], 3)  # count, contacts, tasks
+
+    def test_task_filters_and_limit(self):
+        """Embedded tasks can be filtered and capped per contact."""
+        url = f'/api/contacts/{self.contact.id}/?expand=tasks'
+        response = self.client.get(url + '&tasks_is_done=false&tasks_priority=high&tasks_limit=1')
+        self.assertEqual([task['title'] for task in response.data['tasks']], ["Task 2"])
+        self.assertEqual(self.client.get(url + '&tasks_limit=0').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url + '&tasks_priority=urgent').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sparse_fieldsets_load_only_selected_columns(self):
+        """fields= trims both the JSON and the selected columns."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/contacts/?expand=tasks&fields=id,full_name,tasks.title')
+        row = response.data['results'][0]
+        self.assertEqual(set(row), {'id', 'full_name', 'tasks'})
+        self.assertEqual(set(row['tasks'][0]), {'title'})
+        contact_sql, task_sql = queries.captured_queries[-2]['sql'], queries.captured_queries[-1]['sql']
+        self.assertNotIn('"email"', contact_sql)
+        self.assertNotIn('"priority"', task_sql)
+
+    def test_unknown_expansion_or_field_is_rejected(self):
+        """Typos are reported instead of silently ignored."""
+        response = self.client.get('/api/contacts/?expand=notes')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('expand', response.data)
+        response = self.client.get('/api/contacts/?fields=id,tasks.nope')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['fields'], ["Unknown field: tasks.nope."])
+
+
+# ---------------------------------------------------------------------------
+# Fast read path
+# ---------------------------------------------------------------------------
+
+@override_settings(CRM_RESPONSE_CACHE={'ENABLED': False})
+class FastReadParityTest(TestCase):
+    """The fast list/retrieve path must return exactly what the serializers return."""
+
+    def setUp(self):
+        """Create contacts and tasks covering NULLs, unicode and odd timestamps."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        names = ["Zoë \"Quoted\" O'Brien", "Line\u2028Separator\u2029", "Tab\tand\\slash 😀", "Plain Name"]
+        for n, name in enumerate(names):
+            contact = Contact.objects.create(
+                full_name=name, phone=f'+100{n}' if n % 2 else '', email=f'c{n}@example.com' if n != 2 else '',
+                status='inactive' if n == 3 else 'active',
+            )
+            Task.objects.create(
+                contact=contact, title=f"Task ünïcode {n}", due_date=None if n % 2 else f'2099-01-0{n + 1}',
+            )
+            Task.objects.create(contact=contact, title=f"Done {n}", is_done=True, priority='high')
+        # Whole-second and pre-epoch-ish timestamps render differently from auto_now_add ones.
+        Contact.objects.filter(full_name="Plain Name").update(created_at=DATASET_EPOCH)
+        self.contact = Contact.objects.get(full_name="Plain Name")
+        self.urls = [
+            '/api/contacts/', '/api/contacts/?ordering=full_name', '/api/contacts/?status=active',
+            '/api/contacts/?search=Name', '/api/contacts/?fields=id,created_at,phone', '/api/contacts/?cursor=',
+            '/api/contacts/?cursor=&ordering=full_name&fields=email', f'/api/contacts/{self.contact.id}/',
+            f'/api/contacts/{self.contact.id}/?fields=full_name', '/api/tasks/', '/api/tasks/?page_size=3',
+            '/api/tasks/?page_size=3&page=2', '/api/tasks/?cursor=&page_size=2', '/api/tasks/?is_done=true',
+            f'/api/tasks/{Task.objects.first().id}/',
+        ]
+
+    def fetch(self, url, fast):
+        """Return (status, content type, body) with the fast path on or off."""
+        with override_settings(CRM_FAST_READS=fast):
+            response = self.client.get(url)
+        return response.status_code, response['Content-Type'], response.content
+
+    def assert_same_output(self, urls):
+        """Both paths produce byte-identical responses for every URL."""
+        for url in urls:
+            with self.subTest(url=url):
+                slow = self.fetch(url, fast=False)
+                self.assertEqual(slow[0], status.HTTP_200_OK)
+                self.assertEqual(self.fetch(url, fast=True), slow)
+
+    def test_list_and_detail_are_byte_identical(self):
+        """Lists, filters, sparse fieldsets, cursors and details match the serializers."""
+        self.assert_same_output(self.urls)
+
+    def test_next_cursor_pages_are_byte_identical(self):
+        """Following `next` links works the same on both paths."""
+        for url in ('/api/tasks/?cursor=&page_size=3', '/api/contacts/?cursor=&ordering=full_name&fields=id'):
+            for _ in range(3):
+                self.assert_same_output([url])
+                url = json.loads(self.fetch(url, fast=True)[2])['next']
+                if url is None:
+                    break
+
+    @override_settings(TIME_ZONE='America/New_York')
+    def test_datetimes_follow_the_current_time_zone(self):
+        """Timestamps are converted and formatted like DRF's DateTimeField."""
+        self.assert_same_output([f'/api/contacts/{self.contact.id}/', '/api/tasks/'])
+        created_at = self.client.get(f'/api/contacts/{self.contact.id}/').data['created_at']
+        self.assertEqual(created_at, '2024-12-31T19:00:00-05:00')
+
+    def test_errors_and_other_formats_match(self):
+        """404s, bad params and the browsable API fall back to the regular path."""
+        for url in ('/api/contacts/999999/', '/api/contacts/abc/', '/api/contacts/?fields=nope', '/api/tasks/?page=99'):
+            with self.subTest(url=url):
+                self.assertEqual(self.fetch(url, fast=True), self.fetch(url, fast=False))
+        response = self.client.get('/api/contacts/', HTTP_ACCEPT='application/json; indent=2')
+        self.assertIn(b'\n  ', response.content)
+
+    def test_fast_path_skips_the_serializer(self):
+        """Plain reads never call the serializer, while ?expand= still does."""
+        with mock.patch.object(ContactSerializer, 'to_representation', side_effect=AssertionError):
+            self.assertEqual(self.client.get('/api/contacts/').status_code, status.HTTP_200_OK)
+            self.assertEqual(self.client.get(f'/api/contacts/{self.contact.id}/').status_code, status.HTTP_200_OK)
+            with self.assertRaises(AssertionError):
+                self.client.get('/api/contacts/?expand=tasks')
+
+    def test_renderer_matches_json_renderer(self):
+        """orjson output equals JSONRenderer output, including U+2028 escaping."""
+        data = {'text': ''.join(map(chr, range(128))) + '\u2028\u2029é😀', 'n': [1, None, True, False, 2 ** 62]}
+        response = Response(data)
+        response.fast_read = True
+        self.assertEqual(
+            FastJSONRenderer().render(data, 'application/json', {'response': response}),
+            JSONRenderer().render(data, 'application/json', {}),
+        )
+
+    def test_bench_reads_command(self):
+        """bench_reads checks parity and reports throughput for both paths."""
+        out = StringIO()
+        call_command('bench_reads', '--rows', '5', '--repeat', '1', '--json', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual([row['case'] for row in report['results']][:2], ['contacts:rows', 'tasks:rows'])
+        self.assertTrue(all(row['fast_rows_per_sec'] > 0 for row in report['results'][:2]))
+
+
+# ---------------------------------------------------------------------------
+# Async (ASGI) reads
+# ---------------------------------------------------------------------------
+
+@override_settings(ROOT_URLCONF='config.asgi_urls', CRM_RESPONSE_CACHE={'ENABLED': False})
+class AsyncReadViewTest(TestCase):
+    """Test suite for the async list/detail views served under ASGI."""
+
+    def setUp(self):
+        """Create a user with a JWT and a few contacts and tasks."""
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+        for n in range(12):
+            contact = Contact.objects.create(full_name=f"Async Contact {n}", phone=f'+200{n}' if n % 2 else '')
+            Task.objects.create(contact=contact, title=f"Async task {n}", due_date=None if n % 3 else '2099-02-01')
+        self.contact = Contact.objects.first()
+        registry.reset()
+
+    def sync_get(self, url):
+        """Fetch `url` through the sync views."""
+        with override_settings(ROOT_URLCONF='config.urls'):
+            return APIClient().get(url, headers=self.headers)
+
+    def test_routes_resolve_to_async_views(self):
+        """List and detail URLs go to AsyncReadView, other routes keep the DRF views."""
+        self.assertIs(resolve('/api/contacts/').func.view_class, AsyncReadView)
+        self.assertIs(resolve('/api/tasks/3/').func.view_class, AsyncReadView)
+        self.assertEqual(resolve('/api/contacts/export/').func.cls, ContactViewSet)
+        self.assertEqual(resolve('/api/contacts/', urlconf='config.urls').func.cls, ContactViewSet)
+
+    async def test_reads_match_the_sync_views(self):
+        """Lists, pages, cursors, filters and details are byte-identical to the sync views."""
+        urls = [
+            '/api/contacts/', '/api/contacts/?page=2', '/api/contacts/?cursor=&ordering=full_name',
+            '/api/contacts/?search=Contact 1&fields=id,phone', f'/api/contacts/{self.contact.id}/',
+            '/api/tasks/?page_size=5&is_done=false', '/api/tasks/?cursor=&page_size=4',
+            '/api/contacts/999999/', '/api/contacts/abc/', '/api/contacts/?page=99', '/api/contacts/?cursor=bad',
+            '/api/contacts/?fields=nope',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                with mock.patch.object(AsyncReadView, 'delegate', side_effect=AssertionError('delegated')):
+                    response = await self.async_client.get(url, headers=self.headers)
+                expected = await sync_to_async(self.sync_get)(url)
+                self.assertEqual((response.status_code, response.content), (expected.status_code, expected.content))
+                self.assertEqual(response['Content-Type'], expected['Content-Type'])
+
+    async def test_other_requests_use_the_sync_views(self):
+        """Writes, ?expand= and unauthenticated requests behave as before."""
+        response = await self.async_client.post(
+            '/api/contacts/', {'full_name': 'Created Async'}, content_type='application/json', headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = await self.async_client.get(f'/api/contacts/{self.contact.id}/?expand=tasks', headers=self.headers)
+        self.assertEqual(len(response.json()['tasks']), 1)
+        response = await self.async_client.delete(f'/api/contacts/{self.contact.id}/', headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = await self.async_client.get('/api/contacts/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('WWW-Authenticate', response)
+
+    async def test_metrics_count_async_orm_queries(self):
+        """Queries run by the async ORM in worker threads are attributed to the request."""
+        response = await self.async_client.get('/api/tasks/', headers=self.headers)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertIn(('task.list', 'GET', '2xx'), registry.histograms['queries'].series)
+
+    @override_settings(CRM_RESPONSE_CACHE={'ENABLED': True})
+    async def test_response_cache_applies(self):
+        """Async reads use the same response cache and ETags."""
+        await sync_to_async(caches['default'].clear)()
+        first = await self.async_client.get('/api/contacts/', headers=self.headers)
+        second = await self.async_client.get('/api/contacts/', headers=self.headers)
+        self.assertEqual((first['X-Cache'], second['X-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(first.content, second.content)
+        response = await self.async_client.get(
+            '/api/contacts/', headers={**self.headers, 'If-None-Match': first['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_asgi_handler_uses_the_async_urlconf(self):
+        """The project's ASGI application routes through config.asgi_urls."""
+        scope = {'type': 'http', 'method': 'GET', 'path': '/api/contacts/', 'query_string': b'', 'headers': []}
+        request, error = AsyncReadsASGIHandler().create_request(scope, BytesIO())
+        self.assertIsNone(error)
+        self.assertEqual(request.urlconf, 'config.asgi_urls')
+
+
+class ConnectionSettingsTest(TestCase):
+    """ASGI borrows connections from psycopg's pool, and the pool fails the system checks without its packages."""
+
+    def test_asgi_uses_the_pool(self):
+        """Loading config.asgi turns DB_POOL on unless the environment says otherwise."""
+        probe = (
+            "import config.asgi; from django.conf import settings; "
+            "database = settings.DATABASES['default']; print(database['OPTIONS'].get('pool', {}).get('max_size'), database['CONN_MAX_AGE'])"
+        )
+        env = {key: value for key, value in os.environ.items() if not key.startswith('DB_')}
+        env.update(DJANGO_SETTINGS_MODULE='config.settings.ci', SECRET_KEY='x')
+        run = lambda **extra: subprocess.run(
+            [sys.executable, '-c', probe], env={**env, **extra}, capture_output=True, text=True, check=True,
+        ).stdout.split()
+        self.assertEqual(run(), ['20', '0'])
+        self.assertEqual(run(DB_POOL='False'), ['None', '0'])
+
+    def test_pool_check(self):
+        """A pooled database without psycopg-pool installed is reported by `manage.py check`."""
+        pooled = {'pooled': {'OPTIONS': {'pool': {'max_size': 4}}}}
+        with mock.patch.dict(settings.DATABASES, pooled), mock.patch('api.checks.find_spec', return_value=None):
+            self.assertEqual([error.id for error in database_pool_check(None)], ['api.E001'])
+        with mock.patch.dict(settings.DATABASES, pooled), mock.patch('api.checks.find_spec', return_value=object()):
+            self.assertEqual(database_pool_check(None), [])
+        self.assertEqual(database_pool_check(None), [])
+
+
+class ConcurrencyBenchmarkCommandTest(TransactionTestCase):
+    """bench_concurrency drives real WSGI worker threads and ASGI requests, so the data must be committed."""
+
+    def test_reports_both_servers(self):
+        """Both servers answer every request and the report has one row each."""
+        Contact.objects.create(full_name="Concurrent Contact")
+        out = StringIO()
+        call_command(
+            'bench_concurrency', '--clients', '4', '--wsgi-threads', '2', '--requests', '12', '--json', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual([row['server'] for row in report['results']], ['wsgi', 'asgi'])
+        for row in report['results']:
+            self.assertEqual((row['runs'], row['errors']), (12, 0))
+
+
+# ---------------------------------------------------------------------------
+# Uniqueness enforced by database constraints
+# ---------------------------------------------------------------------------
+
+def statements(queries):
+    """Captured SQL without the savepoints TestCase wraps around every atomic block."""
+    return [q['sql'] for q in queries if not re.match(r'(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)', q['sql'])]
+
+
+class ConstraintValidationTest(TestCase):
+    """Writes rely on the unique constraints and report violations as the usual field errors."""
+
+    def setUp(self):
+        """Create a contact with an email and a phone, and one of its tasks."""
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username='testuser'))
+        self.contact = Contact.objects.create(full_name="Taken Contact", email="taken@example.com", phone="+100")
+        self.task = Task.objects.create(contact=self.contact, title="Taken Title")
+
+    def test_create_runs_only_the_insert(self):
+        """
+        Validating and saving a new contact runs no existence checks, only its
+        INSERT plus the counter and change log rows; its commit runs nothing more.
+        """
+        serializer = ContactSerializer(data={"full_name": "Fresh Contact", "email": "fresh@example.com", "phone": "+200"})
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(serializer.is_valid())
+            serializer.save()
+        sql = statements(queries)
+        self.assertEqual([statement.split(' (')[0] for statement in sql], [
+            'INSERT INTO "api_contact"', 'INSERT INTO "api_statcounter"', 'INSERT INTO "api_pendingchange"',
+        ])
+
+    def test_duplicate_contact_fields(self):
+        """Duplicate emails and phones get the field errors, on create and on update."""
+        response = self.client.post('/api/contacts/', {"full_name": "Other", "email": "taken@example.com"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'email': [DUPLICATE_EMAIL_MESSAGE]})
+        other = Contact.objects.create(full_name="Other Contact")
+        response = self.client.patch(f'/api/contacts/{other.pk}/', {"phone": "+100"}, format='json')
+        self.assertEqual(response.data, {'phone': [DUPLICATE_PHONE_MESSAGE]})
+        self.assertEqual(Contact.objects.count(), 2)
+
+    def test_saving_own_values_is_allowed(self):
+        """Re-sending a contact's own email and phone, or blank values for several contacts, is fine."""
+        response = self.client.put(
+            f'/api/contacts/{self.contact.pk}/',
+            {"full_name": "Renamed", "email": "taken@example.com", "phone": "+100", "status": "active"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for name in ("Blank One", "Blank Two"):
+            response = self.client.post('/api/contacts/', {"full_name": name, "email": "", "phone": ""}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_duplicate_task_title(self):
+        """A title already used by the contact is rejected on create and on a partial update."""
+        data = {"contact": self.contact.pk, "title": "Taken Title"}
+        response = self.client.post('/api/tasks/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'title': [DUPLICATE_TASK_TITLE_MESSAGE]})
+        other = Task.objects.create(contact=self.contact, title="Other Title")
+        response = self.client.patch(f'/api/tasks/{other.pk}/', {"title": "Taken Title"}, format='json')
+        self.assertEqual(response.data, {'title': [DUPLICATE_TASK_TITLE_MESSAGE]})
+        # The failed write rolled back to its savepoint: the counter and the database are intact.
+        self.contact.refresh_from_db()
+        self.assertEqual(self.contact.open_tasks_count, 2)
+        other_contact = Contact.objects.create(full_name="Second Owner")
+        response = self.client.post('/api/tasks/', {**data, "contact": other_contact.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_bulk_write_race_reports_field_errors(self):
+        """A duplicate that slips past the bulk conflict check gets the field error, not the raw database error."""
+        rows = [{"full_name": "Row Zero", "email": "zero@example.com"}, {"full_name": "Row One", "phone": "+100"}]
+        with mock.patch('api.bulk.ContactBulkWriter.find_conflicts', return_value={}):
+            response = self.client.post('/api/contacts/bulk/', rows, format='json')
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'], [{'index': 1, 'errors': {'phone': [DUPLICATE_PHONE_MESSAGE]}}])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs concurrent writers (PostgreSQL)')
+class ConcurrentDuplicateTest(TransactionTestCase):
+    """Two writers that both pass validation cannot both store the same unique value."""
+
+    def race(self, serializer_class, payloads):
+        """Validate every payload, then save them all at once from separate threads."""
+        serializers = [serializer_class(data=data) for data in payloads]
+        for serializer in serializers:
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+        barrier = threading.Barrier(len(serializers))
+        outcomes = []
+
+        def save(serializer):
+            barrier.wait()
+            try:
+                serializer.save()
+                outcomes.append('created')
+            except ValidationError as exc:
+                outcomes.append(exc.detail)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=save, args=(serializer,)) for serializer in serializers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def test_concurrent_contacts(self):
+        """One of two concurrent contacts with the same email is created, the other gets the email error."""
+        outcomes = self.race(ContactSerializer, [
+            {"full_name": "First Writer", "email": "race@example.com"},
+            {"full_name": "Second Writer", "email": "race@example.com"},
+        ])
+        self.assertCountEqual(outcomes, ['created', {'email': [DUPLICATE_EMAIL_MESSAGE]}])
+        self.assertEqual(Contact.objects.filter(email="race@example.com").count(), 1)
+
+    def test_concurrent_tasks(self):
+        """One of two concurrent tasks with the same contact and title is created, the other gets the title error."""
+        contact = Contact.objects.create(full_name="Race Owner")
+        outcomes = self.race(TaskSerializer, [{"contact": contact.pk, "title": "Same Title"}] * 2)
+        self.assertCountEqual(outcomes, ['created', {'title': [DUPLICATE_TASK_TITLE_MESSAGE]}])
+        contact.refresh_from_db()
+        self.assertEqual(contact.open_tasks_count, 1)
+
+
+# ---------------------------------------------------------------------------
+# Dashboard statistics
+# ---------------------------------------------------------------------------
+
+@override_settings(CRM_STATS={'CACHE_TIMEOUT': 0})
+class StatsTest(TestCase):
+    """/api/stats/ is served from StatCounter, which every write path keeps exact."""
+
+    def setUp(self):
+        """Create contacts in both statuses and tasks around today's date."""
+        caches['default'].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username='testuser'))
+        self.today = timezone.localdate()
+        self.active = Contact.objects.create(full_name="Active Contact")
+        self.inactive = Contact.objects.create(full_name="Inactive Contact", status="inactive")
+        day = lambda offset: self.today + timedelta(days=offset)
+        for title, priority, is_done, due_date in (
+            ("Overdue task", "high", False, day(-1)),
+            ("Due today", "high", False, day(0)),
+            ("Due in six days", "low", False, day(6)),
+            ("Due next week", "medium", False, day(7)),
+            ("Done and overdue", "high", True, day(-3)),
+            ("No due date", "medium", False, None),
+        ):
+            Task.objects.create(contact=self.active, title=title, priority=priority, is_done=is_done, due_date=due_date)
+
+    def assertCountersExact(self):
+        """The stored counters equal a full recount (zero rows ignored)."""
+        stored = {key: value for key, value in stored_counters().items() if value}
+        self.assertEqual(stored, {key: value for key, value in computed_counters().items() if value})
+
+    def test_stats_payload(self):
+        """Counts per status and priority, done ratios, overdue and due within seven days."""
+        response = self.client.get('/api/stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {
+            'contacts': {'total': 2, 'by_status': {'active': 1, 'inactive': 1}},
+            'tasks': {
+                'total': 6, 'done': 1, 'open': 5, 'done_ratio': 0.1667, 'overdue': 1, 'due_this_week': 2,
+                'by_priority': {
+                    'low': {'total': 1, 'done': 0, 'done_ratio': 0.0},
+                    'medium': {'total': 2, 'done': 0, 'done_ratio': 0.0},
+                    'high': {'total': 3, 'done': 1, 'done_ratio': 0.3333},
+                },
+            },
+            'as_of': self.today.isoformat(),
+        })
+
+    def test_reads_only_the_counters(self):
+        """The endpoint never touches the contact or task tables."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/stats/')
+        self.assertEqual(len(queries), 2)
+        self.assertFalse([q['sql'] for q in queries if '"api_task"' in q['sql'] or '"api_contact"' in q['sql']])
+
+    def test_counters_follow_every_write_path(self):
+        """Saves, deletes, queryset and bulk writes, cascades, the bulk API and imports all keep the counters exact."""
+        task = Task.objects.get(title="Due today")
+        task.is_done = True
+        task.save()
+        task.priority = "low"
+        task.save(update_fields=['priority'])
+        Task.objects.get(title="Due next week").delete()
+        self.assertCountersExact()
+
+        Task.objects.filter(priority="high").update(due_date=self.today + timedelta(days=1))
+        Task.objects.filter(is_done=False).update(priority=Value("medium"))
+        tasks = Task.objects.bulk_create([
+            Task(contact=self.inactive, title=f"Bulk {n}", priority="low", due_date=str(self.today)) for n in range(3)
+        ])
+        for obj in tasks:
+            obj.is_done = True
+        Task.objects.bulk_update(tasks, ['is_done'])
+        Task.objects.filter(title="Bulk 0").delete()
+        self.assertCountersExact()
+
+        self.inactive.status = "active"
+        self.inactive.save()
+        Contact.objects.filter(pk=self.active.pk).update(status="inactive")
+        Contact.objects.bulk_create([Contact(full_name=f"Bulk Contact {n}") for n in range(2)])
+        self.active.delete()
+        Contact.objects.filter(full_name__startswith="Bulk Contact").delete()
+        self.assertCountersExact()
+
+        response = self.client.post('/api/tasks/bulk/', [
+            {"contact": self.inactive.pk, "title": "Bulk API task", "priority": "high"},
+        ], format='json')
+        self.assertEqual(response.data['created'], 1)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'tasks.ndjson'
+            path.write_text(json.dumps({"contact": self.inactive.pk, "title": "Imported", "is_done": True}) + "\n")
+            call_command('import_crm', str(path), model='tasks', stdout=StringIO())
+        self.assertCountersExact()
+
+    def test_recompute_corrects_drift(self):
+        """recompute_stats fixes counters changed behind the models' back and drops zero rows."""
+        StatCounter.objects.filter(metric='tasks', bucket='high').update(value=99)
+        StatCounter.objects.filter(metric='contacts', bucket='inactive').delete()
+        Task.objects.filter(title="Overdue task").delete()
+        out = StringIO()
+        call_command('recompute_stats', stdout=out)
+        self.assertIn('2 counters corrected', out.getvalue())
+        self.assertCountersExact()
+        self.assertFalse(StatCounter.objects.filter(value=0).exists())
+
+    def test_shards_add_up_and_fold(self):
+        """Counters split over shards are summed for the endpoint; recompute_stats folds them into one row each."""
+        with mock.patch('api.models.stat_shard', return_value=(stat_shard() + 1) % STAT_SHARDS):
+            Contact.objects.create(full_name="Sharded Contact")
+        self.assertEqual(StatCounter.objects.filter(metric='contacts', bucket='active').count(), 2)
+        self.assertEqual(self.client.get('/api/stats/').json()['contacts']['by_status']['active'], 2)
+        out = StringIO()
+        call_command('recompute_stats', stdout=out)
+        self.assertIn('0 counters corrected', out.getvalue())
+        rows = StatCounter.objects.filter(metric='contacts', bucket='active')
+        self.assertEqual(list(rows.values_list('value', flat=True)), [2])
+        self.assertCountersExact()
+
+    def test_response_is_cached_briefly(self):
+        """Within CACHE_TIMEOUT the cached numbers are served; the cache is keyed by day."""
+        with override_settings(CRM_STATS={'CACHE_TIMEOUT': 60}):
+            first = self.client.get('/api/stats/')
+            Task.objects.create(contact=self.active, title="Fresh task")
+            second = self.client.get('/api/stats/')
+        self.assertEqual((first['X-Cache'], second['X-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(second['Cache-Control'], 'private, max-age=60')
+        self.assertEqual(second.json()['tasks']['total'], 6)
+        self.assertEqual(self.client.get('/api/stats/').json()['tasks']['total'], 7)
+
+    def test_bench_stats_command(self):
+        """bench_stats reports counter, endpoint and scan timings and that the counters are in sync."""
+        out = StringIO()
+        call_command('bench_stats', '--repeat', '1', '--json', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertTrue(report['in_sync'])
+        self.assertEqual(report['tasks'], 6)
+
+
+# ---------------------------------------------------------------------------
+# Task archival
+# ---------------------------------------------------------------------------
+
+@skipUnless(connection.vendor == 'postgresql', 'needs concurrent writers (PostgreSQL)')
+class StatCounterConcurrencyTest(TransactionTestCase):
+    """Writers in different threads add to different StatCounter shards."""
+
+    def test_open_writer_does_not_block_others(self):
+        """A transaction holding its counter update open does not stall another thread counting the same status."""
+        counted, release = threading.Event(), threading.Event()
+        elapsed = []
+
+        def hold():
+            try:
+                with transaction.atomic():
+                    Contact.objects.create(full_name="Held Contact")
+                    counted.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        def write():
+            try:
+                start = time.perf_counter()
+                Contact.objects.create(full_name="Free Contact")
+                elapsed.append(time.perf_counter() - start)
+            finally:
+                connection.close()
+
+        holder, writer = threading.Thread(target=hold), threading.Thread(target=write)
+        holder.start()
+        try:
+            self.assertTrue(counted.wait(5))
+            writer.start()
+            writer.join(5)
+            self.assertEqual(len(elapsed), 1)
+            self.assertLess(elapsed[0], 2)
+        finally:
+            release.set()
+            holder.join()
+            writer.join()
+        self.assertEqual(stored_counters()['contacts', 'active'], 2)
+        self.assertEqual(StatCounter.objects.filter(metric='contacts', bucket='active').count(), 2)
+
+
+class ArchiveTest(TestCase):
+    """Old done tasks move to ArchivedTask; `?include_archived=true` reads both tables."""
+
+    def setUp(self):
+        """Two old done tasks, one old open task and one recent done task."""
+        caches['default'].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username='testuser'))
+        self.contact = Contact.objects.create(full_name="Archive Contact")
+        self.other = Contact.objects.create(full_name="Other Contact")
+        self.old_done = [
+            Task.objects.create(contact=self.contact, title=f"Old done {n}", priority="high", is_done=True)
+            for n in range(2)
+        ]
+        self.old_open = Task.objects.create(contact=self.contact, title="Old open")
+        self.recent_done = Task.objects.create(contact=self.other, title="Recent done", is_done=True)
+        self.cutoff = timezone.now() - timedelta(days=90)
+        Task.objects.exclude(pk=self.recent_done.pk).update(created_at=self.cutoff - timedelta(days=1))
+
+    def assertCountersExact(self):
+        """The stored counters equal a full recount (zero rows ignored)."""
+        stored = {key: value for key, value in stored_counters().items() if value}
+        self.assertEqual(stored, {key: value for key, value in computed_counters().items() if value})
+
+    def test_moves_only_old_done_tasks(self):
+        """Batches move done tasks older than the cutoff with their ids; counters and open counts stay put."""
+        stats = self.client.get('/api/stats/').json()
+        self.assertEqual(archive_done_tasks(self.cutoff, batch_size=1), 2)
+        self.assertEqual(
+            sorted(ArchivedTask.objects.values_list('pk', flat=True)), sorted(task.pk for task in self.old_done))
+        self.assertEqual(set(Task.objects.values_list('pk', flat=True)), {self.old_open.pk, self.recent_done.pk})
+        archived = ArchivedTask.objects.get(pk=self.old_done[0].pk)
+        self.assertEqual((archived.title, archived.priority, archived.contact_id), ("Old done 0", "high", self.contact.pk))
+        self.contact.refresh_from_db()
+        self.assertEqual(self.contact.open_tasks_count, 1)
+        self.assertCountersExact()
+        with override_settings(CRM_STATS={'CACHE_TIMEOUT': 0}):
+            self.assertEqual(self.client.get('/api/stats/').json(), stats)
+        self.assertEqual(archive_done_tasks(self.cutoff), 0)
+
+    def test_max_batches(self):
+        """`max_batches` bounds one run; the next run picks up where it stopped."""
+        self.assertEqual(archive_done_tasks(self.cutoff, batch_size=1, max_batches=1), 1)
+        self.assertEqual(archive_done_tasks(self.cutoff, batch_size=1), 1)
+
+    def test_include_archived_reads(self):
+        """Lists, filters, cursor pages, detail and export cover archived tasks only when asked to."""
+        archive_done_tasks(self.cutoff)
+        archived_pk = self.old_done[0].pk
+        self.assertEqual(self.client.get('/api/tasks/').json()['count'], 2)
+        response = self.client.get('/api/tasks/', {'include_archived': 'true'})
+        self.assertEqual(response.json()['count'], 4)
+        self.assertEqual(
+            self.client.get('/api/tasks/', {'include_archived': '1', 'is_done': 'true', 'contact_id': self.contact.pk})
+            .json()['count'], 2)
+        page = self.client.get('/api/tasks/', {'include_archived': 'true', 'cursor': '', 'page_size': 3}).json()
+        rest = self.client.get(page['next']).json()
+        self.assertEqual(len({row['id'] for row in page['results'] + rest['results']}), 4)
+
+        self.assertEqual(self.client.get(f'/api/tasks/{archived_pk}/').status_code, status.HTTP_404_NOT_FOUND)
+        detail = self.client.get(f'/api/tasks/{archived_pk}/', {'include_archived': 'true'})
+        self.assertEqual(detail.status_code, status.HTTP_200_OK)
+        self.assertEqual(detail.json()['title'], "Old done 0")
+        with override_settings(CRM_FAST_READS=False):
+            self.assertEqual(
+                self.client.get(f'/api/tasks/{archived_pk}/', {'include_archived': 'true'}).json(), detail.json())
+        export = self.client.get('/api/tasks/export/', {'include_archived': 'true', 'export_format': 'csv'})
+        self.assertEqual(len(b''.join(export.streaming_content).decode().splitlines()), 5)
+
+        response = self.client.get('/api/tasks/', {'include_archived': 'maybe'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('include_archived', response.json())
+
+    def test_writes_ignore_include_archived(self):
+        """Archived tasks are read-only: writes with the flag still only see live tasks."""
+        archive_done_tasks(self.cutoff)
+        response = self.client.patch(
+            f'/api/tasks/{self.old_done[0].pk}/?include_archived=true', {'title': "Changed"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_contact_delete_removes_archived_tasks(self):
+        """Deleting a contact cascades to its archived tasks and takes them out of the counters."""
+        archive_done_tasks(self.cutoff)
+        self.contact.delete()
+        self.assertFalse(ArchivedTask.objects.exists())
+        self.assertCountersExact()
+
+    def test_commands(self):
+        """archive_tasks supports --dry-run; bench_archive times the lists before and after archiving."""
+        out = StringIO()
+        call_command('archive_tasks', '--dry-run', stdout=out)
+        self.assertIn('2 done tasks', out.getvalue())
+        self.assertFalse(ArchivedTask.objects.exists())
+        call_command('archive_tasks', '--sleep', '0', stdout=out)
+        self.assertIn('Archived 2 done tasks', out.getvalue())
+
+        out = StringIO()
+        call_command('bench_archive', '--days', '0', '--repeat', '1', '--json', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['archived'], 1)
+        self.assertEqual((report['after']['live_tasks'], report['after']['archived_tasks']), (1, 3))
+        self.assertIn('tasks:open', report['after']['include_archived_p50_ms'])
+
+
+# ---------------------------------------------------------------------------
+# Cached JWT authentication
+# ---------------------------------------------------------------------------
+
+@override_settings(CRM_RESPONSE_CACHE={'ENABLED': False})
+@override_settings(CRM_AUTH_CACHE={'TIMEOUT': 60})
+class CachedAuthenticationTest(TestCase):
+    """Repeated tokens skip the user lookup until the user changes or the entry expires."""
+
+    def setUp(self):
+        """A user, a JWT for them and an empty token cache."""
+        tokens.clear()
+        caches['default'].clear()
+        self.user = User.objects.create_user(username='authuser', password='testpass123')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def user_queries(self):
+        """Request the contact list and return the status and the queries that hit auth_user."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/contacts/')
+        return response.status_code, [q['sql'] for q in queries if 'auth_user' in q['sql']]
+
+    def test_repeated_token_makes_no_auth_queries(self):
+        """The first request loads the user, later ones are served from the cache."""
+        self.assertEqual(len(self.user_queries()[1]), 1)
+        self.assertEqual(self.user_queries(), (status.HTTP_200_OK, []))
+        self.assertEqual(len(tokens), 1)
+
+    def test_deactivation_revokes_cached_token(self):
+        """Deactivating the user rejects the cached token on the next request."""
+        self.user_queries()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/contacts/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_keeps_tokens_by_default(self):
+        """Without CHECK_REVOKE_TOKEN a password change leaves the tokens issued before it valid, as simplejwt does."""
+        self.user_queries()
+        self.user.set_password('changed-pass-456')
+        self.user.save()
+        self.assertEqual(self.user_queries(), (status.HTTP_200_OK, [mock.ANY]))
+
+    @mock.patch.object(jwt_settings, 'CHECK_REVOKE_TOKEN', True)  # simplejwt's modules keep this settings object
+    def test_password_change_revokes_cached_token(self):
+        """With CHECK_REVOKE_TOKEN, tokens issued before a password change stop working at once."""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        self.user_queries()
+        self.user.set_password('changed-pass-456')
+        self.user.save()
+        self.assertEqual(self.client.get('/api/contacts/').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        self.assertEqual(self.client.get('/api/contacts/').status_code, status.HTTP_200_OK)
+
+    def test_change_in_another_process(self):
+        """A version bumped in the shared cache (by another worker) makes the entry reload the user."""
+        self.user_queries()
+        caches['default'].set(user_version_key(self.user.pk), 1)
+        self.assertEqual(len(self.user_queries()[1]), 1)
+        self.assertEqual(self.user_queries()[1], [])
+
+    def test_expiry_and_size_bound(self):
+        """Entries expire after TIMEOUT and the cache keeps at most MAX_ENTRIES tokens."""
+        self.user_queries()
+        next(iter(tokens.entries.values())).expires = 0
+        self.assertEqual(len(self.user_queries()[1]), 1)
+        with override_settings(CRM_AUTH_CACHE={'MAX_ENTRIES': 2}):
+            for _ in range(3):
+                self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+                self.client.get('/api/contacts/')
+        self.assertEqual(len(tokens), 2)
+
+    @override_settings(CRM_AUTH_CACHE={'TIMEOUT': 0})
+    def test_timeout_zero_disables_the_cache(self):
+        """With TIMEOUT 0 every request looks the user up, as plain JWTAuthentication does."""
+        self.user_queries()
+        self.assertEqual(len(self.user_queries()[1]), 1)
+        self.assertEqual(len(tokens), 0)
+
+    def test_check_requires_a_shared_cache(self):
+        """`manage.py check` fails when the token cache is on and its versions live in a per-process cache."""
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache:6379/1'}}
+        with override_settings(CACHES=locmem):
+            self.assertEqual([error.id for error in auth_cache_check(None)], ['api.E002'])
+            with override_settings(CRM_AUTH_CACHE={'TIMEOUT': 0}):
+                self.assertEqual(auth_cache_check(None), [])
+        with override_settings(CACHES=redis):
+            self.assertEqual(auth_cache_check(None), [])
+
+    def test_bench_auth_command(self):
+        """bench_auth reports one auth query per request without the cache and none with it."""
+        out = StringIO()
+        call_command('bench_auth', '--repeat', '2', '--json', stdout=out)
+        results = {row['auth']: row for row in json.loads(out.getvalue())['results']}
+        self.assertEqual(results['uncached']['auth_queries_per_request'], 1)
+        self.assertEqual(results['cached']['auth_queries_per_request'], 0)
+
+
+# ---------------------------------------------------------------------------
+# Change feed
+# ---------------------------------------------------------------------------
+
+class ChangeFeedTest(TestCase):
+    """/api/changes/ lists every contact and task write after a cursor, compactly and in order."""
+
+    def setUp(self):
+        """A contact with one task, and the cursor after them."""
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username='testuser'))
+        self.contact = Contact.objects.create(full_name="Feed Contact")
+        self.task = Task.objects.create(contact=self.contact, title="Feed task")
+        self.cursor = self.client.get('/api/changes/', {'since': 'latest'}).json()['next']
+
+    def feed(self, since=None, **params):
+        """Return the feed page after `since` (default: the setUp cursor)."""
+        response = self.client.get('/api/changes/', {'since': self.cursor if since is None else since, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def ops(self, since=None):
+        """`(type, op, id)` for each change after `since`."""
+        return [(c['type'], c['op'], c['id']) for c in self.feed(since)['changes']]
+
+    def test_changes_after_cursor(self):
+        """Each object appears once with its latest state; created-then-deleted objects are left out."""
+        self.client.patch(f'/api/contacts/{self.contact.id}/', {'full_name': "Renamed Contact"}, format='json')
+        created = self.client.post('/api/tasks/', {'contact': self.contact.id, 'title': "New task"}, format='json')
+        self.client.patch(f'/api/tasks/{created.json()["id"]}/', {'priority': 'high'}, format='json')
+        temporary = Task.objects.create(contact=self.contact, title="Temporary task")
+        temporary.delete()
+        task_id = self.task.id
+        self.task.delete()
+
+        page = self.feed()
+        self.assertEqual([(c['type'], c['op'], c['id']) for c in page['changes']], [
+            ('contact', 'updated', self.contact.id),
+            ('task', 'created', created.json()['id']),
+            ('task', 'deleted', task_id),
+        ])
+        self.assertEqual(page['changes'][0]['data']['full_name'], "Renamed Contact")
+        self.assertEqual(page['changes'][1]['data'], self.client.get(f'/api/tasks/{created.json()["id"]}/').json())
+        self.assertNotIn('data', page['changes'][2])
+        self.assertFalse(page['has_more'])
+        self.assertEqual(self.feed(page['next'])['changes'], [])
+
+    def test_task_writes_do_not_log_their_contact(self):
+        """A task create bumps open_tasks_count with one UPDATE and logs only the task."""
+        with CaptureQueriesContext(connection) as queries:
+            created = self.client.post('/api/tasks/', {'contact': self.contact.id, 'title': "Counted task"}, format='json')
+        self.assertEqual([statement.split(' (')[0] for statement in statements(queries)[1:]], [
+            'INSERT INTO "api_task"', 'UPDATE "api_contact" SET "open_tasks_count" =', 'INSERT INTO "api_statcounter"',
+            'INSERT INTO "api_pendingchange"',
+        ])
+        self.client.patch(f'/api/tasks/{created.json()["id"]}/', {'is_done': True}, format='json')
+        task_id = self.task.pk
+        self.task.delete()
+        self.assertEqual(self.ops(), [('task', 'created', created.json()['id']), ('task', 'deleted', task_id)])
+        self.contact.refresh_from_db()
+        self.assertEqual(self.contact.open_tasks_count, 0)
+
+    def test_changes_are_published_by_readers(self):
+        """A write only stages its changes and announces the commit; the next read of the log publishes them."""
+        last = self.cursor
+        with mock.patch('api.events.forward_changes') as announced, CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                contact = Contact.objects.create(full_name="Staged Contact")
+        self.assertEqual(announced.call_count, 1)
+        self.assertNotIn('api_changesequence', ' '.join(statements(queries)))
+        self.assertEqual(PendingChange.objects.count(), 1)
+        self.assertFalse(Change.objects.filter(seq__gt=last).exists())
+        self.assertEqual(sequence_state()[0], last + 1)
+        self.assertFalse(PendingChange.objects.exists())
+        self.assertEqual(list(Change.objects.filter(seq__gt=last).values_list('seq', 'model', 'object_id', 'action')), [
+            (last + 1, 'contact', contact.pk, ChangeAction.CREATED),
+        ])
+        self.assertEqual(publish_changes(), [])
+
+    def test_every_write_path_is_logged(self):
+        """Queryset, bulk and cascade writes, the bulk API and archiving are all in the feed."""
+        Contact.objects.filter(pk=self.contact.pk).update(status='inactive')
+        tasks = Task.objects.bulk_create([Task(contact=self.contact, title=f"Bulk {n}") for n in range(2)])
+        tasks[0].is_done = True
+        Task.objects.bulk_update(tasks, ['is_done'])
+        Task.objects.filter(pk=tasks[1].pk).delete()
+        response = self.client.post('/api/contacts/bulk/', [{"full_name": "Bulk API Contact"}], format='json')
+        bulk_contact = response.data['ids'][0]
+        self.assertEqual(set(self.ops()), {
+            ('contact', 'updated', self.contact.pk),
+            ('task', 'created', tasks[0].pk),
+            ('contact', 'created', bulk_contact),
+        })
+
+        cursor = self.feed()['next']
+        Task.objects.filter(pk=tasks[0].pk).update(created_at=timezone.now() - timedelta(days=400))
+        archive_done_tasks(timezone.now() - timedelta(days=90))
+        other = Contact.objects.create(full_name="Other Contact")
+        other_task = Task.objects.create(contact=other, title="Other task")
+        other_cursor = self.feed(cursor)['next']
+        Contact.objects.filter(pk=other.pk).delete()
+        self.assertEqual(self.ops(cursor)[0], ('task', 'deleted', tasks[0].pk))
+        self.assertEqual(self.ops(other_cursor), [('task', 'deleted', other_task.pk), ('contact', 'deleted', other.pk)])
+
+    def test_pages_follow_the_cursor(self):
+        """`limit` pages through the log; following `next` sees every change once."""
+        contacts = [Contact.objects.create(full_name=f"Paged Contact {n}") for n in range(5)]
+        seen, cursor = [], self.cursor
+        while True:
+            page = self.feed(cursor, limit=2)
+            seen += [c['id'] for c in page['changes']]
+            cursor = page['next']
+            if not page['has_more']:
+                break
+        self.assertEqual(seen, [contact.pk for contact in contacts])
+
+    def test_since_zero_is_the_current_state(self):
+        """From zero, after compaction, the feed is one entry per live object."""
+        self.client.patch(f'/api/contacts/{self.contact.id}/', {'full_name': "Renamed Contact"}, format='json')
+        Contact.objects.create(full_name="Gone Contact").delete()
+        compact_changes(retention_days=0)
+        self.assertEqual(sorted(self.ops(0)), [
+            ('contact', 'updated', self.contact.pk), ('task', 'created', self.task.pk),
+        ])
+
+    def test_compaction_expires_old_cursors(self):
+        """Once deletions after a cursor are dropped, that cursor gets 410 and `since=0` still works."""
+        gone = Contact.objects.create(full_name="Gone Contact")
+        gone_id = gone.pk
+        gone.delete()
+        out = StringIO()
+        call_command('compact_changes', '--days', '1', stdout=out)
+        self.assertIn('1 superseded entries and 0 expired deletions', out.getvalue())
+        self.assertEqual(self.ops(), [('contact', 'deleted', gone_id)])
+
+        Change.objects.filter(object_id=gone_id).update(changed_at=timezone.now() - timedelta(days=2))
+        call_command('compact_changes', '--days', '1', stdout=out)
+        response = self.client.get('/api/changes/', {'since': self.cursor})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+        self.assertEqual(response.json()['next'], 0)
+        self.assertEqual(len(self.ops(0)), 2)
+        self.assertEqual(self.ops(self.feed('latest')['next']), [])
+
+    def test_invalid_parameters(self):
+        """A malformed cursor or limit is a 400."""
+        for params in ({'since': 'abc'}, {'since': '-1'}, {'limit': 'x'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/changes/', params).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs concurrent writers (PostgreSQL)')
+class ChangeFeedConcurrencyTest(TransactionTestCase):
+    """A reader following the cursor while several writers commit out of order loses no change."""
+
+    def test_open_writer_does_not_block_others(self):
+        """A write transaction left open holds no change log lock: another writer commits and is published."""
+        logged, release = threading.Event(), threading.Event()
+
+        def hold():
+            try:
+                with transaction.atomic():
+                    Contact.objects.create(full_name="Held Contact")
+                    logged.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        try:
+            self.assertTrue(logged.wait(5))
+            start = time.perf_counter()
+            contact = Contact.objects.create(full_name="Free Contact")
+            self.assertLess(time.perf_counter() - start, 2)
+            self.assertEqual(Change.objects.latest('seq').object_id, contact.pk)
+        finally:
+            release.set()
+            holder.join()
+        self.assertEqual(sequence_state()[0], Change.objects.count())
+
+    def test_no_change_is_lost(self):
+        """Writers hold their transactions open for a random time; the reader still sees every contact."""
+        user = User.objects.create_user(username='feed-reader')
+        writers, per_writer = 4, 15
+        created, done = [], threading.Event()
+        lock = threading.Lock()
+
+        def write(n):
+            rng = random.Random(n)
+            try:
+                for i in range(per_writer):
+                    with transaction.atomic():
+                        contact = Contact.objects.create(full_name=f"Concurrent {n}-{i}")
+                        time.sleep(rng.random() / 100)
+                    with lock:
+                        created.append(contact.pk)
+            finally:
+                connection.close()
+
+        seen, seqs = [], []
+
+        def read():
+            client = APIClient()
+            client.force_authenticate(user=user)
+            cursor = 0
+            try:
+                while True:
+                    finished = done.is_set()
+                    page = client.get('/api/changes/', {'since': cursor, 'limit': 7}).json()
+                    seen.extend(c['id'] for c in page['changes'] if c['type'] == 'contact')
+                    seqs.extend(c['seq'] for c in page['changes'])
+                    cursor = page['next']
+                    if finished and not page['has_more']:
+                        return
+            finally:
+                connection.close()
+
+        reader = threading.Thread(target=read)
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(writers)]
+        reader.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        done.set()
+        reader.join()
+        self.assertEqual(len(created), writers * per_writer)
+        self.assertCountEqual(seen, created)
+        self.assertEqual(seqs, sorted(set(seqs)))
+
+
+class ChangeLogBenchmarkCommandTest(TransactionTestCase):
+    """bench_change_log writes from its own threads, so the data must be committed."""
+
+    def test_reports_published_changes(self):
+        """Every write is published under gap-free seqs and the writer contacts are removed afterwards."""
+        out = StringIO()
+        call_command('bench_change_log', '--writers', '1', '--writes', '5', '--hold-ms', '0', '--json', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual([row['writes'] for row in report['results']], [5])
+        self.assertEqual((report['written'], report['published'], report['pending']), (5, 5, 0))
+        self.assertTrue(report['gap_free'])
+        self.assertFalse(Contact.objects.exists())
+
+
+# ---------------------------------------------------------------------------
+# Event stream
+# ---------------------------------------------------------------------------
+
+@override_settings(
+    ROOT_URLCONF='config.asgi_urls',
+    CRM_EVENTS={'BACKEND': 'api.events.LocalBackend', 'POLL_INTERVAL': 0.01, 'QUEUE_SIZE': 100},
+)
+class EventStreamTest(TestCase):
+    """The /api/events/ stream and the hub that feeds it."""
+
+    def setUp(self):
+        """A user, a contact with a task, and the cursor after them."""
+        self.user = User.objects.create_user(username='testuser')
+        self.token = str(AccessToken.for_user(self.user))
+        self.headers = {'Authorization': f'Bearer {self.token}'}
+        self.contact = Contact.objects.create(full_name="Event Contact")
+        self.other = Contact.objects.create(full_name="Other Contact")
+        self.task = Task.objects.create(contact=self.contact, title="Event task")
+        self.cursor = sequence_state()[0]
+
+    def tearDown(self):
+        """Reset the process-wide hub."""
+        hub.stop()
+
+    def committed(self, write):
+        """Run `write` and its on-commit callbacks, as a request would."""
+        with self.captureOnCommitCallbacks(execute=True):
+            return write()
+
+    async def write(self, write):
+        """`committed` from a test coroutine."""
+        return await sync_to_async(self.committed)(write)
+
+    async def receive(self, source, count):
+        """Parse the next `count` change frames from a subscriber queue or a stream iterator."""
+        entries = []
+        while len(entries) < count:
+            if isinstance(source, Subscriber):
+                await asyncio.wait_for(source.ready.wait(), 5)
+                items = source.take()
+                self.assertNotIn(CLOSED, items)
+                frame = b''.join(frame for seq, frame in items)
+            else:
+                frame = await asyncio.wait_for(anext(source), 5)
+            for block in frame.decode().split('\n\n'):
+                fields = dict(line.split(': ', 1) for line in block.splitlines() if ': ' in line)
+                if 'data' in fields and 'id' in fields:
+                    entries.append(json.loads(fields['data']))
+        return entries
+
+    async def test_hub_fans_out_committed_changes(self):
+        """Every stream gets each change once; contact streams only their contact and its tasks."""
+        everything = await hub.subscribe()
+        mine = await hub.subscribe(self.contact.pk)
+        await self.write(lambda: Contact.objects.filter(pk=self.contact.pk).update(full_name="Renamed"))
+        await self.write(lambda: Contact.objects.filter(pk=self.other.pk).update(full_name="Other Renamed"))
+        created = await self.write(lambda: Task.objects.create(contact=self.contact, title="Live task"))
+
+        received = await self.receive(everything, 3)
+        self.assertEqual([(e['type'], e['op'], e['id']) for e in received], [
+            ('contact', 'updated', self.contact.pk),
+            ('contact', 'updated', self.other.pk),
+            ('task', 'created', created.pk),
+        ])
+        self.assertEqual(received[2]['data']['title'], "Live task")
+        mine_received = await self.receive(mine, 2)
+        self.assertEqual([e['id'] for e in mine_received], [self.contact.pk, created.pk])
+        self.assertEqual(mine.take(), [])
+
+    async def test_slow_stream_is_closed(self):
+        """A stream whose queue fills up is closed instead of blocking the others."""
+        with override_settings(CRM_EVENTS={'BACKEND': 'api.events.LocalBackend', 'QUEUE_SIZE': 2}):
+            slow = await hub.subscribe()
+            await self.write(lambda: Contact.objects.bulk_create([Contact(full_name=f"Burst {n}") for n in range(3)]))
+            await asyncio.wait_for(slow.ready.wait(), 5)
+            self.assertEqual(slow.take(), [CLOSED])
+            self.assertTrue(slow.closed)
+
+    async def test_stream_replays_then_follows(self):
+        """A stream replays the log after `Last-Event-ID`, then delivers live changes."""
+        await self.write(lambda: Contact.objects.filter(pk=self.other.pk).update(full_name="Missed"))
+        response = await self.async_client.get(
+            f'/api/events/?contact={self.other.pk}', headers={**self.headers, 'Last-Event-ID': str(self.cursor)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        try:
+            self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+            replayed = await self.receive(stream, 1)
+            self.assertEqual((replayed[0]['id'], replayed[0]['data']['full_name']), (self.other.pk, "Missed"))
+            await self.write(lambda: Contact.objects.filter(pk=self.contact.pk).update(full_name="Not mine"))
+            await self.write(lambda: Contact.objects.filter(pk=self.other.pk).update(full_name="Live"))
+            live = await self.receive(stream, 1)
+            self.assertEqual(live[0]['data']['full_name'], "Live")
+            self.assertGreater(live[0]['seq'], replayed[0]['seq'])
+        finally:
+            await stream.aclose()
+
+    async def test_compacted_cursor_gets_reset(self):
+        """A cursor older than dropped deletions gets a `reset` event."""
+        await self.write(lambda: Contact.objects.create(full_name="Gone").delete())
+        await sync_to_async(compact_changes)(retention_days=-1)
+        stream = aiter(EventStreamView.stream(None, self.cursor))
+        try:
+            await anext(stream)
+            self.assertEqual(await anext(stream), b'event: reset\ndata: {}\n\n')
+        finally:
+            await stream.aclose()
+
+    async def test_idle_streams_get_heartbeats(self):
+        """The hub pings every stream on its HEARTBEAT so idle connections stay open."""
+        with override_settings(CRM_EVENTS={'BACKEND': 'api.events.LocalBackend', 'HEARTBEAT': 0.01}):
+            stream = aiter(EventStreamView.stream(None, None))
+            try:
+                await anext(stream)
+                self.assertEqual(await asyncio.wait_for(anext(stream), 5), b': ping\n\n')
+            finally:
+                await stream.aclose()
+
+    async def test_disconnect_unsubscribes(self):
+        """Cancelling a stream (client gone) removes it from the hub, which stops when idle."""
+        stream = aiter(EventStreamView.stream(None, None))
+        await anext(stream)
+        self.assertEqual(len(hub.subscribers), 1)
+        waiting = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(hub.subscribers, set())
+        self.assertIsNone(hub.backend)
+
+    async def test_request_errors(self):
+        """Authentication (header or `?access_token=`), parameters and the client limit are checked first."""
+        self.assertEqual((await self.async_client.get('/api/events/')).status_code, status.HTTP_401_UNAUTHORIZED)
+        for query, expected in (
+            ('contact=abc', status.HTTP_400_BAD_REQUEST),
+            ('since=-2', status.HTTP_400_BAD_REQUEST),
+            ('contact=999999', status.HTTP_404_NOT_FOUND),
+        ):
+            with self.subTest(query=query):
+                response = await self.async_client.get(f'/api/events/?{query}', headers=self.headers)
+                self.assertEqual(response.status_code, expected)
+        with override_settings(CRM_EVENTS={'MAX_CLIENTS': 0}):
+            response = await self.async_client.get(
+                f'/api/events/?access_token={self.token}', headers={'Accept': 'text/event-stream'})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '5')
+        self.assertEqual(resolve('/api/events/', urlconf='config.asgi_urls').url_name, 'events')
+
+    @override_settings(CRM_EVENTS={'BACKEND': 'api.events.ChangeLogBackend', 'POLL_INTERVAL': 0.01})
+    async def test_change_log_backend(self):
+        """The multi-worker backend picks changes up from the log, whichever process wrote them."""
+        subscriber = await hub.subscribe()
+        self.assertIsInstance(hub.backend, ChangeLogBackend)
+        # No on-commit callbacks: the change only reaches the hub through api_change.
+        await sync_to_async(Contact.objects.filter(pk=self.other.pk).update)(full_name="Polled")
+        received = await self.receive(subscriber, 1)
+        self.assertEqual(received[0]['data']['full_name'], "Polled")
+
+
+# ---------------------------------------------------------------------------
+# Background jobs
+# ---------------------------------------------------------------------------
+
+class JobQueueTest(TestCase):
+    """Test suite for enqueueing jobs from the API and running them."""
+
+    def setUp(self):
+        """Authenticate, create a contact and send export files to a temporary directory."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.contact = Contact.objects.create(full_name="Export Owner", status="active")
+        Contact.objects.create(full_name="Inactive Owner", status="inactive")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        jobs_settings = override_settings(CRM_JOBS={'EXPORT_DIR': self.tmp.name, 'RETRY_DELAY': 10})
+        jobs_settings.enable()
+        self.addCleanup(jobs_settings.disable)
+
+    def work(self, worker='test-worker'):
+        """Claim the due jobs and run them in this thread, as a worker would."""
+        jobs = claim(worker, 10, 60)
+        for job in jobs:
+            run_job(job, worker)
+        return jobs
+
+    def enqueued(self, response):
+        """Check a 202 response and return its job."""
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response['Location'], response.data['status_url'])
+        self.assertEqual(response.data['status'], JobStatus.QUEUED)
+        self.assertTrue(response.data['status_url'].endswith(f"/api/jobs/{response.data['job']}/"))
+        return Job.objects.get(pk=response.data['job'])
+
+    def test_background_bulk(self):
+        """`?background=true` defers the bulk write to a job whose result is the usual bulk response."""
+        response = self.client.post(
+            '/api/contacts/bulk/?background=true',
+            [{'full_name': "Queued One"}, {'full_name': "Queued Two"}, {'full_name': ''}], format='json',
+        )
+        job = self.enqueued(response)
+        self.assertEqual((job.kind, job.created_by), ('bulk', self.user))
+        self.assertFalse(Contact.objects.filter(full_name__startswith="Queued").exists())
+
+        self.assertEqual(len(self.work()), 1)
+        status_response = self.client.get(response['Location'])
+        self.assertEqual(status_response.data['status'], JobStatus.SUCCEEDED)
+        self.assertEqual(status_response.data['result']['created'], 2)
+        self.assertEqual(status_response.data['result']['errors'][0]['index'], 2)
+        self.assertEqual(Contact.objects.filter(full_name__startswith="Queued").count(), 2)
+
+        response = self.client.delete(
+            '/api/contacts/bulk/?background=yes', {'ids': status_response.data['result']['ids']}, format='json')
+        self.enqueued(response)
+        self.work()
+        self.assertFalse(Contact.objects.filter(full_name__startswith="Queued").exists())
+
+    def test_background_export(self):
+        """A background export honours the filters and is downloaded from the job once written."""
+        response = self.client.get('/api/contacts/export/?status=active&background=true&export_format=ndjson')
+        job = self.enqueued(response)
+        self.assertEqual(self.client.get(f'/api/jobs/{job.pk}/download/').status_code, status.HTTP_404_NOT_FOUND)
+
+        self.work()
+        job.refresh_from_db()
+        self.assertEqual(job.result['rows'], 1)
+        download = self.client.get(f'/api/jobs/{job.pk}/download/')
+        self.assertEqual(download.status_code, status.HTTP_200_OK)
+        rows = [json.loads(line) for line in b''.join(download.streaming_content).decode().splitlines()]
+        self.assertEqual([row['full_name'] for row in rows], ["Export Owner"])
+
+        for query in ('status=bogus&background=true', 'background=maybe'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/contacts/export/?{query}')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_failures_are_retried_with_backoff(self):
+        """A failing job is queued again RETRY_DELAY * 2**n later, then fails after max_attempts."""
+        calls = []
+
+        def flaky(job):
+            calls.append(job.attempts)
+            raise RuntimeError("upstream unavailable")
+
+        with mock.patch.dict(HANDLERS, {'flaky': flaky}), self.assertLogs('api.jobs', 'ERROR'):
+            job = enqueue('flaky', {}, max_attempts=2)
+            self.work()
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts, job.locked_by), (JobStatus.QUEUED, 1, ''))
+            self.assertIn("upstream unavailable", job.error)
+            self.assertAlmostEqual((job.run_after - timezone.now()).total_seconds(), 10, delta=2)
+            self.assertEqual(self.work(), [])  # not due yet
+
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            self.work()
+            job.refresh_from_db()
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual((job.status, job.attempts), (JobStatus.FAILED, 2))
+        self.assertIsNotNone(job.finished_at)
+
+        unknown = Job.objects.create(kind='missing')
+        self.work()
+        unknown.refresh_from_db()
+        self.assertEqual((unknown.status, unknown.attempts), (JobStatus.FAILED, 1))
+
+    def test_expired_leases(self):
+        """Jobs of a worker that stopped renewing are queued again, or failed once out of attempts."""
+        retry = enqueue('seed', {})
+        exhausted = enqueue('seed', {}, max_attempts=1)
+        claim('dead-worker', 10, 60, exclusive=True)
+        Job.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(requeue_expired(), 2)
+        retry.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual((retry.status, retry.locked_by), (JobStatus.QUEUED, ''))
+        self.assertEqual(exhausted.status, JobStatus.FAILED)
+
+        # The dead worker finishing late must not overwrite the new owner's claim.
+        [job] = claim('new-worker', 10, 60, exclusive=True)
+        run_job(job, 'dead-worker')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), (JobStatus.RUNNING, 'new-worker'))
+
+    def test_jobs_are_private(self):
+        """Users see their own jobs; staff see everyone's."""
+        job = enqueue('seed', {}, user=self.user)
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(f'/api/jobs/{job.pk}/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/api/jobs/').data['count'], 0)
+        other.is_staff = True
+        other.save()
+        self.assertEqual(self.client.get(f'/api/jobs/{job.pk}/').data['kind'], 'seed')
+
+
+class JobWorkerTest(TransactionTestCase):
+    """The worker runs jobs on its own threads and connections, so the queue must be committed."""
+
+    @skipUnless(connection.vendor == 'postgresql', 'needs concurrent writers (PostgreSQL)')
+    def test_worker_runs_jobs_concurrently(self):
+        """One `run(once=True)` pass runs every due job on the pool."""
+        for n in range(4):
+            enqueue('bulk', {'model': 'contact', 'method': 'POST', 'rows': [{'full_name': f"Worker {n}"}]})
+        self.assertEqual(Worker(threads=2, poll_interval=0.01).run(once=True), 4)
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)), {JobStatus.SUCCEEDED})
+        self.assertEqual(Contact.objects.count(), 4)
+
+    @skipUnless(connection.vendor == 'postgresql', 'SKIP LOCKED needs PostgreSQL')
+    def test_claim_skips_locked_jobs(self):
+        """A job locked by another worker's claim is skipped, not waited for."""
+        first, second = enqueue('seed', {}), enqueue('seed', {})
+        claimed = []
+
+        def other_worker():
+            try:
+                claimed.extend(job.pk for job in claim('other', 10, 60, exclusive=True))
+            finally:
+                connection.close()
+
+        with transaction.atomic():
+            Job.objects.select_for_update().get(pk=first.pk)
+            thread = threading.Thread(target=other_worker)
+            thread.start()
+            thread.join(10)
+        self.assertEqual(claimed, [second.pk])
+
+    def test_commands(self):
+        """`seed --background` queues the seed for `run_jobs --exclusive`, and `prune_jobs` cleans up."""
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        client = APIClient()
+        client.force_authenticate(user=user)
+        with tempfile.TemporaryDirectory() as tmp, override_settings(CRM_JOBS={'EXPORT_DIR': tmp}):
+            Contact.objects.create(full_name="Exported")
+            client.get('/api/contacts/export/?background=true')
+            call_command('seed', '--background', '--contacts', '3', '--tasks-per-contact', '1', stdout=StringIO())
+            out = StringIO()
+            call_command('run_jobs', '--once', '--threads', '2', stdout=out)
+            self.assertIn('after 1 jobs', out.getvalue())  # the seed is left to the exclusive worker
+            self.assertEqual(Job.objects.get(kind='seed').status, JobStatus.QUEUED)
+            with self.assertRaises(CommandError):
+                call_command('run_jobs', '--once', '--exclusive', '--threads', '2', stdout=StringIO())
+            out = StringIO()
+            call_command('run_jobs', '--once', '--exclusive', stdout=out)
+            self.assertIn('after 1 jobs', out.getvalue())
+            self.assertEqual(Contact.objects.count(), 3)
+            self.assertEqual(len(os.listdir(tmp)), 1)
+
+            call_command('prune_jobs', '--days', '0', stdout=StringIO())
+            self.assertFalse(Job.objects.exists())
+            self.assertEqual(os.listdir(tmp), [])
+
+
+class BatchedDeleteTest(TestCase):
+    """Contact deletes remove tasks in chunks and keep counters, open counts and the change log exact."""
+
+    def setUp(self):
+        """One contact with five tasks, two of them done and one archived, and one contact left alone."""
+        caches['default'].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username='testuser', is_staff=True, is_superuser=True))
+        self.contact = Contact.objects.create(full_name="Fan-out Contact")
+        self.other = Contact.objects.create(full_name="Other Contact")
+        self.tasks = [
+            Task.objects.create(contact=self.contact, title=f"Task {n}", priority="high", is_done=n < 2)
+            for n in range(5)
+        ]
+        self.kept = Task.objects.create(contact=self.other, title="Kept task")
+        archive_done_tasks(timezone.now() + timedelta(days=1), batch_size=1)
+
+    def assertCountersExact(self):
+        """The stored counters equal a full recount (zero rows ignored)."""
+        stored = {key: value for key, value in stored_counters().items() if value}
+        self.assertEqual(stored, {key: value for key, value in computed_counters().items() if value})
+
+    def assertDeleted(self):
+        """The contact and its tasks are gone, counters match and the open tasks' deletes are logged."""
+        self.assertFalse(Contact.objects.filter(pk=self.contact.pk).exists())
+        self.assertEqual(list(Task.objects.values_list('pk', flat=True)), [self.kept.pk])
+        self.assertFalse(ArchivedTask.objects.exists())
+        self.assertCountersExact()
+        publish_changes()
+        deleted = set(Change.objects.filter(model='task', action=ChangeAction.DELETED).values_list('object_id', flat=True))
+        self.assertTrue({task.pk for task in self.tasks if not task.is_done} <= deleted)
+
+    def test_chunks_commit_progress(self):
+        """Each chunk keeps open_tasks_count right, so a delete stopped half way leaves a consistent contact."""
+        progress = []
+        self.assertEqual(delete_contacts([self.contact.pk], chunk_size=2, progress=progress.append), [self.contact.pk])
+        self.assertEqual(progress, [2, 3, 5])
+        self.assertDeleted()
+
+        partial = Contact.objects.create(full_name="Partial Contact")
+        Task.objects.bulk_create([Task(contact=partial, title=f"Open {n}") for n in range(3)])
+        delete_task_chunk([partial.pk], 2)
+        partial.refresh_from_db()
+        self.assertEqual(partial.open_tasks_count, 1)
+        self.assertEqual(delete_contacts([partial.pk, 0]), [partial.pk])
+        self.assertCountersExact()
+
+    def test_does_not_load_tasks(self):
+        """No Task or ArchivedTask instance is built on the way."""
+        with mock.patch.object(Task, 'from_db') as task_from_db, \
+                mock.patch.object(ArchivedTask, 'from_db') as archived_from_db:
+            delete_contacts([self.contact.pk], chunk_size=100)
+        task_from_db.assert_not_called()
+        archived_from_db.assert_not_called()
+        self.assertDeleted()
+
+    def test_api_destroy_and_bulk_delete(self):
+        """DELETE /api/contacts/<id>/ and the bulk delete action go through delete_contacts."""
+        with mock.patch('api.views.delete_contacts', wraps=delete_contacts) as destroy:
+            response = self.client.delete(f'/api/contacts/{self.contact.pk}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        destroy.assert_called_once_with([self.contact.pk])
+        self.assertDeleted()
+
+        response = self.client.generic(
+            'DELETE', '/api/contacts/bulk/', json.dumps({'ids': [self.other.pk, 0]}), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.json()['ids'], [self.other.pk])
+        self.assertFalse(Task.objects.exists())
+        self.assertCountersExact()
+
+    def test_admin_delete(self):
+        """The admin confirmation page shows counts instead of every task, and deletes through delete_contacts."""
+        self.client.force_login(User.objects.get(username='testuser'))
+        url = f'/admin/api/contact/{self.contact.pk}/delete/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotContains(response, 'Task 4')
+        response = self.client.post(url, {'post': 'yes'})
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertDeleted()
+
+    def test_bench_delete_command(self):
+        """bench_delete times both delete paths for each fan-out."""
+        out = StringIO()
+        call_command('bench_delete', '--fan-out', '0,20', '--chunk-size', '8', '--json', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual([(row['tasks'], row['method']) for row in report['results']], [
+            (0, 'cascade'), (0, 'chunked'), (20, 'cascade'), (20, 'chunked'),
+        ])
+        self.assertEqual(report['results'][-1]['transactions'], 4)
+        self.assertEqual(Contact.objects.filter(full_name='Bench fan-out contact').count(), 0)
+
+
+class StartupTest(TestCase):
+    """The lean settings profile starts without the browser-only apps and the bulk of Django REST framework."""
+
+    def test_lean_profile_imports(self):
+        """django.setup() under config.settings.lean imports no admin, session or message module, nor DRF's views."""
+        out = StringIO()
+        call_command('bench_startup', '--profiles', 'config.settings.lean', '--repeat', '1', '--top', '10000', '--json', stdout=out)
+        [result] = json.loads(out.getvalue())['results']
+        self.assertEqual(result['status'], '401 Unauthorized')
+        setup = [package for package, _ in result['imports']['setup']['packages']]
+        for prefix in (
+            'django.contrib.admin', 'django.contrib.sessions', 'django.contrib.messages', 'django.contrib.staticfiles',
+            'rest_framework.views', 'rest_framework.serializers', 'rest_framework_simplejwt', 'django_filters',
+        ):
+            self.assertFalse([package for package in setup if package.startswith(prefix)], prefix)
+        self.assertIn('rest_framework.views', [package for package, _ in result['imports']['request']['packages']])
+        self.assertLess(result['setup_ms'], result['first_request_ms'])
+
+    def test_budget(self):
+        """A time to first request over --budget-ms fails the command."""
+        with self.assertRaisesMessage(CommandError, 'over the 0.001 ms budget'):
+            call_command('bench_startup', '--profiles', 'config.settings.lean', '--repeat', '1', '--budget-ms', '0.001', stdout=StringIO())
+
+
+class FakeClock:
+    """Simulated time for the reminder scheduler: `sleep` jumps ahead and records where it woke up."""
+
+    def __init__(self, now):
+        self.current = now
+        self.wakes = []
+
+    def now(self):
+        return self.current
+
+    def sleep(self, seconds, stopping):
+        self.current += timedelta(seconds=seconds)
+        self.wakes.append(timezone.localtime(self.current).strftime('%m-%d %H:%M'))
+
+
+class RecordingBackend:
+    """Reminder backend that keeps `(contact, kind, task titles)` of what it sends."""
+    sent = []
+
+    def __init__(self, options):
+        pass
+
+    def send(self, reminder, tasks):
+        self.sent.append((reminder.contact.full_name, reminder.kind, [task.title for task in tasks]))
+
+
+@override_settings(
+    TIME_ZONE='Asia/Amman',
+    CRM_REMINDERS={'LEAD_DAYS': 1, 'REMIND_AT': '08:00', 'CATCH_UP_DAYS': 1, 'BACKEND': 'api.tests.RecordingBackend'},
+)
+class ReminderSchedulerTest(TestCase):
+    """The reminder scheduler wakes when reminders fire and batches the due open tasks per contact."""
+
+    def setUp(self):
+        """Two contacts with tasks due around 2026-03-02, one done and one without a due date."""
+        RecordingBackend.sent = []
+        self.ahmad = Contact.objects.create(full_name="Ahmad")
+        self.sara = Contact.objects.create(full_name="Sara")
+        self.call = Task.objects.create(contact=self.ahmad, title="Call", due_date=date(2026, 3, 3))
+        Task.objects.create(contact=self.ahmad, title="Invoice", due_date=date(2026, 3, 1))
+        Task.objects.create(contact=self.sara, title="Visit", due_date=date(2026, 3, 3))
+        Task.objects.create(contact=self.sara, title="Later", due_date=date(2026, 3, 10))
+        Task.objects.create(contact=self.sara, title="Done", due_date=date(2026, 3, 3), is_done=True)
+        Task.objects.create(contact=self.sara, title="Someday")
+
+    def at(self, *args):
+        return timezone.make_aware(datetime(*args))
+
+    def reminders(self):
+        return sorted(
+            (reminder.contact.full_name, reminder.kind, str(reminder.due_through), [Task.objects.get(pk=pk).title for pk in reminder.task_ids])
+            for reminder in Reminder.objects.select_related('contact')
+        )
+
+    def deliver(self):
+        """Run the queued reminder jobs in this thread, as a run_jobs worker would."""
+        for job in claim('test-worker', 10, 60):
+            run_job(job, 'test-worker')
+
+    def test_simulated_days(self):
+        """Upcoming reminders fire the morning before, overdue ones the morning after, and nothing in between."""
+        clock = FakeClock(self.at(2026, 3, 2, 7, 0))
+        scheduler = Scheduler(clock=clock, max_sleep=7 * 86400)
+        self.assertEqual(scheduler.run(until=self.at(2026, 3, 3, 12, 0)), 3)
+        self.assertEqual(clock.wakes, ['03-02 08:00', '03-03 12:00'])
+        self.assertEqual(self.reminders(), [
+            ('Ahmad', 'overdue', '2026-03-01', ["Invoice"]),
+            ('Ahmad', 'upcoming', '2026-03-03', ["Call"]),
+            ('Sara', 'upcoming', '2026-03-03', ["Visit"]),
+        ])
+        self.assertEqual([scheduler.queue[0]], [(self.at(2026, 3, 4, 8, 0), ReminderKind.OVERDUE)])
+
+        self.call.is_done = True
+        self.call.save()
+        self.assertEqual(scheduler.run(until=self.at(2026, 3, 9, 9, 0)), 2)
+        self.assertEqual(clock.wakes[2:], ['03-04 08:00', '03-09 08:00', '03-09 09:00'])
+        self.assertIn(('Sara', 'overdue', '2026-03-03', ["Visit"]), self.reminders())
+        self.assertIn(('Sara', 'upcoming', '2026-03-10', ["Later"]), self.reminders())
+        self.assertEqual(dict(ReminderCursor.objects.values_list('kind', 'through')), {
+            ReminderKind.UPCOMING: date(2026, 3, 10), ReminderKind.OVERDUE: date(2026, 3, 3),
+        })
+
+        self.deliver()
+        self.assertEqual(sorted(RecordingBackend.sent), [
+            ('Ahmad', 'overdue', ["Invoice"]),
+            ('Sara', 'overdue', ["Visit"]),
+            ('Sara', 'upcoming', ["Later"]),
+            ('Sara', 'upcoming', ["Visit"]),
+        ])  # Ahmad's upcoming reminder only had Call, done since
+        self.assertFalse(Reminder.objects.filter(sent_at__isnull=True).exists())
+        Job.objects.update(status=JobStatus.QUEUED)
+        self.deliver()
+        self.assertEqual(len(RecordingBackend.sent), 4)
+
+    def test_tick_reads_only_due_tasks(self):
+        """A tick's queries do not grow with the open tasks that are not due, and each reads a due_date range."""
+        clock = FakeClock(self.at(2026, 3, 2, 9, 0))
+        scheduler = Scheduler(clock=clock)
+        self.assertEqual(scheduler.tick(), 3)
+        clock.current += timedelta(hours=1)
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(scheduler.tick(), 0)
+        Task.objects.bulk_create(
+            Task(contact=self.sara, title=f"Far {n}", due_date=date(2027, 1, 1) + timedelta(days=n)) for n in range(300)
+        )
+        clock.current += timedelta(hours=1)
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(scheduler.tick(), 0)
+        self.assertEqual(len(few), len(many))
+        for query in many.captured_queries:
+            if '"api_task"' in query['sql']:
+                self.assertIn('"due_date" >', query['sql'])
+                self.assertIn('LIMIT', query['sql'])
+
+    def test_command(self):
+        """`run_reminders --once` makes the reminders fired by now, queues their delivery and exits."""
+        Task.objects.create(contact=self.ahmad, title="Yesterday", due_date=timezone.localdate() - timedelta(days=1))
+        out = StringIO()
+        with override_settings(CRM_REMINDERS={'REMIND_AT': '00:00'}):
+            call_command('run_reminders', '--once', stdout=out)
+        self.assertIn('Made 1 reminders', out.getvalue())
+        self.assertEqual(self.reminders(), [('Ahmad', 'overdue', str(timezone.localdate() - timedelta(days=1)), ["Yesterday"])])
+        self.assertEqual(list(Job.objects.values_list('kind', flat=True)), ['reminders'])
+
+
+class DuplicateDetectionTest(TestCase):
+    """Likely duplicate contacts are found by blocking keys, refreshed from the change log and merged with their tasks."""
+
+    def setUp(self):
+        """Two pairs of duplicates written differently, and a namesake whose phone and email conflict."""
+        caches['default'].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username='testuser'))
+        self.mohammed = Contact.objects.create(full_name="Mohammed Al-Zoubi", phone="+962791234567", email="m.zoubi@example.com")
+        self.mohamad = Contact.objects.create(full_name="al zoubi, Mohamad", phone="0791234567")
+        self.sara = Contact.objects.create(full_name="Sara Haddad", email="Sara.Haddad+work@Example.com")
+        self.sara_copy = Contact.objects.create(full_name="sara haddad", email="sara.haddad@example.com")
+        self.namesake = Contact.objects.create(full_name="Sara Haddad", phone="+962795555555", email="sara@other.com")
+
+    def pairs(self):
+        return set(DuplicatePair.objects.values_list('contact_id', 'other_id'))
+
+    def test_normalization(self):
+        """Phones keep their last digits, emails lose case and +tags (and dots on Gmail), names are sorted words."""
+        self.assertEqual(normalize_phone('+962 79-123-4567'), normalize_phone('0791234567'))
+        self.assertEqual(normalize_phone('123'), '')
+        self.assertEqual(normalize_email(' Sara.Haddad+work@Example.com'), 'sara.haddad@example.com')
+        self.assertEqual(normalize_email('s.haddad+x@googlemail.com'), 'shaddad@gmail.com')
+        self.assertEqual(normalize_name('Al-Zoubi, Mohammed'), 'al mohammed zoubi')
+        self.assertEqual(normalize_name('José'), 'jose')
+
+    def test_refresh_finds_duplicates(self):
+        """Reformatted phones, name typos and email case are caught; a namesake with other details is not."""
+        result = refresh_duplicates()
+        self.assertTrue(result['full'])
+        self.assertEqual(result['contacts'], 5)
+        self.assertLess(result['compared'], 10)
+        self.assertEqual(self.pairs(), {(self.mohammed.pk, self.mohamad.pk), (self.sara.pk, self.sara_copy.pk)})
+        reasons = dict(DuplicatePair.objects.values_list('contact_id', 'reasons'))
+        self.assertEqual(reasons, {self.mohammed.pk: ['name', 'phone'], self.sara.pk: ['name', 'email']})
+
+    def test_incremental_refresh(self):
+        """Later refreshes rescan only the contacts logged as changed whose keys changed; deletes drop pairs."""
+        refresh_duplicates()
+        late = Contact.objects.create(full_name="Mohamed Zoubi Al", phone="00962791234567")
+        self.sara.status = 'inactive'
+        self.sara.save()
+        result = refresh_duplicates()
+        self.assertFalse(result['full'])
+        self.assertEqual(result['contacts'], 1)
+        self.assertTrue({(self.mohammed.pk, late.pk), (self.mohamad.pk, late.pk)} <= self.pairs())
+        self.assertEqual(refresh_duplicates()['contacts'], 0)
+
+        self.sara_copy.email = "someone@else.com"
+        self.sara_copy.save()
+        self.mohamad.delete()
+        refresh_duplicates()
+        self.assertNotIn((self.sara.pk, self.sara_copy.pk), self.pairs())
+        self.assertFalse(DuplicatePair.objects.filter(Q(contact=self.mohamad.pk) | Q(other=self.mohamad.pk)).exists())
+
+    def test_large_blocks_are_skipped(self):
+        """Keys held by more than MAX_BLOCK contacts are not compared, so a common name costs nothing."""
+        Contact.objects.bulk_create(Contact(full_name="Omar Khaled") for _ in range(5))
+        with override_settings(CRM_DUPLICATES={'MAX_BLOCK': 4}):
+            refresh_duplicates()
+        self.assertFalse(DuplicatePair.objects.filter(contact__full_name="Omar Khaled").exists())
+        refresh_duplicates(full=True)
+        self.assertEqual(DuplicatePair.objects.filter(contact__full_name="Omar Khaled").count(), 10)
+
+    def test_compares_far_fewer_than_all_pairs(self):
+        """On a generated book of distinct contacts few pairs are compared and none is reported."""
+        generate_dataset(300, 0, seed=1)
+        result = refresh_duplicates(full=True)
+        self.assertLess(result['compared'], 305 * 304 // 2 // 20)
+        self.assertFalse(DuplicatePair.objects.exclude(contact__in=[self.mohammed, self.sara]).exists())
+
+    def test_duplicates_endpoint(self):
+        """GET /api/contacts/duplicates/ pages the pairs best first and filters by contact and score."""
+        refresh_duplicates()
+        response = self.client.get('/api/contacts/duplicates/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()['results']
+        self.assertEqual([row['score'] for row in results], sorted((row['score'] for row in results), reverse=True))
+        self.assertEqual(
+            [[contact['id'] for contact in row['contacts']] for row in results],
+            [[self.sara.pk, self.sara_copy.pk], [self.mohammed.pk, self.mohamad.pk]],
+        )
+        response = self.client.get('/api/contacts/duplicates/', {'contact': self.mohamad.pk})
+        self.assertEqual([row['contacts'][0]['id'] for row in response.json()['results']], [self.mohammed.pk])
+        response = self.client.get('/api/contacts/duplicates/', {'min_score': results[0]['score']})
+        self.assertEqual(len(response.json()['results']), 1)
+        self.assertEqual(self.client.get('/api/contacts/duplicates/', {'min_score': 2}).status_code, 400)
+
+    def test_merge(self):
+        """Merging moves live and archived tasks, renames clashing titles and fills the empty email."""
+        Task.objects.create(contact=self.mohamad, title="Call")
+        for title in ("Call", "Call (2)", "Email"):
+            Task.objects.create(contact=self.mohammed, title=title)
+        Task.objects.create(contact=self.mohammed, title="Old", is_done=True)
+        archive_done_tasks(timezone.now() + timedelta(days=1))
+        refresh_duplicates()
+
+        response = self.client.post(f'/api/contacts/{self.mohamad.pk}/merge/', {'duplicates': [self.mohammed.pk]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['merged'], [self.mohammed.pk])
+        self.assertEqual(response.json()['moved_tasks'], 3)
+        self.assertEqual(response.json()['moved_archived_tasks'], 1)
+        self.assertEqual(response.json()['contact']['email'], "m.zoubi@example.com")
+        self.assertFalse(Contact.objects.filter(pk=self.mohammed.pk).exists())
+        self.assertEqual(
+            sorted(self.mohamad.tasks.values_list('title', flat=True)), ["Call", "Call (2)", "Call (3)", "Email"],
+        )
+        self.assertEqual(ArchivedTask.objects.get().contact_id, self.mohamad.pk)
+        self.assertEqual(response.json()['contact']['open_tasks_count'], 4)
+        self.mohamad.refresh_from_db()
+        self.assertEqual(self.mohamad.open_tasks_count, 4)
+        self.assertEqual(self.pairs(), {(self.sara.pk, self.sara_copy.pk)})
+
+    def test_merge_archived_title_conflicts(self):
+        """An archived task whose title the target has live is renamed, or dropped and uncounted with drop."""
+        Task.objects.create(contact=self.sara, title="Call")
+        Task.objects.create(contact=self.sara_copy, title="Call", is_done=True)
+        Task.objects.create(contact=self.sara_copy, title="Visit", is_done=True)
+        archive_done_tasks(timezone.now() + timedelta(days=1))
+        clash = ArchivedTask.objects.get(title="Call")
+        result = merge_contacts(self.sara.pk, [self.sara_copy.pk])
+        self.assertEqual(result['renamed_archived_tasks'], {clash.pk: "Call (2)"})
+        self.assertEqual(
+            sorted(ArchivedTask.objects.values_list('contact_id', 'title')),
+            [(self.sara.pk, "Call (2)"), (self.sara.pk, "Visit")],
+        )
+
+        ArchivedTask.objects.filter(pk=clash.pk).update(title="Call")
+        other = Contact.objects.create(full_name="Sara Copy Again")
+        ArchivedTask.objects.filter(pk=clash.pk).update(contact=other)
+        result = merge_contacts(self.sara.pk, [other.pk], title_conflicts='drop')
+        self.assertEqual(result['dropped_archived_tasks'], [clash.pk])
+        self.assertEqual(list(ArchivedTask.objects.values_list('title', flat=True)), ["Visit"])
+        self.assertEqual(
+            {key: value for key, value in stored_counters().items() if value},
+            {key: value for key, value in computed_counters().items() if value},
+        )
+
+    def test_merge_drop_and_validation(self):
+        """title_conflicts=drop deletes clashing tasks; self-merges and unknown contacts are rejected."""
+        Task.objects.create(contact=self.sara, title="Call")
+        clash = Task.objects.create(contact=self.sara_copy, title="Call")
+        url = f'/api/contacts/{self.sara.pk}/merge/'
+        response = self.client.post(url, {'duplicates': [self.sara_copy.pk], 'title_conflicts': 'drop'}, format='json')
+        self.assertEqual(response.json()['dropped_tasks'], [clash.pk])
+        self.assertEqual(list(Task.objects.values_list('contact_id', 'title')), [(self.sara.pk, "Call")])
+
+        for duplicates, message in (([self.sara.pk], 'into itself'), ([99999], 'Unknown contacts: 99999'), ([], 'at least 1')):
+            response = self.client.post(url, {'duplicates': duplicates}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(message, response.json()['duplicates'][0])
+
+    def test_commands(self):
+        """find_duplicates rebuilds then refreshes; bench_duplicates reports recall on planted duplicates."""
+        out = StringIO()
+        call_command('find_duplicates', stdout=out)
+        call_command('find_duplicates', stdout=out)
+        self.assertIn('Rebuilt duplicates', out.getvalue())
+        self.assertIn('Refreshed duplicates', out.getvalue())
+        self.assertIn('2 pairs found', out.getvalue())
+
+        out = StringIO()
+        call_command('bench_duplicates', contacts=200, duplicates=0.1, repeat=1, json=True, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['contacts'], 220)
+        self.assertEqual(report['true_pairs'], 20)
+        self.assertGreaterEqual(report['recall'], 0.8)
+        self.assertLess(report['full_refresh']['compared'], report['full_refresh']['all_pairs'] // 20)
+        self.assertEqual(report['incremental_refresh']['renamed'], 1)
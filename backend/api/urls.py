@@ -1,8 +1,21 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
-from api.views import ContactViewSet, TaskViewSet
+from api.asyncviews import with_async_reads
+from api.events import EventStreamView
+from api.views import ChangeFeedView, ContactViewSet, JobViewSet, MetricsView, StatsView, TaskViewSet
 
 router = DefaultRouter()
 router.register('contacts', ContactViewSet)
 router.register('tasks', TaskViewSet)
+router.register('jobs', JobViewSet)
 
-urlpatterns = router.urls
\ No newline at end of file
+urlpatterns = [
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('stats/', StatsView.as_view(), name='stats'),
+    path('changes/', ChangeFeedView.as_view(), name='changes'),
+] + router.urls
+
+# Served instead of `urlpatterns` under ASGI (config/asgi_urls.py); the event stream needs ASGI.
+async_urlpatterns = with_async_reads(urlpatterns) + [
+    path('events/', EventStreamView.as_view(), name='events'),
+]
@@ -1,23 +1,45 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from api.filters import TaskFilter
-from .models import Contact, Task
-from api.serializers import ContactSerializer, TaskSerializer
-from django.db.models import Count, Q
-from rest_framework.pagination import PageNumberPagination
-
-
-class TaskPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-
-class ContactViewSet(viewsets.ModelViewSet):
-    queryset = Contact.objects.annotate(
-        open_tasks_count=Count('tasks', filter=Q(tasks__is_done=False))
-    )
+from api.filters import ContactSearchFilter, TaskFilter
+from .models import Contact, DuplicatePair, Job, JobStatus, Task
+from api.serializers import (
+    ContactMergeSerializer, ContactSerializer, DuplicatePairSerializer, DuplicateQuerySerializer, JobSerializer,
+    TaskSerializer,
+)
+from api.pagination import ContactPagination, TaskPagination
+from api.stats import dashboard_stats, stats_settings
+from api.archive import IncludeArchivedMixin
+from api.bulk import BulkModelMixin, ContactBulkWriter, TaskBulkWriter
+from api.cache import CachedResponseMixin
+from api.changes import DEFAULT_LIMIT, MAX_LIMIT, read_changes, sequence_state
+from api.deletion import delete_contacts
+from api.duplicates import merge_contacts
+from api.expand import ExpandTasksMixin
+from api.export import ExportMixin
+from api.fastread import FastReadMixin
+from api.instrumentation import InstrumentedViewMixin, registry
+from api.jobs import export_storage
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.filters import OrderingFilter
+from django.core.cache import caches
+from django.db.models import Q
+from django.http import FileResponse, HttpResponse
+from django.utils import timezone
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
+
+
+class ContactViewSet(
+    InstrumentedViewMixin, CachedResponseMixin, ExpandTasksMixin, FastReadMixin, BulkModelMixin, ExportMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = Contact.objects.all()
     serializer_class = ContactSerializer
+    bulk_writer_class = ContactBulkWriter
+    pagination_class = ContactPagination
+    filter_backends = [DjangoFilterBackend, ContactSearchFilter, OrderingFilter]
 
     search_fields = ['full_name', 'phone', 'email']
 
@@ -26,9 +48,145 @@ class ContactViewSet(viewsets.ModelViewSet):
     ordering_fields = ['full_name', 'created_at']
     ordering = ['-created_at']
 
-class TaskViewSet(viewsets.ModelViewSet):
+    export_name = 'contacts'
+    export_fields = {
+        'id': 'id', 'full_name': 'full_name', 'phone': 'phone', 'email': 'email',
+        'status': 'status', 'created_at': 'created_at', 'open_tasks_count': 'open_tasks_count',
+    }
+    fast_read_fields = export_fields
+
+    def perform_destroy(self, instance):
+        delete_contacts([instance.pk])
+
+    @action(detail=False, methods=['get'])
+    def duplicates(self, request):
+        """Likely duplicate pairs found by `find_duplicates`, best match first."""
+        params = DuplicateQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        pairs = DuplicatePair.objects.select_related('contact', 'other').order_by('-score', 'id')
+        if 'contact' in params.validated_data:
+            pairs = pairs.filter(Q(contact=params.validated_data['contact']) | Q(other=params.validated_data['contact']))
+        if 'min_score' in params.validated_data:
+            pairs = pairs.filter(score__gte=params.validated_data['min_score'])
+        page = self.paginate_queryset(pairs)
+        return self.get_paginated_response(DuplicatePairSerializer(page, many=True).data)
+
+    @action(detail=True, methods=['post'])
+    def merge(self, request, pk=None):
+        """Fold the `duplicates` contacts into this one, with their tasks."""
+        contact = self.get_object()
+        serializer = ContactMergeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        pks = set(serializer.validated_data['duplicates'])
+        if contact.pk in pks:
+            raise ValidationError({'duplicates': ['A contact cannot be merged into itself.']})
+        missing = pks - set(Contact.objects.filter(pk__in=pks).values_list('pk', flat=True))
+        if missing:
+            raise ValidationError({'duplicates': [f"Unknown contacts: {', '.join(map(str, sorted(missing)))}."]})
+        result = merge_contacts(contact.pk, pks, serializer.validated_data['title_conflicts'])
+        result['contact'] = ContactSerializer(result['contact']).data
+        return Response(result)
+
+
+class TaskViewSet(
+    InstrumentedViewMixin, CachedResponseMixin, IncludeArchivedMixin, FastReadMixin, BulkModelMixin, ExportMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Task.objects.select_related('contact').all()
     serializer_class = TaskSerializer
+    bulk_writer_class = TaskBulkWriter
     filterset_class = TaskFilter
     pagination_class = TaskPagination
-    ordering = ['-created_at']
\ No newline at end of file
+    ordering = ['-created_at']
+
+    export_name = 'tasks'
+    export_fields = {
+        'id': 'id', 'contact': 'contact_id', 'title': 'title', 'due_date': 'due_date',
+        'priority': 'priority', 'is_done': 'is_done', 'created_at': 'created_at',
+    }
+    fast_read_fields = export_fields
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status of the background jobs the user started (all jobs for staff)."""
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    filterset_fields = ['kind', 'status']
+    ordering_fields = ['created_at']
+    ordering = ['-id']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(created_by=self.request.user)
+        return queryset
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        name = (job.result or {}).get('file') if job.status == JobStatus.SUCCEEDED else None
+        storage = export_storage()
+        if not name or not storage.exists(name):
+            raise NotFound('This job has no file to download.')
+        return FileResponse(storage.open(name, 'rb'), as_attachment=True, filename=name)
+
+
+class ChangeFeedView(APIView):
+    """Created, updated and deleted contacts and tasks after a cursor, oldest first."""
+
+    def get(self, request):
+        last, pruned_through = sequence_state()
+        since = request.query_params.get('since', '0')
+        if since == 'latest':
+            return Response({'changes': [], 'next': last, 'has_more': False})
+        try:
+            since = int(since)
+            if since < 0:
+                raise ValueError
+        except ValueError:
+            raise ValidationError({'since': ['Must be a cursor returned by this endpoint, 0 or "latest".']})
+        limit = self.get_limit(request)
+        if 0 < since < pruned_through:
+            return Response({
+                'detail': 'Changes after this cursor have been compacted away; reload with since=0.',
+                'next': 0,
+            }, status=status.HTTP_410_GONE)
+
+        changes, cursor, has_more = read_changes(since, limit)
+        return Response({'changes': changes, 'next': cursor, 'has_more': has_more})
+
+    @staticmethod
+    def get_limit(request):
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            raise ValidationError({'limit': ['A valid integer is required.']})
+        return max(1, min(limit, MAX_LIMIT))
+
+
+class StatsView(APIView):
+    """Dashboard counts: contacts per status, tasks per priority, done ratios, overdue and due soon."""
+
+    def get(self, request):
+        options = stats_settings()
+        today = timezone.localdate()
+        cache = caches[options['ALIAS']]
+        key = f'crm:stats:{today.isoformat()}'
+        data = cache.get(key) if options['CACHE_TIMEOUT'] else None
+        state = 'HIT'
+        if data is None:
+            state = 'MISS'
+            data = dashboard_stats(today)
+            if options['CACHE_TIMEOUT']:
+                cache.set(key, data, options['CACHE_TIMEOUT'])
+        return Response(data, headers={
+            'Cache-Control': f"private, max-age={options['CACHE_TIMEOUT']}", 'X-Cache': state,
+        })
+
+
+class MetricsView(APIView):
+    """Prometheus text exposition of the in-process request metrics (`api.instrumentation`)."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -2,6 +2,8 @@
 ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Contact and task list/detail reads are served by async views with the async
+ORM (see `api/asyncviews.py`); everything else runs the regular sync views.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -9,8 +11,17 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Every ASGI request runs its ORM calls in a thread of its own, so persistent
+# connections would never be reused. Borrow them from psycopg's pool instead;
+# with DB_POOL=False they are closed after each request.
+os.environ.setdefault('DB_POOL', 'True')
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+
+from api.asyncviews import AsyncReadsASGIHandler  # noqa: E402  needs the apps loaded
+
+application = AsyncReadsASGIHandler()
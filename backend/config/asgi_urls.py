@@ -0,0 +1,12 @@
+"""
+Root URLconf used under ASGI (see `config/asgi.py`).
+
+Same routes as `config.urls`, except that contact and task list/detail reads
+are served by the async views in `api/asyncviews.py`.
+"""
+from django.urls import include, path
+
+from api.urls import async_urlpatterns
+from config.urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [path('api/', include(async_urlpatterns))] + sync_urlpatterns
@@ -39,6 +39,7 @@ DJANGO_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'corsheaders',
 ]
 
@@ -57,7 +58,7 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -65,6 +66,95 @@ REST_FRAMEWORK = {
 }
 
 
+# Response cache for the list/detail endpoints (api/cache.py). locmem is per
+# process; set REDIS_URL when running several workers.
+REDIS_URL = config('REDIS_URL', default='')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'mini-crm',
+    },
+}
+
+CRM_RESPONSE_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+    'ENABLED': config('CRM_RESPONSE_CACHE', default=True, cast=bool),
+}
+
+# Per-request SQL/latency metrics for /api/ (api/instrumentation.py).
+CRM_METRICS = {
+    'ENABLED': config('CRM_METRICS', default=True, cast=bool),
+    'PATH_PREFIX': '/api/',
+    'SERVER_TIMING': True,
+    'SLOW_QUERY_MS': config('CRM_SLOW_QUERY_MS', default=500, cast=int),
+}
+
+# Serializer-free JSON reads for list/retrieve (api/fastread.py).
+CRM_FAST_READS = config('CRM_FAST_READS', default=True, cast=bool)
+
+# /api/stats/ dashboard counters (api/stats.py); 0 disables the response cache.
+CRM_STATS = {
+    'ALIAS': 'default',
+    'CACHE_TIMEOUT': config('CRM_STATS_CACHE_SECONDS', default=10, cast=int),
+}
+
+# Validated tokens and their users, cached per process (api/authentication.py);
+# TIMEOUT 0 looks the user up on every request. Every worker must see the user
+# versions kept in ALIAS, so the cache is on by default only with REDIS_URL and
+# `manage.py check` fails (api.E002) if it is turned on with a per-process cache.
+CRM_AUTH_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': config('CRM_AUTH_CACHE_SECONDS', default=60 if REDIS_URL else 0, cast=int),
+    'MAX_ENTRIES': 10000,
+}
+
+# Server-sent events at /api/events/ under ASGI (api/events.py). ChangeLogBackend
+# polls api_change so every worker sees every write; LocalBackend is in-process only.
+CRM_EVENTS = {
+    'BACKEND': config('CRM_EVENTS_BACKEND', default='api.events.ChangeLogBackend'),
+    'POLL_INTERVAL': config('CRM_EVENTS_POLL_SECONDS', default=0.5, cast=float),
+    'QUEUE_SIZE': 1000,
+    'MAX_CLIENTS': config('CRM_EVENTS_MAX_CLIENTS', default=5000, cast=int),
+    'HEARTBEAT': 15,
+}
+
+# Background jobs (api/jobs.py), run by `manage.py run_jobs`. Export files go
+# to EXPORT_DIR, which every worker and web process must share.
+CRM_JOBS = {
+    'THREADS': config('CRM_JOBS_THREADS', default=4, cast=int),
+    'POLL_INTERVAL': config('CRM_JOBS_POLL_SECONDS', default=1.0, cast=float),
+    'LEASE': 300,
+    'MAX_ATTEMPTS': 3,
+    'RETRY_DELAY': 10,
+    'EXPORT_DIR': config('CRM_JOBS_EXPORT_DIR', default=str(BASE_DIR / 'exports')),
+}
+
+# Due-date reminders (api/reminders.py), made by `manage.py run_reminders` and
+# sent by the run_jobs workers. REMIND_AT is in TIME_ZONE.
+CRM_REMINDERS = {
+    'LEAD_DAYS': config('CRM_REMINDERS_LEAD_DAYS', default=1, cast=int),
+    'REMIND_AT': config('CRM_REMINDERS_AT', default='08:00'),
+    'CATCH_UP_DAYS': 1,
+    'MAX_SLEEP': 60,
+    'BATCH_SIZE': 100,
+    'BACKEND': config('CRM_REMINDERS_BACKEND', default='api.reminders.LogBackend'),
+}
+
+# Duplicate contact detection (api/duplicates.py), refreshed by `manage.py
+# find_duplicates`. Name keys shared by more than MAX_BLOCK contacts are not compared.
+CRM_DUPLICATES = {
+    'PHONE_DIGITS': 9,
+    'NAME_BANDS': 4,
+    'NAME_ROWS': 2,
+    'MAX_BLOCK': config('CRM_DUPLICATES_MAX_BLOCK', default=100, cast=int),
+    'MIN_SCORE': config('CRM_DUPLICATES_MIN_SCORE', default=0.5, cast=float),
+    'CHUNK_SIZE': 1000,
+}
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
@@ -73,6 +163,7 @@ SIMPLE_JWT = {
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'api.instrumentation.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -99,6 +190,27 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
+
+# Database connection reuse, merged into DATABASES['default'] by the settings
+# modules. By default connections are kept for DB_CONN_MAX_AGE seconds and
+# checked before reuse. DB_POOL=True uses psycopg 3's connection pool
+# (psycopg[pool] in requirements.txt) instead; config/asgi.py turns it on,
+# since persistent connections are not reused across ASGI requests.
+if config('DB_POOL', default=False, cast=bool):
+    DATABASE_CONNECTION = {
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {'pool': {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=20, cast=int),
+            'timeout': 10,
+        }},
+    }
+else:
+    DATABASE_CONNECTION = {
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+    }
 
 
 
@@ -12,5 +12,6 @@ DATABASES = {
         'PASSWORD': '123456',
         'HOST': 'localhost',
         'PORT': '5432',
+        **DATABASE_CONNECTION,
     }
 }
\ No newline at end of file
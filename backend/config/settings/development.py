@@ -17,5 +17,6 @@ DATABASES = {
         'PASSWORD': '123456',
         'HOST': 'db',
         'PORT': '5432',
+        **DATABASE_CONNECTION,
     }
 }
\ No newline at end of file
@@ -0,0 +1,52 @@
+"""
+Lean profile for API-only web processes, `run_jobs` workers and cron-run
+management commands.
+
+It takes every setting of `CRM_BASE_SETTINGS` (default
+`config.settings.development`) and drops what only the admin and browsers
+need: the admin, sessions, messages, staticfiles and django-filter apps,
+their middleware, the template engine and the browsable API. corsheaders
+stays when the base settings allow cross-origin browsers. It shortens
+`django.setup()`; the first request still imports DRF and simplejwt with
+everything they import at module level (the admin, `django.test`, `yaml`,
+`pygments`). Compare startup with `python manage.py bench_startup`.
+
+    DJANGO_SETTINGS_MODULE=config.settings.lean CRM_BASE_SETTINGS=config.settings.ci python manage.py run_jobs
+"""
+from importlib import import_module
+
+from decouple import config
+
+BASE_SETTINGS = config('CRM_BASE_SETTINGS', default='config.settings.development')
+globals().update({name: value for name, value in vars(import_module(BASE_SETTINGS)).items() if name.isupper()})
+
+CORS = bool(globals().get('CORS_ALLOWED_ORIGINS') or globals().get('CORS_ALLOW_ALL_ORIGINS'))
+
+LEAN_DROPPED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'django_filters',  # only templates for the browsable API; the filter backend works without the app
+    *([] if CORS else ['corsheaders']),
+]
+LEAN_DROPPED_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    *([] if CORS else ['corsheaders.middleware.CorsMiddleware']),
+]
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in LEAN_DROPPED_APPS]  # noqa: F821
+MIDDLEWARE = [name for name in MIDDLEWARE if name not in LEAN_DROPPED_MIDDLEWARE]  # noqa: F821
+
+# JWT authentication only, so no session or CSRF; JSON only, so no templates.
+TEMPLATES = []
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,  # noqa: F821
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+}
+
+# Messages are English either way; this skips loading the translation catalogs on the first request.
+USE_I18N = False
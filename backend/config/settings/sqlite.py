@@ -0,0 +1,14 @@
+from config.settings.base import *
+
+# Local runs without PostgreSQL, e.g.
+# DJANGO_SETTINGS_MODULE=config.settings.sqlite python manage.py test
+DEBUG = True
+
+ALLOWED_HOSTS = ["localhost", "127.0.0.1"]
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    }
+}
@@ -30,17 +30,12 @@ export default function ContactDetailsPage({ onLogout }) {
 
   useEffect(() => {
     setIsLoading(true);
-    Promise.all([
-      authFetch(`/api/contacts/${id}/`).then(res => {
-        if (!res.ok) throw new Error();
-        return res.json();
-      }),
-      authFetch(`/api/tasks/?contact_id=${id}&page_size=100`).then(res => {
+    authFetch(`/api/contacts/${id}/?expand=tasks`)
+      .then(res => {
         if (!res.ok) throw new Error();
         return res.json();
       })
-    ])
-      .then(([contactData, tasksData]) => {
+      .then(contactData => {
         setContact(contactData);
         setEditData({
           full_name: contactData.full_name,
@@ -48,7 +43,7 @@ export default function ContactDetailsPage({ onLogout }) {
           email: contactData.email || '',
           status: contactData.status
         });
-        setTasks(tasksData.results ? tasksData.results : tasksData);
+        setTasks(contactData.tasks);
         setIsLoading(false);
       })
       .catch(() => {